@@ -0,0 +1,60 @@
+"""
+Moving the results of a parametric run into the result cache.
+
+Compares the old '/bin/cp -pr runname/* cachedir' against move_tree,
+which renames the directory (or hardlinks the files when the cache is
+on another filesystem).
+
+    python benchmarks/bench_cache_populate.py [num_files] [kbytes_per_file]
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from nanohublib.ui.resultcache import ResultCache, move_tree
+
+
+def make_run(path, num, size):
+    data = os.urandom(size * 1024)
+    for i in range(num):
+        d = os.path.join(path, str(i % 100))
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        with open(os.path.join(d, 'out%d.dat' % i), 'wb') as f:
+            f.write(data)
+
+
+def main(num=2000, size=64):
+    root = tempfile.mkdtemp()
+    try:
+        cache = ResultCache(os.path.join(root, 'cache'), 'tool')
+        run = os.path.join(root, 'run')
+
+        make_run(run, num, size)
+        tmp = cache.tmpdir()
+        t0 = time.time()
+        os.system('/bin/cp -pr %s/* %s' % (run, tmp))
+        shutil.rmtree(run)
+        cache.commit('old', tmp)
+        old = time.time() - t0
+
+        make_run(run, num, size)
+        tmp = cache.tmpdir()
+        os.rmdir(tmp)
+        t0 = time.time()
+        move_tree(run, tmp)
+        cache.commit('new', tmp)
+        new = time.time() - t0
+
+        print("%d files of %d KB" % (num, size))
+        print("  cp -pr:    %.3f s" % old)
+        print("  move_tree: %.3f s (%.0fx)" % (new, old / new))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
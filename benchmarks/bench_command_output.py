@@ -0,0 +1,44 @@
+"""
+Peak memory and time of executeCommand for a command with large output.
+
+The output is collected as bytes (the default), as a memoryview, and
+written straight to a file.
+
+    python benchmarks/bench_command_output.py [megabytes]
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from nanohublib.cmd import executeCommand
+
+
+def measure(name, **kwargs):
+    tracemalloc.reset_peak()
+    t0 = time.time()
+    code, out, err = executeCommand(CMD, **kwargs)
+    t = time.time() - t0
+    print("  %-10s %.3f s, peak %.1f MB" % (name, t, tracemalloc.get_traced_memory()[1] / 1e6))
+    return out
+
+
+def main(mbytes=200):
+    global CMD
+    CMD = ['head', '-c', str(mbytes * 1000000), '/dev/zero']
+    print("%d MB of output" % mbytes)
+    tracemalloc.start()
+    measure('bytes')
+    measure('memoryview', asView=True)
+    fd, fname = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        measure('file', stdout=fname)
+    finally:
+        os.remove(fname)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
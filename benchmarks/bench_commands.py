@@ -0,0 +1,34 @@
+"""
+Running many short helper commands.
+
+Compares calling cmd.executeCommand for each command in turn against
+cmd.executeCommands, which runs them concurrently with asyncio.
+
+    python benchmarks/bench_commands.py [num_commands] [max_concurrency]
+"""
+from __future__ import print_function
+import sys
+import time
+
+from nanohublib.cmd import executeCommand, executeCommands
+
+
+def main(num=200, max_concurrency=16):
+    commands = [['sh', '-c', 'echo %d; sleep 0.01' % i] for i in range(num)]
+
+    t0 = time.time()
+    serial = [executeCommand(c)[1] for c in commands]
+    old = time.time() - t0
+
+    t0 = time.time()
+    results = executeCommands(commands, max_concurrency=max_concurrency)
+    new = time.time() - t0
+    assert serial == [r.stdout for r in results]
+
+    print("%d commands" % num)
+    print("  executeCommand, one at a time:   %.3f s" % old)
+    print("  executeCommands, %3d at a time:  %.3f s (%.1fx)" % (max_concurrency, new, old / new))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,40 @@
+"""
+Parsing curve <xy> text: the old np.fromstring(sep=' \\n') call,
+a str.split() tokenizer and rappture.curve.parse_xy.
+
+    python benchmarks/bench_curve_parse.py [num_points]
+"""
+from __future__ import print_function
+import sys
+import timeit
+import warnings
+
+import numpy as np
+
+from nanohublib.rappture.curve import parse_xy
+
+
+def main(num=1000000):
+    xy = np.random.rand(num, 2)
+    text = '\n'.join('%.12e %.12e' % (x, y) for x, y in xy)
+    print("%d points, %.1f MB of text" % (num, len(text) / 1024.0 / 1024))
+
+    def fromstring():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return np.fromstring(text, sep=' \n').reshape(-1, 2)
+
+    def split():
+        return np.array(text.split(), dtype=np.float64).reshape(-1, 2)
+
+    for name, func in [('np.fromstring', fromstring),
+                       ('str.split', split),
+                       ('parse_xy', lambda: parse_xy(text)),
+                       ('parse_xy float32', lambda: parse_xy(text, dtype=np.float32))]:
+        t = min(timeit.repeat(func, number=1, repeat=3))
+        assert np.allclose(func(), xy, rtol=1e-6)
+        print("  %-18s %.3f s" % (name, t))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,36 @@
+"""
+Writing curve <xy> text: np.savetxt (the old XY.value setter) versus
+rappture.curve.format_xy.
+
+    python benchmarks/bench_curve_write.py [num_points]
+"""
+from __future__ import print_function
+import sys
+import timeit
+from io import BytesIO
+
+import numpy as np
+
+from nanohublib.rappture.curve import format_xy
+
+
+def main(num=1000000):
+    xy = np.random.rand(num, 2)
+    print("%d points" % num)
+
+    def savetxt():
+        s = BytesIO()
+        np.savetxt(s, xy, fmt='%.6e %.6e', newline="\n")
+        return s.getvalue().decode()
+
+    assert savetxt() == format_xy(xy)
+    for name, func in [('np.savetxt', savetxt),
+                       ('format_xy', lambda: format_xy(xy)),
+                       ('format_xy shortest', lambda: format_xy(xy, precision=None)),
+                       ('format_xy (x, y)', lambda: format_xy((xy[:, 0], xy[:, 1])))]:
+        t = min(timeit.repeat(func, number=1, repeat=3))
+        print("  %-20s %.3f s" % (name, t))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
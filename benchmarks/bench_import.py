@@ -0,0 +1,36 @@
+"""
+Import time of the package and its submodules.
+
+Each import runs in a fresh interpreter, so nothing is cached between
+measurements.  The best of several runs is reported.
+
+    python benchmarks/bench_import.py [repeat]
+"""
+from __future__ import print_function
+import subprocess
+import sys
+import time
+
+MODULES = ['nanohublib', 'nanohublib.cmd', 'nanohublib.units',
+           'nanohublib.rappture', 'nanohublib.ui']
+
+
+def import_time(module, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.time()
+        subprocess.check_call([sys.executable, '-c', 'import ' + module])
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return best
+
+
+def main(repeat=5):
+    base = import_time('sys', repeat)
+    print('interpreter startup: %.3f s' % base)
+    for module in MODULES:
+        print('%-20s %.3f s' % (module, import_time(module, repeat) - base))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,41 @@
+"""
+Setting an array valued tool input with units.
+
+Compares converting one element at a time through pint (what the
+inputs did before) against tool.input_types.Number, which converts
+the whole array with one multiply and add.
+
+    python benchmarks/bench_input_array.py [size]
+"""
+from __future__ import print_function
+import sys
+import timeit
+import numpy as np
+
+from nanohublib import ureg, Q_
+from nanohublib.tool.input_types import Number
+
+
+def per_element(vals, units):
+    return [Q_(v, ureg.degC).to(units).magnitude for v in vals]
+
+
+def main(size=100000):
+    vals = np.linspace(0, 100, size)
+    n = Number(type='Number', units='K')
+
+    def vectorized():
+        n.value = Q_(vals, ureg.degC)
+
+    vectorized()
+    np.testing.assert_allclose(n.value[:100], per_element(vals[:100], ureg.kelvin))
+
+    old = min(timeit.repeat(lambda: per_element(vals, ureg.kelvin), number=1, repeat=3))
+    new = min(timeit.repeat(vectorized, number=1, repeat=3))
+    print("%d element array, degC to K" % size)
+    print("  per element: %.4f s" % old)
+    print("  vectorized:  %.4f s (%.0fx)" % (new, old / new))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,63 @@
+"""
+Peak memory of loading a large run.xml eagerly and with lazy=True.
+
+Writes a run file with many large output curves, then loads it in a
+fresh process for each mode and reads one output value.
+
+    python benchmarks/bench_lazy_run.py [size_mb]
+"""
+from __future__ import print_function
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def make_run(fname, size_mb):
+    xy = np.random.rand(100000, 2)
+    text = '\n'.join('%.12e %.12e' % (x, y) for x, y in xy)
+    num = max(1, int(size_mb * 1024 * 1024 / len(text)))
+    with open(fname, 'w') as f:
+        f.write('<?xml version="1.0"?>\n<run>\n<output>\n')
+        f.write('<number id="n"><about><label>N</label></about><current>42</current></number>\n')
+        for i in range(num):
+            f.write('<curve id="c%d"><about><label>Curve %d</label></about>'
+                    '<component><xy>%s</xy></component></curve>\n' % (i, i, text))
+        f.write('</output>\n</run>\n')
+
+
+def maxrss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def load(fname, lazy):
+    from nanohublib.rappture import RapXML
+    base = maxrss()
+    start = time.time()
+    io = RapXML(fname, lazy=lazy)
+    io['output.number(n)'].value
+    io['output.curve(c0).component.xy'].value
+    elapsed = time.time() - start
+    print("  lazy=%-5s %6.2f s  peak RSS %7.1f MB over import" % (lazy, elapsed, maxrss() - base))
+
+
+def main(size_mb=200):
+    if len(sys.argv) > 2 and sys.argv[1] == '--load':
+        return load(sys.argv[2], sys.argv[3] == 'True')
+    with tempfile.TemporaryDirectory() as tmp:
+        fname = os.path.join(tmp, 'run.xml')
+        make_run(fname, size_mb)
+        print("run file: %.1f MB" % (os.path.getsize(fname) / 1024.0 / 1024))
+        for lazy in (False, True):
+            subprocess.check_call([sys.executable, __file__, '--load', fname, str(lazy)])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--load':
+        main()
+    else:
+        main(*[float(a) for a in sys.argv[1:]])
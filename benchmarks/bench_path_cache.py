@@ -0,0 +1,53 @@
+"""
+Benchmark repeated Rappture path lookups on a large tool.xml.
+
+Compares node[path] with the per-RapXML path cache against the same
+lookups with the cache cleared before every access.
+
+    python benchmarks/bench_path_cache.py [num_inputs] [num_lookups]
+"""
+from __future__ import print_function
+import os
+import sys
+import tempfile
+import timeit
+
+from nanohublib.rappture import RapXML
+
+
+def make_tool(fname, num):
+    with open(fname, 'w') as f:
+        f.write('<?xml version="1.0"?>\n<run>\n<tool><title>bench</title></tool>\n<input>\n')
+        for i in range(num):
+            f.write('<group id="g%d"><number id="n%d"><about><label>Number %d</label></about>'
+                    '<units>K</units><default>%dK</default></number></group>\n' % (i, i, i, i))
+        f.write('</input>\n</run>\n')
+
+
+def main(num=2000, lookups=10000):
+    with tempfile.TemporaryDirectory() as tmp:
+        fname = os.path.join(tmp, 'tool.xml')
+        make_tool(fname, num)
+        io = RapXML(fname)
+
+    paths = ['input.group(g%d).number(n%d).current' % (i, i) for i in range(0, num, num // 50)]
+
+    def lookup():
+        for i in range(lookups):
+            io[paths[i % len(paths)]]
+
+    def lookup_nocache():
+        for i in range(lookups):
+            io.pcache.clear()
+            io[paths[i % len(paths)]]
+
+    nocache = min(timeit.repeat(lookup_nocache, number=1, repeat=3))
+    io.pcache.clear()
+    cache = min(timeit.repeat(lookup, number=1, repeat=3))
+    print("%d lookups on %d inputs" % (lookups, num))
+    print("  uncached: %.3f s" % nocache)
+    print("  cached:   %.3f s  (%.1fx)" % (cache, nocache / cache))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,70 @@
+"""
+Opening a large directory in PathSelector.
+
+Compares the old listing (os.listdir plus os.path.isdir for every entry,
+all options sent to the widget) against list_dir with a page of options,
+first on a cold cache and then on a directory that was already listed.
+
+    python benchmarks/bench_pathselect.py [num_files]
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import ipywidgets as ui
+from nanohublib.ui.pathselect import list_dir, PAGE, _cache
+
+
+def old_refresh(path, select):
+    keys = ['[..]']
+    for item in os.listdir(path):
+        if item[0] == '.':
+            continue
+        elif os.path.isdir(os.path.join(path, item)):
+            keys.append('[' + item + ']')
+        else:
+            keys.append(item)
+    keys.sort(key=str.lower)
+    vals = [k[1:-1] if k[0] == '[' else k for k in keys]
+    select.options = list(zip(keys, vals))
+
+
+def new_refresh(path, select):
+    select.options = list_dir(path)[:PAGE]
+
+
+def main(num=100000):
+    root = tempfile.mkdtemp()
+    try:
+        for i in range(num):
+            open(os.path.join(root, 'out%06d.dat' % i), 'w').close()
+        for i in range(100):
+            os.mkdir(os.path.join(root, 'dir%03d' % i))
+        select = ui.SelectMultiple(options=[], rows=10)
+
+        t0 = time.time()
+        old_refresh(root, select)
+        old = time.time() - t0
+
+        _cache.clear()
+        t0 = time.time()
+        new_refresh(root, select)
+        cold = time.time() - t0
+
+        t0 = time.time()
+        new_refresh(root, select)
+        warm = time.time() - t0
+
+        print("%d files, %d options per page" % (num, PAGE))
+        print("  listdir + isdir, all options: %.3f s" % old)
+        print("  scandir, one page:            %.3f s (%.0fx)" % (cold, old / cold))
+        print("  cached, one page:             %.4f s (%.0fx)" % (warm, old / warm))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,44 @@
+"""
+Microbenchmark for reading Rappture numbers.
+
+Compares parsing the value and units strings with pint every time
+(the old parse_rap_expr) against rappture.number.parse_rap_expr with
+the cached unit parsing in nanohublib.units.
+
+    python benchmarks/bench_units.py [num_reads]
+"""
+from __future__ import print_function
+import sys
+import timeit
+
+from nanohublib import ureg, Q_
+from nanohublib.rappture.number import parse_rap_expr
+
+VALUES = [('K', '300K'), ('C', '300K'), ('eV', '1.5 eV'), ('nm', '2.5e-9 m'), ('V', '4')]
+
+
+def pint_parse(units, val):
+    units = ureg.degC if units == 'C' else ureg.parse_expression(units).units
+    val = ureg.parse_expression(val)
+    if hasattr(val, 'units'):
+        return val.to(units)
+    return Q_(val, units)
+
+
+def main(num=2000):
+    for units, val in VALUES:
+        assert abs(pint_parse(units, val).magnitude - parse_rap_expr(units, val).magnitude) < 1e-9
+
+    def run(func):
+        for i in range(num):
+            func(*VALUES[i % len(VALUES)])
+
+    old = min(timeit.repeat(lambda: run(pint_parse), number=1, repeat=3))
+    new = min(timeit.repeat(lambda: run(parse_rap_expr), number=1, repeat=3))
+    print("%d number reads" % num)
+    print("  pint every time: %.3f s (%.1f us/read)" % (old, 1e6 * old / num))
+    print("  cached units:    %.3f s (%.1f us/read, %.1fx)" % (new, 1e6 * new / num, old / new))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,126 @@
+"""
+Uploading a file through FileUpload with a local stand-in for the
+browser and the kernel.
+
+A front-end thread answers read requests from a file on disk and each
+message takes latency/2 seconds in each direction, like a round trip
+between a browser and a remote kernel.  Compares the old protocol (one
+64 KB base64 chunk per round trip) against FileUpload's pipelined
+binary chunks.
+
+    python benchmarks/bench_upload.py [megabytes] [latency_ms]
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import base64
+import shutil
+import tempfile
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from nanohublib.ui.upload import FileUpload
+
+
+class FrontEnd(threading.Thread):
+    """Reads chunks of fname and posts them back to the kernel queue."""
+
+    def __init__(self, fname, latency, kernel, b64=False):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.f = open(fname, 'rb')
+        self.latency = latency
+        self.kernel = kernel
+        self.b64 = b64
+        self.requests = queue.Queue()
+
+    def send(self, content, buffers=None):
+        self.requests.put((time.time() + self.latency / 2, content))
+
+    def run(self):
+        while True:
+            when, m = self.requests.get()
+            if m is None:
+                return
+            time.sleep(max(0, when - time.time()))
+            self.f.seek(m['offset'])
+            data = self.f.read(m['size'])
+            if self.b64:
+                data = base64.b64encode(data)
+            reply = dict(event='chunk', fnum=m['fnum'], offset=m['offset'], seq=m.get('seq'))
+            self.kernel.put((time.time() + self.latency / 2, reply, data))
+
+
+def kernel_loop(kernel, handle, done):
+    # deliver the front end's messages one at a time, like the kernel does
+    while not done:
+        when, content, data = kernel.get()
+        time.sleep(max(0, when - time.time()))
+        handle(content, data)
+
+
+def old_upload(src, dest, size, latency):
+    # one base64 chunk of 64 KB per round trip
+    kernel = queue.Queue()
+    fe = FrontEnd(src, latency, kernel, b64=True)
+    fe.start()
+    done = []
+    with open(dest, 'wb') as f:
+        def handle(content, data):
+            data = base64.b64decode(data)
+            f.write(data)
+            if f.tell() >= size:
+                done.append(True)
+            else:
+                fe.send(dict(fnum=0, offset=f.tell(), size=65536))
+        fe.send(dict(fnum=0, offset=0, size=65536))
+        kernel_loop(kernel, handle, done)
+    fe.send(None)
+
+
+def new_upload(src, dest, size, latency, **kw):
+    kernel = queue.Queue()
+    fe = FrontEnd(src, latency, kernel)
+    fe.start()
+    done = []
+    up = FileUpload('Upload', '', dir=os.path.dirname(dest), maxsize='100G',
+                    cb=lambda w, names: done.append(names), **kw)
+    up.input.send = fe.send
+    up.input.filenames = [[os.path.basename(dest), size]]
+    kernel_loop(kernel, lambda c, d: up.input._handle_custom_msg(c, [memoryview(d)]), done)
+    fe.requests.put((0, None))
+    return up
+
+
+def main(mbytes=64, latency=10):
+    latency /= 1000.0
+    size = mbytes * 1024 * 1024
+    root = tempfile.mkdtemp()
+    try:
+        src = os.path.join(root, 'src.bin')
+        with open(src, 'wb') as f:
+            f.write(os.urandom(size))
+        print("%d MB, %.0f ms round trip" % (mbytes, latency * 1000))
+
+        t0 = time.time()
+        old_upload(src, os.path.join(root, 'old.bin'), size, latency)
+        old = time.time() - t0
+        print("  64 KB base64, one at a time: %.2f s (%.1f MB/s)" % (old, mbytes / old))
+
+        for pipeline in (1, 4):
+            t0 = time.time()
+            up = new_upload(src, os.path.join(root, 'new%d.bin' % pipeline), size, latency,
+                            pipeline=pipeline)
+            new = time.time() - t0
+            print("  binary, adaptive, %d in flight: %.2f s (%.1f MB/s, %.0fx), last chunk %d KB"
+                  % (pipeline, new, mbytes / new, old / new, up.chunk // 1024))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
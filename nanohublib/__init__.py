@@ -23,11 +23,26 @@
 #  Authors:
 #  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
 
-from pint import UnitRegistry
-ureg = UnitRegistry()
-ureg.autoconvert_offset_to_baseunit = True
-Q_ = ureg.Quantity
+import importlib
 
 __version__ = "0.1.0"
 
-from . import rappture
+# The unit registry and the submodules pull in pint, pandas, lxml,
+# ipywidgets and more, so they are only loaded when first used.
+_submodules = ('cmd', 'rappture', 'tool', 'ui', 'units', 'uq', 'use', 'util')
+
+
+def __getattr__(name):
+    if name == 'ureg':
+        from .units import get_registry
+        return get_registry()
+    if name == 'Q_':
+        from .units import get_registry
+        return get_registry().Quantity
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + ['ureg', 'Q_'] + list(_submodules))
@@ -24,3 +24,4 @@
 #  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
 
 from .command import runCommand, executeCommand
+from .asyncrun import run_command, run_commands, executeCommands, CommandResult
@@ -0,0 +1,214 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+"""
+Run commands with asyncio.
+
+run_command is a coroutine, so many commands can run at once from one
+thread without the signal handlers and global pid that executeCommand
+uses.  executeCommands runs a list of commands with a limit on how many
+run at the same time and returns a CommandResult for each.
+"""
+
+import os
+import time
+import signal
+import asyncio
+import inspect
+import collections
+import concurrent.futures
+from .command import usplit, get_stdin
+
+BUFSIZ = 65536
+
+CommandResult = collections.namedtuple(
+    'CommandResult', ['command', 'code', 'stdout', 'stderr', 'elapsed', 'timed_out'])
+CommandResult.__doc__ = """Result of a command.
+
+    command -- The command that was run.
+    code -- Exit code. 0 is normal.  Negative if killed by a signal.
+    stdout -- Bytestring containing the standard output.
+    stderr -- Bytestring containing the standard error output.
+    elapsed -- Run time in seconds.
+    timed_out -- True if the command was killed because of the timeout.
+"""
+
+
+async def _read(stream, chunks, cb):
+    while True:
+        data = await stream.read(BUFSIZ)
+        if not data:
+            break
+        chunks.append(data)
+        if cb is not None:
+            res = cb(data)
+            if inspect.isawaitable(res):
+                await res
+
+
+def _signal(proc, sig):
+    # signal the whole process group, so shells and their children stop too
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _stop(proc, grace):
+    _signal(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), grace)
+    except asyncio.TimeoutError:
+        _signal(proc, signal.SIGKILL)
+        await proc.wait()
+
+
+async def run_command(command,
+                      stdin=None,
+                      shell=False,
+                      timeout=None,
+                      stdout_cb=None,
+                      stderr_cb=None,
+                      cwd=None,
+                      env=None,
+                      grace=5):
+    """Run a command without blocking the event loop.
+
+    Arguments:
+        command -- A list or string containing the command to run.
+                   Strings will be converted to a list internally with shlex,
+                   unless shell is True.
+
+    Keyword arguments:
+    stdin -- Bytes to send as input, or a file, fileno, or filename
+             that will be piped as input.
+    shell -- Boolean. Default False. Run the command with the shell.
+    timeout -- Seconds before the command is stopped. Default None (no limit).
+    stdout_cb -- Function called with each piece of standard output (bytes).
+                 It may be a coroutine function.
+    stderr_cb -- Same, for the standard error output.
+    cwd, env -- Working directory and environment for the command.
+    grace -- Seconds to wait after SIGTERM before sending SIGKILL.
+
+    If the task is cancelled, the command is stopped before
+    CancelledError is raised.
+
+    Returns:
+    A CommandResult.
+    """
+    start = time.time()
+    data = None
+    fpClose = False
+    if isinstance(stdin, bytes):
+        data = stdin
+        stdin = asyncio.subprocess.PIPE
+    else:
+        stdin, fpClose, errStr = get_stdin(stdin)
+        if errStr:
+            return CommandResult(command, 1, b'', errStr.encode(), time.time() - start, False)
+
+    kwargs = dict(stdin=stdin,
+                  stdout=asyncio.subprocess.PIPE,
+                  stderr=asyncio.subprocess.PIPE,
+                  cwd=cwd, env=env,
+                  start_new_session=True)
+    try:
+        if shell:
+            proc = await asyncio.create_subprocess_shell(command, **kwargs)
+        else:
+            args = command if isinstance(command, list) else usplit(command)
+            proc = await asyncio.create_subprocess_exec(*args, **kwargs)
+    except OSError as e:
+        return CommandResult(command, 1, b'', str(e).encode(), time.time() - start, False)
+    finally:
+        if fpClose:
+            stdin.close()
+
+    outData = []
+    errData = []
+
+    async def communicate():
+        if data is not None:
+            try:
+                proc.stdin.write(data)
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            proc.stdin.close()
+        await asyncio.gather(_read(proc.stdout, outData, stdout_cb),
+                             _read(proc.stderr, errData, stderr_cb))
+        return await proc.wait()
+
+    timed_out = False
+    try:
+        code = await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        await _stop(proc, grace)
+        code = proc.returncode
+    except asyncio.CancelledError:
+        await _stop(proc, grace)
+        raise
+
+    return CommandResult(command, code, b''.join(outData), b''.join(errData),
+                         time.time() - start, timed_out)
+
+
+async def run_commands(commands, max_concurrency=None, **kwargs):
+    """Coroutine version of executeCommands."""
+    if max_concurrency is None:
+        max_concurrency = os.cpu_count() or 1
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def run(command):
+        async with sem:
+            return await run_command(command, **kwargs)
+
+    return await asyncio.gather(*[run(c) for c in commands])
+
+
+def executeCommands(commands, max_concurrency=None, **kwargs):
+    """Execute many commands in parallel.
+
+    Arguments:
+        commands -- A list of commands. Each is a list or string, as for executeCommand.
+
+    Keyword arguments:
+    max_concurrency -- Maximum number of commands running at the same time.
+                       Default is the number of CPUs.
+    Any other keyword arguments (shell, timeout, stdin, ...) are passed
+    to run_command for every command.
+
+    Returns:
+    A list of CommandResult, in the same order as commands.
+    """
+    coro = run_commands(commands, max_concurrency, **kwargs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # already inside an event loop (e.g. Jupyter), so use another thread
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        return pool.submit(asyncio.run, coro).result()
@@ -33,6 +33,7 @@ import signal
 import traceback
 import io
 import locale
+import codecs
 
 # Python 2 <-> 3 compatibility
 if (sys.version_info > (3, 0)):
@@ -51,6 +52,9 @@ else:
 
 
 commandPid = 0
+BUFSIZ = 4096
+# reads grow up to this size while a command is writing quickly
+MAXBUFSIZ = 1024 * 1024
 SIGNALS_TO_NAMES_DICT = dict((getattr(signal, n), n)
     for n in dir(signal) if n.startswith('SIG') and '_' not in n)
 
@@ -94,10 +98,73 @@ def swrite(stream, data, enc):
     stream.flush()
 
 
+class Sink(object):
+    """
+    Where the output of a stream goes.
+
+    target is None (keep it in memory), a filename, or an object
+    with a write method.
+    """
+
+    def __init__(self, target, asView=False):
+        self.target = target
+        self.asView = asView
+        self.fp = None
+        self.buf = None
+        if target is None:
+            self.buf = bytearray()
+            self.write = self.buf.extend
+        elif isinstance(target, str):
+            self.fp = open(target, 'wb')
+            self.write = self.fp.write
+        else:
+            self.write = target.write
+
+    def fileno(self):
+        """A file descriptor the command can write to directly, or None."""
+        fp = self.fp if self.fp is not None else self.target
+        if fp is None:
+            return None
+        try:
+            fd = fp.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+        # anything already buffered must come before the command's output
+        fp.flush()
+        return fd
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+
+    def result(self):
+        if self.buf is None:
+            return self.target
+        if self.asView:
+            return memoryview(self.buf)
+        return bytes(self.buf)
+
+
+class Streamer(object):
+    # decode output for streaming without splitting multibyte characters
+    def __init__(self, stream, enc):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder(enc)(errors='replace')
+
+    def write(self, data, final=False):
+        c = self.decoder.decode(data, final)
+        if c:
+            self.stream.write(c)
+            self.stream.flush()
+
+
 def executeCommand(command,
                    stdin=None,
                    streamOutput=False,
-                   shell=False):
+                   shell=False,
+                   stdout=None,
+                   stderr=None,
+                   asView=False):
     """Execute a command.
 
     Arguments:
@@ -107,20 +174,26 @@ def executeCommand(command,
     Keyword arguments:
     stdin -- A file, fileno, or filename that will be piped as input.
     streamOuput -- Boolean. Default False. True means the output is streamed.
+    stdout -- Where to put the standard output. Default None keeps it
+              in memory. A filename or a writable object (anything with
+              a write method) receives the output as it arrives, so
+              memory use stays bounded.  Unless the output is streamed,
+              a file is written to directly by the command.
+    stderr -- Same, for the standard error output.
+    asView -- Boolean. Default False. Return output kept in memory as a
+              memoryview instead of copying it into a bytes object.
 
     Returns:
     A tuple containing three values:
         code -- Exit code. 0 is normal.
-        stdout -- String containing the standard output.
-        stderr -- String containing the standard error output.
+        stdout -- The standard output. Bytes (or a memoryview), or the
+                  filename or writable it was sent to.
+        stderr -- The standard error output, in the same form.
     """
     global commandPid
 
     exitStatus = 0
     fpClose = 0
-    outData = []
-    errData = []
-    BUFSIZ = 4096
 
     # set the output encoding
     if sys.stdout.encoding is None:
@@ -150,51 +223,73 @@ def executeCommand(command,
     else:
         commandArgs = usplit(command)
 
+    outSink = Sink(stdout, asView)
+    errSink = Sink(stderr, asView)
+    # files are handed to the command, so its output never passes through us
+    outFd = None if streamOutput else outSink.fileno()
+    errFd = None if streamOutput else errSink.fileno()
+
     try:
         child = subprocess.Popen(commandArgs, bufsize=BUFSIZ,
                              stdin=commandStdin,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE,
+                             stdout=subprocess.PIPE if outFd is None else outFd,
+                             stderr=subprocess.PIPE if errFd is None else errFd,
                              shell=shell,
                              close_fds=True)
     except Exception as e:
         # swrite(sys.stderr, e.strerror, outenc)
+        outSink.close()
+        errSink.close()
         sys.stderr.write(e.strerror)
         return 1, b"", e.strerror.encode(outenc)
 
-    poller = select.poll()
-    poller.register(child.stdout, select.POLLIN)
-    poller.register(child.stderr, select.POLLIN)
+    commandPid = child.pid
+    try:
+        streams = {}
+        if child.stdout is not None:
+            streams[child.stdout.fileno()] = [outSink, Streamer(sys.stdout, outenc), BUFSIZ]
+        if child.stderr is not None:
+            streams[child.stderr.fileno()] = [errSink, Streamer(sys.stderr, outenc), BUFSIZ]
 
-    numfds = 2
-    while numfds > 0:
-        try:
-            r = poller.poll()
-        except select.error as err:
-            print(err[1], file=sys.stderr)
-            break
-        for fd, flags in r:
-            if flags & (select.POLLIN | select.POLLPRI):
-                c = os.read(fd, BUFSIZ)
-                if fd == child.stderr.fileno():
-                    errData.append(c)
-                    if streamOutput:
-                        swrite(sys.stderr, c, outenc)
-                else:
-                    outData.append(c)
-                    if streamOutput:
-                        swrite(sys.stdout, c, outenc)
-            if flags & (select.POLLHUP | select.POLLERR):
-                poller.unregister(fd)
-                numfds -= 1
-
-    pid, exitStatus = os.waitpid(child.pid, 0)
-    commandPid = 0
-    if fpClose:
-        try:
-            commandStdin.close()
-        except:
-            pass
+        poller = select.poll()
+        for fd in streams:
+            poller.register(fd, select.POLLIN | select.POLLPRI)
+
+        while streams:
+            try:
+                r = poller.poll()
+            except select.error as err:
+                print(err, file=sys.stderr)
+                break
+            for fd, flags in r:
+                sink, streamer, size = streams[fd]
+                c = os.read(fd, size)
+                if streamOutput:
+                    streamer.write(c, final=not c)
+                if not c:
+                    # EOF
+                    poller.unregister(fd)
+                    del streams[fd]
+                    continue
+                sink.write(c)
+                if len(c) == size and size < MAXBUFSIZ:
+                    # more is waiting, so read bigger pieces
+                    streams[fd][2] = size * 2
+
+        pid, exitStatus = os.waitpid(child.pid, 0)
+    finally:
+        # also close the files if reading is interrupted
+        commandPid = 0
+        for fp in (child.stdout, child.stderr):
+            if fp is not None:
+                fp.close()
+        outSink.close()
+        errSink.close()
+        if fpClose:
+            try:
+                commandStdin.close()
+            except:
+                pass
 
     try:
         # restore original signal handlers
@@ -215,10 +310,10 @@ def executeCommand(command,
             if os.WIFEXITED(exitStatus):
                 exitStatus = os.WEXITSTATUS(exitStatus)
             sys.stderr.write("%s failed w/ exit code %d\n" % (command, exitStatus))
-        if not streamOutput:
-            sys.stderr.write("%s\n" % ("".join(errData)))
+        if not streamOutput and errSink.buf is not None:
+            sys.stderr.write("%s\n" % errSink.buf.decode(outenc, 'replace'))
 
-    return exitStatus, b"".join(outData), b"".join(errData)
+    return exitStatus, outSink.result(), errSink.result()
 
 
 def runCommand(command, stream=True):
@@ -1,2 +1,4 @@
 from .rappture import RapXML
 from .tool import Tool
+from .lazy import LazyIndex
+from .runset import RunSet
@@ -1,14 +1,105 @@
 from __future__ import print_function
+import warnings
 from lxml import etree as ET
 import numpy as np
 import pint
+from io import StringIO
 from .. import ureg, Q_
 
-import matplotlib
-import matplotlib.pyplot as plt
 from IPython.display import display
 from .node import Node
 from .util import efind
+from ..units import rap_units
+
+
+def parse_xy(text, dtype=np.float64):
+    """
+    Parse the text of a curve <xy> element into an (N, 2) array.
+    Values may be separated by any whitespace.  Use dtype=np.float32
+    to halve the memory used by very large curves.
+    """
+    if not text or not text.strip():
+        # Rappture writes empty curves as whitespace
+        return np.empty((0, 2), dtype=dtype)
+    try:
+        # text mode fromstring parses in C with no intermediate strings.
+        # numpy 1.x stops at text it cannot parse with only a
+        # DeprecationWarning, so make that an error too.
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            res = np.fromstring(text, dtype=dtype, sep=' ')
+    except (ValueError, DeprecationWarning):
+        # something numpy could not parse. Python's float() is more lenient.
+        tokens = text.split()
+        res = np.empty(len(tokens), dtype=dtype)
+        res[:] = tokens
+    if res.size % 2:
+        raise ValueError("Curve data has an odd number of values.")
+    return res.reshape(-1, 2)
+
+
+def format_xy(data, precision=6, chunk=8192):
+    """
+    Format curve data as the text of an <xy> element, one point per line.
+
+    data is an (N, 2) array or an (x, y) pair of 1D arrays.  Pint
+    quantities are written as their magnitudes.
+
+    precision is the number of digits after the decimal point, in
+    scientific notation.  With precision=None, float64 data is written
+    with the shortest text that reads back to the same value (float32
+    data uses 9 significant digits, which is enough to round-trip).
+    """
+    data = getattr(data, 'magnitude', data)
+    if isinstance(data, (list, tuple)):
+        x, y = [np.asarray(getattr(a, 'magnitude', a)) for a in data]
+    else:
+        data = np.asarray(data)
+        x = data[:, 0]
+        y = data[:, 1]
+    if len(x) != len(y):
+        raise ValueError("x and y must have the same length.")
+
+    dtype = np.result_type(x, y)
+    if precision is None and dtype != np.float32:
+        fmt = None
+    else:
+        if precision is None:
+            precision = 8
+        fmt = '%%.%de %%.%de\n' % (precision, precision)
+
+    out = StringIO()
+    # interleave x and y a chunk at a time into a reused buffer
+    buf = np.empty(2 * chunk)
+    for i in range(0, len(x), chunk):
+        j = min(len(x), i + chunk)
+        vals = buf[:2 * (j - i)]
+        vals[0::2] = x[i:j]
+        vals[1::2] = y[i:j]
+        vals = vals.tolist()
+        if fmt is None:
+            it = iter(vals)
+            out.write(''.join(['%r %r\n' % p for p in zip(it, it)]))
+        else:
+            out.write((fmt * (j - i)) % tuple(vals))
+    return out.getvalue()
+
+
+def read_xy(elem, cache=None):
+    """
+    Parse an <xy> element.  With a cache (the xycache of the RapXML
+    the element belongs to), the result is reused until the element
+    is written through a Node, and the returned array is shared, so it
+    is read-only.
+    """
+    if cache is None:
+        return parse_xy(elem.text)
+    data = cache.get(elem)
+    if data is None:
+        data = parse_xy(elem.text)
+        data.flags.writeable = False
+        cache.put(elem, data)
+    return data
 
 
 class CInfo:
@@ -30,6 +121,35 @@ class CInfo:
 
 class Curve(Node):
 
+    @property
+    def data(self):
+        """
+        The (N, 2) array of curve points.  The x and y axes may have
+        different units, so no units are attached; use x and y for those.
+        """
+        return read_xy(self.elem.find('component/xy'), self._xycache())
+
+    def _axis(self, col, axis):
+        vals = self.data[:, col]
+        units = efind(self.elem, axis + '/units')
+        if not units:
+            return vals
+        try:
+            return Q_(vals, rap_units(units))
+        except Exception:
+            # units pint does not know
+            return vals
+
+    @property
+    def x(self):
+        """x values, as a pint Quantity if the x axis has units."""
+        return self._axis(0, 'xaxis')
+
+    @property
+    def y(self):
+        """y values, as a pint Quantity if the y axis has units."""
+        return self._axis(1, 'yaxis')
+
     def plot(self, single=False, ax=None):
         elem = self.elem
 
@@ -39,6 +159,7 @@ class Curve(Node):
         """
         Plot a rappture curve
         """
+        import matplotlib.pyplot as plt
         plt.style.use('ggplot')
 
         if ax is None:
@@ -47,7 +168,7 @@ class Curve(Node):
 
         ci = CInfo(elem)
         xy_elem = elem.find('component/xy')
-        data = np.fromstring(xy_elem.text, sep=' \n').reshape(-1, 2)
+        data = read_xy(xy_elem, self._xycache())
         if ci.xscale == 'log':
             ax.set_xscale('log')
         if ci.yscale == 'log':
@@ -77,6 +198,7 @@ class Curve(Node):
         return glist
 
     def mplot(self, ax=None):
+        import matplotlib.pyplot as plt
         plt.style.use('ggplot')
         elem = self.elem
 
@@ -92,7 +214,7 @@ class Curve(Node):
         for elem in glist:
             xy_elem = elem.find('component/xy')
             label = efind(elem, "about/label")
-            data = np.fromstring(xy_elem.text, sep=' \n').reshape(-1, 2)
+            data = read_xy(xy_elem, self._xycache())
             if ci.xscale == 'log':
                 ax.set_xscale('log')
             if ci.yscale == 'log':
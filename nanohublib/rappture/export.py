@@ -0,0 +1,116 @@
+from __future__ import print_function
+import json
+import shlex
+import numpy as np
+from .util import efind
+
+
+"""
+Export every output of a run in one pass.
+
+Each output becomes a record with its path, label, kind and units, plus
+one of: x/y arrays (curves), names/y/width (histograms), a scalar value
+(numbers, integers, booleans) or text (everything else).
+"""
+
+FORMATS = ('parquet', 'npz', 'hdf5')
+
+
+def _record(io, path):
+    node = io[path]
+    elem = node.elem
+    rec = dict(path=path, label=efind(elem, 'about/label') or '', kind=elem.tag,
+               units='', xunits='', yunits='', x=None, y=None, names=None,
+               width=None, value=None, text=None)
+    if elem.tag == 'curve':
+        data = node.data
+        rec.update(x=data[:, 0], y=data[:, 1],
+                   xunits=efind(elem, 'xaxis/units') or '',
+                   yunits=efind(elem, 'yaxis/units') or '')
+    elif elem.tag == 'histogram':
+        rec.update(xunits=efind(elem, 'xaxis/units') or '',
+                   yunits=efind(elem, 'yaxis/units') or '')
+        xy = efind(elem, 'component/xy')
+        if xy:
+            xy = shlex.split(xy)
+            rec.update(names=xy[::2], y=np.array(xy[1::2], dtype=float))
+        else:
+            xhw = shlex.split(efind(elem, 'component/xhw') or '')
+            rec.update(names=xhw[::3], y=np.array(xhw[1::3], dtype=float),
+                       width=np.array(xhw[2::3], dtype=float))
+    elif elem.tag in ('number', 'integer', 'boolean'):
+        val = node.value
+        if hasattr(val, 'magnitude'):
+            rec['units'] = efind(elem, 'units') or ''
+            val = val.magnitude
+        rec['value'] = float(val)
+    elif elem.tag == 'log':
+        rec['text'] = node.value
+    else:
+        rec['text'] = node.get_text() or ''
+    return rec
+
+
+def collect(io):
+    """
+    Returns a list of records, one for each output of io.
+    """
+    if io.lazy is not None:
+        # read all the output data in a single pass
+        io.lazy.materialize(io.tree.find('output'))
+    return [_record(io, path) for path in io.info.out_df.index]
+
+
+def _meta(rec):
+    return dict((k, rec[k]) for k in ('path', 'label', 'kind', 'units', 'xunits', 'yunits'))
+
+
+def write_npz(fname, records):
+    arrays = {}
+    for rec in records:
+        for key in ('x', 'y', 'width', 'value', 'text', 'names'):
+            if rec[key] is not None:
+                arrays['%s.%s' % (rec['path'], key)] = np.asarray(rec[key])
+    arrays['__meta__'] = np.array(json.dumps([_meta(r) for r in records]))
+    np.savez_compressed(fname, **arrays)
+
+
+def write_hdf5(fname, records):
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("Exporting to hdf5 requires the h5py package.")
+    with h5py.File(fname, 'w') as f:
+        for rec in records:
+            g = f.create_group(rec['path'])
+            for key, val in _meta(rec).items():
+                g.attrs[key] = val
+            for key in ('x', 'y', 'width', 'value'):
+                if rec[key] is not None:
+                    g.create_dataset(key, data=rec[key])
+            if rec['names'] is not None:
+                g.create_dataset('names', data=np.array(rec['names'], dtype=h5py.string_dtype()))
+            if rec['text'] is not None:
+                g.attrs['text'] = rec['text']
+
+
+def write_parquet(fname, records):
+    import pandas as pd
+    df = pd.DataFrame(records, columns=['path', 'label', 'kind', 'units', 'xunits', 'yunits',
+                                        'x', 'y', 'names', 'width', 'value', 'text'])
+    try:
+        df.to_parquet(fname, index=False)
+    except ImportError:
+        raise ImportError("Exporting to parquet requires the pyarrow package.")
+
+
+def export(io, fname, format='parquet'):
+    if format not in FORMATS:
+        raise ValueError('format must be one of %s' % ', '.join(FORMATS))
+    records = collect(io)
+    if format == 'npz':
+        write_npz(fname, records)
+    elif format == 'hdf5':
+        write_hdf5(fname, records)
+    else:
+        write_parquet(fname, records)
@@ -4,8 +4,6 @@ import numpy as np
 import pint
 from .. import ureg, Q_
 
-import matplotlib
-import matplotlib.pyplot as plt
 from IPython.display import display
 import shlex
 
@@ -47,6 +45,7 @@ class Histogram(Node):
         """
         Plot a rappture histogram
         """
+        import matplotlib.pyplot as plt
         plt.style.use('ggplot')
         elem = self.elem
 
@@ -109,6 +108,7 @@ class Histogram(Node):
         return glist
 
     def mplot(self, ax=None, horizontal=None, stacked=False):
+        import matplotlib.pyplot as plt
         elem = self.elem
 
         if ax is None:
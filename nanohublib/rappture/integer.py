@@ -1,17 +1,24 @@
 from __future__ import print_function
 from .. import ureg, Q_
+from ..units import rap_units
 from io import BytesIO
 import numpy as np
 from .node import Node
 from .number import parse_rap_expr
 from .util import from_rap
-from .. import ui as ui
+from .curve import read_xy, format_xy
+
+# digits after the decimal point written for curve arrays, unless
+# given.  x, y lists and tuples are written at full precision.
+ARRAY_PRECISION = 6
+_DEFAULT = object()
 
 
 class RapInt(Node):
 
     @property
     def w(self):
+        from .. import ui
         vals = from_rap(self)
         w = ui.Integer(
             name=vals['label'],
@@ -86,7 +93,7 @@ class XY(Node):
         val = self.elem.text
         if par.tag == 'curve':
             # return a 2D numpy array
-            res = np.fromstring(val, sep=' \n').reshape(-1, 2)
+            res = read_xy(self.elem, self._xycache()).copy()
         else:
             # return a list of (name, value) tuples
             it = iter(shlex.split(val))
@@ -95,15 +102,49 @@ class XY(Node):
 
     @value.setter
     def value(self, val):
-        if type(val) == np.ndarray:
-            s = BytesIO()
-            np.savetxt(s, val, fmt='%.6e %.6e', newline="\n")
-            res = s.getvalue()
+        self.set_value(val)
+
+    def set_value(self, val, precision=_DEFAULT):
+        """
+        Set the xy data.  Curve data is written with precision digits
+        after the decimal point, in scientific notation.  None writes the
+        shortest text that reads back to the same values.  The default is
+        ARRAY_PRECISION for arrays and None for x, y lists and tuples.
+        Quantities are converted to the units of each axis.
+        """
+        if precision is _DEFAULT:
+            precision = None if isinstance(val, (list, tuple)) else ARRAY_PRECISION
+        par = self.elem.find('../..')
+        if par is not None and par.tag == 'curve':
+            axes = [par.find(axis) for axis in ('xaxis/units', 'yaxis/units')]
+            if hasattr(val, 'magnitude') and not isinstance(val, (list, tuple)):
+                # an (N, 2) Quantity
+                val = (val[:, 0], val[:, 1])
+            if isinstance(val, (list, tuple)):
+                # convert quantities to the units of each axis
+                val = [XY.axis_magnitude(v, units) for v, units in zip(val, axes)]
+            res = format_xy(val, precision=precision)
+        elif isinstance(val, np.ndarray):
+            res = format_xy(val, precision=precision)
         elif type(val) == list or type(val) == tuple:
-            val = '\n'.join([' '.join(map(repr, x)) for x in zip(*val)])
             # we need the strings double quoted for tcl
-            res = val.replace("'", '"')
-        self.elem.text = res
+            res = '\n'.join([' '.join(map(XY.tcl_item, x)) for x in zip(*val)])
+        self.set_text(res)
+
+    @staticmethod
+    def axis_magnitude(val, units):
+        if not hasattr(val, 'magnitude'):
+            return val
+        if units is not None and units.text:
+            val = val.to(rap_units(units.text))
+        return val.magnitude
+
+    @staticmethod
+    def tcl_item(x):
+        if isinstance(x, str):
+            return '"%s"' % x
+        # numpy scalars repr as np.float64(..), so use the Python value
+        return repr(getattr(x, 'item', lambda: x)())
 
 
 class RapLog(Node):
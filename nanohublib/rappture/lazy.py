@@ -0,0 +1,82 @@
+from __future__ import print_function
+from lxml import etree as ET
+
+
+"""
+Lazy loading of large Rappture run files.
+
+The file is streamed once with iterparse to build the tree.  The text
+of any element larger than LazyIndex.MINSIZE (usually curve, image
+or field data) is dropped as soon as the element has been parsed, and
+its position in document order is remembered.  When a Node for that
+element (or one of its ancestors) is created, the text is read back
+by streaming the file again up to that position.
+
+lxml does not report byte offsets from iterparse, so the index stores
+element ordinals instead, and materializing is a streaming pass that
+frees elements as it goes.
+"""
+
+# Nodes for these elements do not pull in all their descendants.
+CONTAINERS = ('run', 'input', 'output', 'group', 'phase', 'tool')
+
+
+def _iterparse(fname):
+    return ET.iterparse(fname, events=('start', 'end'),
+                        remove_comments=True, huge_tree=True)
+
+
+class LazyIndex(object):
+
+    MINSIZE = 64 * 1024
+
+    def __init__(self, fname):
+        self.fname = fname
+        # element -> ordinal, for elements whose text was dropped
+        self.pending = {}
+
+    def parse(self):
+        # build the tree, keeping only small text
+        stack = []
+        num = 0
+        context = _iterparse(self.fname)
+        for event, elem in context:
+            if event == 'start':
+                stack.append(num)
+                num += 1
+                continue
+            ordinal = stack.pop()
+            if elem.text is not None and len(elem.text) >= self.MINSIZE:
+                elem.text = None
+                self.pending[elem] = ordinal
+        return ET.ElementTree(context.root)
+
+    def materialize(self, elem, deep=True):
+        if not self.pending or elem is None:
+            return
+        if deep:
+            elems = [e for e in elem.iter() if e in self.pending]
+        elif elem in self.pending:
+            elems = [elem]
+        else:
+            return
+        if elems:
+            self._read(dict((self.pending.pop(e), e) for e in elems))
+
+    def _read(self, wanted):
+        stack = []
+        num = 0
+        for event, elem in _iterparse(self.fname):
+            if event == 'start':
+                stack.append(num)
+                num += 1
+                continue
+            ordinal = stack.pop()
+            if ordinal in wanted:
+                wanted.pop(ordinal).text = elem.text
+                if not wanted:
+                    break
+            # free what we have already streamed past
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
@@ -4,7 +4,54 @@ from copy import deepcopy
 import re
 import os
 import glob
-from .node import Node
+from .node import Node, LRUCache
+
+
+class LoaderExample(object):
+    """
+    The parts of a loader example file that we need: its label,
+    description and parsed tree (for the <current> values).
+    """
+    def __init__(self, fname, key):
+        self.key = key
+        self.tree = ET.parse(fname)
+        root = self.tree.getroot()
+        try:
+            self.label = root.find('about/label').text
+        except AttributeError:
+            self.label = None
+        try:
+            self.desc = root.find('about/description').text
+        except AttributeError:
+            self.desc = ''
+
+
+# example file name -> LoaderExample, for the most recently used files
+_examples = LRUCache(maxsize=64)
+
+
+def read_example(fname):
+    """
+    Returns the LoaderExample for fname.  The file is only
+    parsed again when its mtime or size changes.
+    """
+    st = os.stat(fname)
+    key = (st.st_mtime_ns, st.st_size)
+    ex = _examples.get(fname)
+    if ex is None or ex.key != key:
+        ex = LoaderExample(fname, key)
+        _examples.put(fname, ex)
+    return ex
+
+
+def example_files(dirname, loader):
+    # all the example files a loader element refers to
+    for ex in loader.findall('example'):
+        path = os.path.join(dirname, "rappture", "examples", ex.text)
+        for file in glob.glob(path):
+            if file.endswith('.'):
+                continue
+            yield file
 
 
 class RapLoader(Node):
@@ -19,15 +66,11 @@ class RapLoader(Node):
         if not os.path.isfile(fname):
             fname = None
             # if fname is a label, search loader files for the one with that label
-            for ex in self.elem.findall('example'):
-                path = os.path.join(self.top.dirname, "rappture", "examples", ex.text)
-                for file in glob.glob(path):
-                    new_tree = ET.parse(file)
-                    label = new_tree.find('about/label').text
-                    if label == flabel:
-                        fname = file
-                        break
-        
+            for file in example_files(self.top.dirname, self.elem):
+                if read_example(file).label == flabel:
+                    fname = file
+                    break
+
         if fname is None:
             raise ValueError('"No loader file with label "%s"' % flabel)
         RapLoader.load(self.tree, self.elem, self.child, fname)
@@ -86,7 +129,7 @@ class RapLoader(Node):
     @staticmethod
     def load(tree, elem, current, fname):
         # print("RapLoad", elem, current.text, fname)
-        new_tree = ET.parse(fname)
+        new_tree = read_example(fname).tree
         label = new_tree.find('about/label').text
         current.text = label
         start = new_tree.find('input')
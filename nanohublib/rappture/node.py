@@ -1,15 +1,8 @@
 from __future__ import print_function
 from lxml import etree as ET
 import numpy as np
-from bs4 import BeautifulSoup
-
-
-import pint
-from .. import ureg, Q_
-from base64 import b64decode, b64encode
-import zlib
-import imghdr
-from IPython.display import HTML
+from collections import OrderedDict
+from functools import lru_cache
 
 
 """
@@ -59,6 +52,7 @@ def _parse_rappath(path):
     return res
 
 
+@lru_cache(maxsize=4096)
 def _to_xpath(path):
     xpath = []
     for a in _parse_rappath(path):
@@ -99,6 +93,43 @@ def _create_path(root, path):
     return root
 
 
+class LRUCache(object):
+    """
+    Small bounded mapping that drops the least recently used entry.
+
+    RapXML uses one to map full Rappture paths to lxml elements.  Only
+    successful lookups are stored, so newly created elements never hide
+    behind a cached miss.  Anything that can remove or replace elements
+    (loaders, a new run.xml) must call clear().  Another maps <xy>
+    elements to their parsed curve data, and loader.py keeps parsed
+    example files in one.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, path):
+        elem = self.data.get(path)
+        if elem is not None:
+            self.data.move_to_end(path)
+        return elem
+
+    def put(self, path, elem):
+        self.data[path] = elem
+        self.data.move_to_end(path)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def pop(self, key):
+        self.data.pop(key, None)
+
+    def clear(self):
+        self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
 class Node(object):
     def __init__(self, top, tree, path, elem=None, child=None):
         self.top = top
@@ -107,6 +138,26 @@ class Node(object):
         self.elem = elem
         self.child = child
 
+    def _find(self, path):
+        # find the xml element from a node path, using the
+        # path cache of the top RapXML object when it is for this tree
+        cache = getattr(self.top, 'pcache', None)
+        if cache is None or self.top.tree is not self.tree:
+            return self.tree.find(_to_xpath(path))
+        x = cache.get(path)
+        if x is None:
+            x = self.tree.find(_to_xpath(path))
+            if x is not None:
+                cache.put(path, x)
+        return x
+
+    def _xycache(self):
+        # the curve data cache of the top RapXML object when it is for this tree
+        cache = getattr(self.top, 'xycache', None)
+        if cache is None or self.top.tree is not self.tree:
+            return None
+        return cache
+
     def create(self, path='', create=False):
         # print("Create", self.path, path)
         if self.path != '':
@@ -116,12 +167,10 @@ class Node(object):
                 path = self.path
 
         # print("create", path)
-        # find the xml element from a node path
-        xpath = _to_xpath(path)
         if create:
             x = _create_path(self.tree.getroot(), path)
         else:
-            x = self.tree.find(xpath)
+            x = self._find(path)
 
         if x is None:
             return None
@@ -132,6 +181,12 @@ class Node(object):
         else:
             child = x.find('current')
 
+        # read back any text left out by a lazy load
+        lazy = getattr(self.top, 'lazy', None)
+        if lazy is not None and self.top.tree is self.tree:
+            lazy.materialize(x, deep=x.tag not in CONTAINERS)
+            lazy.materialize(child)
+
         # Create an object corresponding to the tag.
         if x.tag == 'curve':
             return Curve(self.top, self.tree, path, x, child)
@@ -195,6 +250,9 @@ class Node(object):
             self.child.text = val
         else:
             self.elem.text = val
+            cache = self._xycache()
+            if cache is not None:
+                cache.pop(self.elem)
 
     @property
     def value(self):
@@ -231,8 +289,10 @@ class Node(object):
         if self.path == '':
             elem = self.tree.getroot()
         else:
-            xpath = _to_xpath(self.path)
-            elem = self.tree.find(xpath)
+            elem = self._find(self.path)
+        lazy = getattr(self.top, 'lazy', None)
+        if lazy is not None and self.top.tree is self.tree:
+            lazy.materialize(elem)
         xml = ET.tostring(elem, pretty_print=pretty)
         if header is True:
             xml = b'<?xml version="1.0"?>\n' + xml
@@ -259,3 +319,4 @@ from .image import RapImage
 from .number import Number
 from .integer import RapInt, RapBool, XY, RapMinMax, RapLog
 from .loader import RapLoader
+from .lazy import CONTAINERS
@@ -1,8 +1,8 @@
 from __future__ import print_function
 from .. import ureg, Q_
 from .node import Node
-from .. import ui as ui
 from .util import from_rap
+from ..units import rap_units, parse_value, convert
 
 
 def parse_rap_expr(units, val):
@@ -13,13 +13,10 @@ def parse_rap_expr(units, val):
         return val
 
     # Rappture compatibility. C is Celsius, not Coulombs
-    if units == 'C':
-        units = ureg.degC
-    else:
-        try:
-            units = ureg.parse_expression(units).units
-        except:
-            pass
+    try:
+        units = rap_units(units)
+    except:
+        pass
 
     # Another Rappture compatibility hack
     if type(units) == str and units.startswith('/'):
@@ -29,15 +26,15 @@ def parse_rap_expr(units, val):
         except:
             return val
     try:
-        val = ureg.parse_expression(val)
-        if hasattr(val, 'units'):
-            if val.units == ureg.coulomb and (units == ureg.K or units == ureg.degC):
-                # C -> Celsius
-                val = Q_(val.magnitude, ureg.degC)
-            val = val.to(units)
-        else:
-            val = Q_(val, units)
-        return val
+        mag, vunits = parse_value(val)
+        if vunits is None:
+            return Q_(mag, units)
+        if vunits == ureg.coulomb and (units == ureg.K or units == ureg.degC):
+            # C -> Celsius
+            vunits = ureg.degC
+        if type(units) == str:
+            return Q_(mag, vunits).to(units)
+        return Q_(convert(mag, vunits, units), units)
     except:
         raise ValueError("Bad input value.")
 
@@ -46,6 +43,7 @@ class Number(Node):
 
     @property
     def w(self):
+        from .. import ui
         vals = from_rap(self)
         w = ui.Number(
             name=vals['label'],
@@ -65,7 +63,7 @@ class Number(Node):
         if units:
             if u is None or u.text == '':
                 return ''
-            return ureg.parse_expression(u.text).units
+            return rap_units(u.text)
         if u is None or u == '' or (type(u) == str and u.startswith('/')):
             return float(val)
 
@@ -102,16 +100,10 @@ class Number(Node):
         # Rappture wants units and we have them
 
         # convert Rappture units to PINT units
-        if uelem.text == 'C':
-            units = ureg.degC
-        else:
-            units = ureg.parse_expression(uelem.text).units
-
-        # let PINT do the conversion
-        val = val.to(units)
+        units = rap_units(uelem.text)
 
         # a Rappture-friendly string
-        self.set_text('%s %s' % (val.magnitude, uelem.text))
+        self.set_text('%s %s' % (convert(val.magnitude, val.units, units), uelem.text))
 
     @property
     def magnitude(self):
@@ -10,12 +10,12 @@
 # ======================================================================
 from __future__ import print_function
 import os
-import pandas as pd
 from IPython.display import Markdown, display
-from .node import Node
+from .node import Node, LRUCache
 from lxml import etree as ET
-from glob import glob
-from .loader import RapLoader
+from .loader import RapLoader, read_example, example_files
+from .lazy import LazyIndex
+from . import export as _export
 #qgrid.enable()
 
 
@@ -47,11 +47,20 @@ def get_elem_info(elem):
 
 class RapXML(Node):
 
-    def __init__(self, fname):
+    def __init__(self, fname, lazy=False):
+        """
+        fname is the Rappture xml file to load.  With lazy=True, large
+        text (curves, images, ...) is not kept in memory and is only read
+        from the file when the element is accessed.
+        """
         self.fname = fname
-        parser = ET.XMLParser(remove_comments=True)
-        self.tree = ET.parse(fname, parser)
+        self.lazy = None
+        self.lazy_mode = lazy
+        self.tree = self.parse(fname)
         self.path = ''
+        self.pcache = LRUCache()
+        # <xy> element -> parsed curve data
+        self.xycache = LRUCache(maxsize=32)
         try:
             self.dirname = self.tree.find('tool/version/application/directory[@id]').text
             self.dirname = os.path.split(self.dirname)[0]
@@ -63,10 +72,29 @@ class RapXML(Node):
 
         RapLoader.copy_defaults(self.tree, reset=False)
         self.top = self
-        self.info = RapXMLInfo(self)
-        
+        self._info = None
+
+    def parse(self, fname):
+        if self.lazy_mode:
+            self.lazy = LazyIndex(fname)
+            return self.lazy.parse()
+        self.lazy = None
+        parser = ET.XMLParser(remove_comments=True)
+        return ET.parse(fname, parser)
+
     def reload(self):
-        self.info = RapXMLInfo(self)
+        # Elements may have been replaced, so cached lookups are stale.
+        # The info tables are only marked dirty here and rebuilt the
+        # next time they are needed, so setting values in a loop does
+        # not rescan the tree and the loader example files every time.
+        self.pcache.clear()
+        self._info = None
+
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = RapXMLInfo(self)
+        return self._info
 
     def _load_loaders(self):
         # now load all the default loaders
@@ -77,64 +105,65 @@ class RapXML(Node):
             if current is None:
                 current = ET.SubElement(loader, 'current')
 
-            for ex in loader.findall('example'):
-                path = os.path.join(self.dirname, "rappture", "examples", ex.text)
-                # print("path=", path)
-                for file in glob(path):
-                    if os.path.basename(file) == default.text:
-                        RapLoader.load(self.tree, loader, current, file)
-                        break
-    
-    def set_input(self, label, val):
-        match = self.info.in_df[self.info.in_df['Label'] == label].index.tolist()
-        if len(match) == 0:
-            # maybe a loader?
-            match = self.info.loader_df[self.info.loader_df['Label'] == label].index.tolist()
-            if len(match) > 0:
-                match = [match[0]]
-        if len(match) == 0:
+            for file in example_files(self.dirname, loader):
+                if os.path.basename(file) == default.text:
+                    RapLoader.load(self.tree, loader, current, file)
+                    break
+
+    @staticmethod
+    def _match(paths):
+        if not paths:
             raise ValueError("No matches with that label.")
-        if len(match) > 1:
-            raise ValueError("Error: %d labels match." % len(match))
-        self[match[0]] = val
+        if len(paths) > 1:
+            raise ValueError("Error: %d labels match: %s" % (len(paths), ', '.join(paths)))
+        return paths[0]
 
-    def get_input(self, label):
-        match = self.info.in_df[self.info.in_df['Label'] == label].index.tolist()
-        if len(match) == 0:
+    def _input_path(self, label):
+        paths = self.info.in_index.get(label)
+        if not paths:
             # maybe a loader?
-            match = self.info.loader_df[self.info.loader_df['Label'] == label].index.tolist()
-            if len(match) > 0:
-                match = [match[0]]
-        if len(match) == 0:            
-            raise ValueError("No matches with that label.")
-        if len(match) > 1:
-            raise ValueError("Error: %d labels match." % len(match))
-        return self[match[0]]
+            paths = self.info.loader_index.get(label, [])[:1]
+        return RapXML._match(paths)
+
+    def _output_path(self, label):
+        return RapXML._match(self.info.out_index.get(label))
+
+    def set_input(self, label, val):
+        self[self._input_path(label)] = val
+
+    def set_inputs(self, vals):
+        """
+        Set many inputs at once from a dictionary of {label: value}.
+        All labels are checked before anything is changed.
+        """
+        paths = [(self._input_path(label), val) for label, val in vals.items()]
+        for path, val in paths:
+            self.create(path, create=True).value = val
+        self.reload()
+
+    def get_input(self, label):
+        return self[self._input_path(label)]
 
     def set_output(self, label, val):
-        match = self.info.out_df[self.info.out_df['Label'] == label].index.tolist()
-        if len(match) == 0:
-            raise ValueError("No matches with that label.")
-        if len(match) > 1:
-            raise ValueError("Error: %d labels match." % len(match))
-        self[match[0]] = val
+        self[self._output_path(label)] = val
 
     def get_output(self, label):
-        match = self.info.out_df[self.info.out_df['Label'] == label].index.tolist()
-        if len(match) == 0:            
-            raise ValueError("No matches with that label.")
-        if len(match) > 1:
-            raise ValueError("Error: %d labels match." % len(match))
-        return self[match[0]]
+        return self[self._output_path(label)]
 
     def create_input_widget(self, label):
-        match = self.info.in_df[self.info.in_df['Label'] == label].index.tolist()
-        if len(match) == 0:
-            raise ValueError("No matches with that label.")
-        if len(match) > 1:
-            raise ValueError("Error: %d labels match." % len(match))
-        return self[match[0]].w
+        return self[RapXML._match(self.info.in_index.get(label))].w
+
+
+    def export(self, fname, format='parquet'):
+        """
+        Write all outputs to a single file.
 
+        format is 'parquet' (one row per output, needs pyarrow),
+        'npz' (arrays named <path>.x, <path>.y, ... and a JSON
+        '__meta__' entry with labels and units) or 'hdf5' (one group
+        per output with labels and units as attributes, needs h5py).
+        """
+        _export.export(self, fname, format=format)
 
     def _ipython_display_(self):
         if self.info.in_df.size:
@@ -181,6 +210,7 @@ class RapXMLInfo(object):
             self.parse_elem('', outputs)
 
         # save all data in dataframes
+        import pandas as pd
         self.in_df = pd.DataFrame(data=self.ilist, columns=['Path', 'Label', 'Description'])
         self.in_df = self.in_df.set_index('Path')
         self.out_df = pd.DataFrame(data=self.olist, columns=['Path', 'Label', 'Group', 'Description'])
@@ -189,6 +219,33 @@ class RapXMLInfo(object):
                                                                 'File', 'FileLabel', 'FileDescription'])
         self.loader_df = self.loader_df.set_index('Path')
 
+        # label -> list of paths, for the label based accessors
+        self.in_index = RapXMLInfo.make_index(self.ilist)
+        self.out_index = RapXMLInfo.make_index(self.olist)
+        self.loader_index = RapXMLInfo.make_index(self.llist)
+
+    @staticmethod
+    def make_index(lst):
+        index = {}
+        for path, label in zip(lst['Path'], lst['Label']):
+            paths = index.setdefault(label, [])
+            # loaders have one row per example file
+            if path not in paths:
+                paths.append(path)
+        return index
+
+    def duplicates(self):
+        """
+        Returns a dictionary of input and output labels that
+        match more than one path.
+        """
+        dups = {}
+        for index in (self.in_index, self.out_index):
+            for label, paths in index.items():
+                if len(paths) > 1:
+                    dups.setdefault(label, []).extend(paths)
+        return dups
+
     def append(self, path, elem):
         pid, label, group, desc = get_elem_info(elem)
         if pid:
@@ -221,25 +278,15 @@ class RapXMLInfo(object):
             except:
                 pass
             # print("LOADER: label=%s path=%s desc=%s" % (label, path, desc))
-            for ex in elem.findall('example'):
-                # print('ex=', ex.text)
-                fpath = '%s/rappture/examples/%s' % (tdir, ex.text)
-                for file in glob(fpath):
-                    if file.endswith('.'):
-                        continue
-                    r = ET.parse(file).getroot()
-                    flabel = r.find('about/label').text
-                    try:
-                        fdesc = r.find('about/description').text
-                    except:
-                        fdesc = ''
-                    # print(file, flabel, fdesc)
-                    self.llist['Path'].append(path)
-                    self.llist['Label'].append(label)
-                    self.llist['Description'].append(desc)
-                    self.llist['File'].append(file)
-                    self.llist['FileLabel'].append(flabel)
-                    self.llist['FileDescription'].append(fdesc)
+            for file in example_files(tdir, elem):
+                ex = read_example(file)
+                # print(file, ex.label, ex.desc)
+                self.llist['Path'].append(path)
+                self.llist['Label'].append(label)
+                self.llist['Description'].append(desc)
+                self.llist['File'].append(file)
+                self.llist['FileLabel'].append(ex.label)
+                self.llist['FileDescription'].append(ex.desc)
         except:
             pass
 
@@ -0,0 +1,151 @@
+from __future__ import print_function
+import os
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .rappture import RapXML
+from .curve import Curve
+
+
+def _file_key(fname):
+    st = os.stat(fname)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _find(io, path):
+    # a Rappture path, or the label of an input or output.  A label
+    # used by both must be given as 'input:label' or 'output:label'.
+    kind, sep, label = path.partition(':')
+    if sep and kind == 'input':
+        return io.get_input(label)
+    if sep and kind == 'output':
+        return io.get_output(label)
+    node = io[path]
+    if node is not None:
+        return node
+    found = []
+    for get in (io.get_input, io.get_output):
+        try:
+            found.append(get(path))
+        except ValueError:
+            pass
+    if not found:
+        raise ValueError("No input or output with the label '%s'." % path)
+    if len(found) > 1:
+        raise ValueError("'%s' is the label of an input and an output. "
+                         "Use 'input:%s' or 'output:%s'." % (path, path, path))
+    return found[0]
+
+
+def _value(node):
+    # returns (value, units) in a form that can be sent between processes
+    if isinstance(node, Curve):
+        return np.array(node.data), ''
+    val = node.value
+    if hasattr(val, 'magnitude'):
+        return val.magnitude, '{:~}'.format(val.units)
+    return val, ''
+
+
+def _extract(fname, paths):
+    io = RapXML(fname, lazy=True)
+    return _file_key(fname), dict((p, _value(_find(io, p))) for p in paths)
+
+
+class RunSet(object):
+    """
+    A set of Rappture run files, for example the results of a sweep.
+
+    Values are extracted from the files in parallel worker processes
+    and cached, so asking again for the same paths only reads files
+    that have changed since.
+
+    The worker processes are started the first time they are needed
+    and kept until close() is called, or the end of a with block.
+
+    :param pattern: glob pattern for the run files, e.g. 'runs/run*.xml'
+    :param processes: Number of worker processes.  Default is the number
+        of CPUs.  Use 1 to read the files in this process.
+    """
+
+    def __init__(self, pattern, processes=None):
+        self.pattern = pattern
+        self.processes = processes
+        self.pool = None
+        self.files = sorted(glob(pattern))
+        # fname -> (file key, {path: (value, units)})
+        self.cache = {}
+        self.units = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def refresh(self):
+        """Look for new or removed files matching the pattern."""
+        self.files = sorted(glob(self.pattern))
+
+    def extract(self, paths):
+        """
+        Returns a dictionary of {fname: {path: value}}.  Paths are Rappture
+        paths or labels, with an 'input:' or 'output:' prefix for labels
+        used by both.  Curves are (N, 2) arrays and numbers are
+        magnitudes; their units are saved in self.units.
+        """
+        todo = []
+        for fname in self.files:
+            ent = self.cache.get(fname)
+            if ent is None or ent[0] != _file_key(fname):
+                self.cache[fname] = ent = (None, {})
+            missing = [p for p in paths if p not in ent[1]]
+            if missing:
+                todo.append((fname, missing))
+
+        if len(todo) > 1 and self.processes != 1:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.processes)
+            futures = [(f, self.pool.submit(_extract, f, p)) for f, p in todo]
+            results = [(f, fut.result()) for f, fut in futures]
+        else:
+            results = [(f, _extract(f, p)) for f, p in todo]
+
+        for fname, (key, vals) in results:
+            self.cache[fname] = (key, dict(self.cache[fname][1], **vals))
+
+        res = {}
+        for fname in self.files:
+            vals = self.cache[fname][1]
+            res[fname] = {}
+            for p in paths:
+                val, units = vals[p]
+                if units:
+                    self.units[p] = units
+                res[fname][p] = val
+        return res
+
+    def dataframe(self, paths):
+        """
+        Returns a DataFrame with one row per file and one column per path.
+        """
+        import pandas as pd
+        vals = self.extract(paths)
+        return pd.DataFrame([vals[f] for f in self.files], index=self.files, columns=paths)
+
+    def curves(self, path):
+        """
+        Returns the curve at path from every file, stacked into
+        an array of shape (number of files, N, 2).
+        """
+        vals = self.extract([path])
+        data = [vals[f][path] for f in self.files]
+        if len(set(d.shape for d in data)) > 1:
+            raise ValueError("Curves have different lengths.")
+        return np.stack(data)
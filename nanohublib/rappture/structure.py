@@ -5,8 +5,6 @@ import pint
 from .. import ureg, Q_
 
 import os
-import matplotlib
-import matplotlib.pyplot as plt
 from IPython.display import display
 import tempfile
 try:
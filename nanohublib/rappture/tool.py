@@ -1,6 +1,4 @@
 from __future__ import print_function
-from nanohublib.tool.input_types import *
-from nanohublib.tool import get_inputs
 import numpy as np
 from lxml import etree as ET
 import os
@@ -10,13 +8,14 @@ from .rappture import RapXML
 
 
 class Tool(RapXML):
-    def __init__(self, tool):
+    def __init__(self, tool, lazy=False):
         """
         tool can be any of the following:
 
         - Path to a tool.xml file.
         - Name of a published tool.  The current version will be run.
 
+        With lazy=True, run outputs are loaded lazily (see RapXML).
         """
         dirname, xml = os.path.split(tool)
         if dirname == "":
@@ -54,6 +53,7 @@ class Tool(RapXML):
         self.sessdir = sessdir
         self.tool = xml
         RapXML.__init__(self, xml)
+        self.lazy_mode = lazy
 
     def run(self, verbose=False):
         with open(self.driver_name, 'w') as f:
@@ -92,7 +92,7 @@ class Tool(RapXML):
                 break
 
         if run_name is not None:
-            self.tree = ET.parse(run_name)
+            self.tree = self.parse(run_name)
 
         os.chdir(cwd)
         self.reload()
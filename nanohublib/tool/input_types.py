@@ -23,7 +23,7 @@
 #  Authors:
 #  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
 
-from .. import ureg
+from ..units import get_registry, parse_value, convert
 from papermill.iorw import load_notebook_node
 import papermill as pm
 import yaml
@@ -144,10 +144,20 @@ def parse(inputs):
             print('Unknown type:', t, file=sys.stderr)
     return d
 
+def plain(val):
+    """
+    Returns val with numpy arrays and scalars as Python lists and numbers,
+    which is how notebook parameters are written.
+    """
+    if isinstance(val, (np.ndarray, np.generic)):
+        return val.tolist()
+    return val
+
+
 def set_variables(inputs, scope):
     for i in inputs:
         val = inputs[i].value
-        scope[i] = val
+        scope[i] = plain(val)
 
 
 class Integer(Params):
@@ -208,16 +218,47 @@ class Dict(Params):
             res += '    %s: %s\n' % (i, self[i])
         return res
 
+def _parse_units(kwargs):
+    # parse the units before the value is set, so the value setter can use them
+    units = kwargs.get('units')
+    if units:
+        try:
+            kwargs['units'] = get_registry().parse_units(units)
+        except:
+            raise ValueError('Unrecognized units: %s' % units)
+    return kwargs.get('units')
+
+
+def _temp_units(units, vunits):
+    "units of a value vunits, when the value is wanted in units"
+    ureg = get_registry()
+    if units in (ureg.degC, ureg.kelvin, ureg.degF, ureg.degR):
+        if vunits == ureg.coulomb:
+            # we want temp, so 'C' is degC, not coulombs
+            return ureg.degC
+        if vunits == ureg.farad:
+            # we want temp, so 'F' is degF, not farads
+            return ureg.degF
+    elif units in (ureg.delta_degC, ureg.delta_degF):
+        # detect when user means delta temps
+        if vunits == ureg.degC or vunits == ureg.coulomb:
+            return ureg.delta_degC
+        if vunits == ureg.degF or vunits == ureg.farad:
+            return ureg.delta_degF
+    return vunits
+
+
+def _convert(mag, vunits, units):
+    # one multiply and add for the whole array
+    if not isinstance(mag, (int, float)):
+        mag = np.asarray(mag, dtype=float)
+    return convert(mag, _temp_units(units, vunits), units)
+
+
 class Array(Params):
     def __init__(self, **kwargs):
+        self.units = _parse_units(kwargs)
         super(Array, self).__init__(**kwargs)
-        units = kwargs.get('units')
-
-        if units:
-            try:
-                self.units = ureg.parse_units(self.units)
-            except:
-                raise ValueError('Unrecognized units: %s' % self.units)
 
     @property
     def value(self):
@@ -225,8 +266,11 @@ class Array(Params):
 
     @value.setter
     def value(self, newval):
-        if type(newval) is np.ndarray:
-            newval = newval.tolist()
+        if hasattr(newval, 'units'):
+            if self.units:
+                newval = _convert(newval.magnitude, newval.units, self.units)
+            else:
+                newval = np.asarray(newval.magnitude)
         self._value = newval
 
     def __repr__(self):
@@ -246,13 +290,8 @@ class Number(Params):
         # always set these first
         self.min = kwargs.get('min')
         self.max = kwargs.get('max')
-        self.units = kwargs.get('units')
+        self.units = _parse_units(kwargs)
         super(Number, self).__init__(**kwargs)
-        if self.units:
-            try:
-                self.units = ureg.parse_units(self.units)
-            except:
-                raise ValueError('Unrecognized units: %s' % self.units)
 
     @property
     def value(self):
@@ -260,33 +299,23 @@ class Number(Params):
 
     def convert(self, newval):
         "unit conversion with special temperature conversion"
-        units = self.units
-        if units == ureg.degC or units == ureg.kelvin or units == ureg.degF or units == ureg.degR:
-            if newval.units == ureg.coulomb:
-                # we want temp, so 'C' is degC, not coulombs
-                newval = newval.magnitude * ureg.degC
-            elif newval.units == ureg.farad:
-               # we want temp, so 'F' is degF, not farads
-                newval = newval.magnitude * ureg.degF
-        elif units == ureg.delta_degC or units == ureg.delta_degF:
-            # detect when user means delta temps
-            if newval.units == ureg.degC or newval.units == ureg.coulomb:
-                newval = newval.magnitude * ureg.delta_degC
-            elif newval.units == ureg.degF or units == ureg.farad:
-                newval = newval.magnitude * ureg.delta_degF
-        return newval.to(units).magnitude
+        return _convert(newval.magnitude, newval.units, self.units)
 
     @value.setter
     def value(self, newval):
         if self.units and type(newval) == str:
-            newval = ureg.parse_expression(newval)
-            if hasattr(newval, 'units'):
-                newval = self.convert(newval)
+            mag, units = parse_value(newval)
+            if units is None:
+                newval = float(mag)
             else:
-                newval = float(newval)
-        if self.min is not None and newval < self.min:
+                newval = _convert(mag, units, self.units)
+        elif self.units and hasattr(newval, 'units'):
+            newval = self.convert(newval)
+        elif isinstance(newval, (list, tuple)):
+            newval = np.asarray(newval, dtype=float)
+        if self.min is not None and np.any(newval < self.min):
             raise ValueError("Minimum value is %d" % self.min)
-        if self.max is not None and newval > self.max:
+        if self.max is not None and np.any(newval > self.max):
             raise ValueError("Maximum value is %d" % self.max)
         self._value = newval
 
@@ -35,7 +35,7 @@ import plotly
 import IPython
 from IPython.display import display as idisplay, Video, Image
 from base64 import b64decode, b64encode
-from .input_types import parse
+from .input_types import parse, plain
 
 class DB(object):
 
@@ -123,11 +123,11 @@ def rdisplay(nb, name):
 
 def _get_dict(inputs):
     if type(inputs) == dict:
-        return inputs
+        return dict((k, plain(v)) for k, v in inputs.items())
     d = {}
     for i in inputs:
         try:
-            d[i] = inputs[i].value
+            d[i] = plain(inputs[i].value)
         except:
             pass
     return d
@@ -36,4 +36,5 @@ from .modal import Modal
 from .pathselect import PathSelector
 from .command import RunCommand
 from .submit import Submit
+from .submitpool import SubmitPool
 from .uq import UQValue
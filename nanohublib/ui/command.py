@@ -28,17 +28,16 @@ from __future__ import print_function
 import ipywidgets as w
 import sys
 import os
-import fcntl
-import collections
 import signal
 import threading
 import subprocess
-import select
 import time
 import shutil
+import tempfile
 from queue import Queue
-from joblib import Memory
-import uuid
+from .pump import pump, INTERVAL
+from .outbuf import OutputBuffer, MAXSIZE
+from .resultcache import ResultCache, clone_file, make_rname
 
 color_rect = '<svg width="4" height="20"><rect width="4" height="20" style="fill:%s"/></svg>  %s'
 colors = ["rgb(60,179,113)", "rgb(255,165,0)", "rgb(255,99,71)", "rgb(51,153,255"]
@@ -68,6 +67,23 @@ class RunCommand(object):
         name that will be used for the cache directory.
     :param cachecb: Optional function to call when the cache is cleared.
     :param width: Default is 'auto'.
+    :param update_interval: Minimum time in seconds between updates
+        of the output widget.  Default is 0.1.
+    :param maxoutput: Maximum number of bytes of output to keep.
+        The start and the end of the output are kept.
+    :param logfile: Optional file to write all the output to.
+    :param cachesize: Optional limit in bytes on the size of all cached
+        results in cachedir.  The least recently used are removed first.
+    :param revision: Tool revision.  Results from other revisions
+        are not reused.
+    :param scratch: Run each command in a new, empty directory.  Input
+        files passed to run() are copied into it (as copy-on-write
+        clones where the filesystem can), and everything in it is the
+        result.
+        With caching on, the directory is moved into the cache,
+        instead of copying the files newer than the start of the run
+        from the current directory.  done_func is passed the
+        directory of the results.
     """
 
     SIGNALS_TO_NAMES_DICT = dict((getattr(signal, n), n)
@@ -83,7 +99,13 @@ class RunCommand(object):
                  cachename=None,
                  cachedir=None,
                  cachecb=None,
-                 showcache=True):
+                 showcache=True,
+                 update_interval=INTERVAL,
+                 maxoutput=MAXSIZE,
+                 logfile=None,
+                 cachesize=None,
+                 revision=None,
+                 scratch=False):
         self.label = label
         self.tooltip = tooltip
         self.start_func = start_func
@@ -97,7 +119,12 @@ class RunCommand(object):
         self.width = width
         self.cachecb = cachecb
         self.showcache = showcache
-        self.cbuf = collections.deque(maxlen=200)  # circular buffer
+        self.revision = revision
+        self.scratch = scratch
+        self.workdir = None
+        self.cache = None
+        self.update_interval = update_interval
+        self.cbuf = OutputBuffer(maxoutput, spill=logfile)
 
         if start_func is None:
             print("start_func is required", file=sys.stderr)
@@ -113,21 +140,8 @@ class RunCommand(object):
                     print("where you want the cache to be located.", file=sys.stderr)
                     sys.exit(1)
 
-            self.cachedir = os.path.join(os.path.expanduser(cachedir), cachename)
-            self.cachetabdir = os.path.join(self.cachedir, '.cache_table')
-            if not os.path.isdir(self.cachedir):
-                os.makedirs(self.cachedir)
-            memory = Memory(cachedir=self.cachetabdir, verbose=0)
-
-            @memory.cache
-            def make_rname(*args):
-                # uuid should be unique, but check just in case
-                while True:
-                    fname = str(uuid.uuid4()).replace('-', '')
-                    if not os.path.isdir(os.path.join(self.cachedir, fname)):
-                        break
-                return fname
-
+            self.cache = ResultCache(cachedir, cachename, cachesize)
+            self.cachedir = self.cache.dir
             self.make_rname = make_rname
 
         self.but = w.Button(
@@ -158,13 +172,15 @@ class RunCommand(object):
             if self.pid:
                 os.killpg(self.pid, signal.SIGTERM)
 
-    def run(self, cmd, runname=None):
+    def run(self, cmd, runname=None, inputs=None):
         """
         Starts the command.
 
         :param cmd: The Linux shell command to run.        
         :param runname: (Optional) Name for the results.
-                        Required when caching is enabled.
+        :param inputs: (Optional) List of input files.  With caching on,
+                       a cached result is only used if these files, cmd,
+                       runname and the revision are unchanged.
         """
 
         if self.thread:
@@ -181,27 +197,16 @@ class RunCommand(object):
 
         # check cache
         if self.cachename:
-            if runname is None:
-                print("ERROR: run method should be called a runname when caching is on.", file=sys.stderr)
-                return
-            rdir = os.path.join(self.cachedir, runname)
-            tfile = os.path.join(rdir, '.submit_time')
-            if os.path.exists(tfile):
+            self.key = self.cache.key(cmd, inputs or [], self.revision, runname)
+            rdir = self.cache.get(self.key, runname)
+            if rdir is not None:
                 # cache hit
+                tfile = os.path.join(rdir, '.submit_time')
                 try:
                     with open(tfile, 'r') as f:
                         etime = f.read() 
                 except:
                     etime = "unknown"
-                
-                try:
-                    ofile = os.path.join(self.rdir, '.output')
-                    with open(ofile, 'r') as f:
-                        self.output.value = f.read() 
-                except:
-                    self.output.value = ''
-                    self.cbuf.clear()
-
 
                 try:
                     ctime = time.localtime(os.path.getctime(tfile))
@@ -227,6 +232,16 @@ class RunCommand(object):
         
         self.cached = False
 
+        # directory the command runs in
+        self.workdir = None
+        if self.scratch:
+            if self.cachename:
+                self.workdir = self.cache.tmpdir()
+            else:
+                self.workdir = tempfile.mkdtemp(prefix='%s_' % (runname or 'run'), dir='.')
+            for f in inputs or []:
+                clone_file(f, os.path.join(self.workdir, os.path.basename(f)))
+
         self.but.description = 'Cancel'
         self.but.button_style = 'danger'
 
@@ -237,17 +252,12 @@ class RunCommand(object):
     def clear_cache(self, x):
         x.disabled = True
         if x.description == "Clear All":
-            if os.path.exists(self.cachedir):
-                shutil.rmtree(self.cachedir)
-            if os.path.exists(self.cachetabdir):
-                shutil.rmtree(self.cachetabdir)
+            self.cache.clear()
             if self.cachecb:
                 self.cachecb()
             return
 
-        rdir = os.path.join(self.cachedir, self.runname)
-        if os.path.exists(rdir):
-            shutil.rmtree(rdir)
+        self.cache.remove(self.key)
         if self.cachecb:
             self.cachecb()
 
@@ -297,40 +307,35 @@ class RunCommand(object):
         self.w.layout.visibility = 'hidden'
   
     def copy_files(self, start_time, elapsed_time, errNum):
-        rdir = os.path.join(self.cachedir, self.runname)
-
-        # shouldn't happen, but overwrite if it does
-        if os.path.exists(rdir):
-            shutil.rmtree(rdir)
-
         # don't copy canceled runs
         if errNum > 0:
+            if self.workdir:
+                shutil.rmtree(self.workdir, ignore_errors=True)
             return
 
-        # Results are in current working directory.
-        # Use the timestamp to copy all newer files to the cacheName.
-        os.makedirs(rdir)
+        if self.workdir:
+            # the scratch directory holds the results
+            tmp = self.workdir
+        else:
+            # Results are in current working directory.
+            # Copy (clone where possible) all newer files to the cacheName.
+            tmp = self.cache.tmpdir()
+            for ent in os.scandir('.'):
+                if ent.is_file() and ent.stat().st_mtime > start_time:
+                    clone_file(ent.path, os.path.join(tmp, ent.name))
 
         # save output to cache dir
-        outfile = os.path.join(rdir, '.output')
+        outfile = os.path.join(tmp, '.output')
         with open(outfile, 'w') as f:
             f.write(self.output.value)
 
-        files = os.listdir('.')
-        for f in files:
-            if os.path.getmtime(f) > start_time:
-                shutil.copy2(f, rdir)
-
-        with open(os.path.join(rdir, '.submit_time'), 'w') as f:
+        with open(os.path.join(tmp, '.submit_time'), 'w') as f:
             f.write(pretty_time_delta(elapsed_time))
 
-        return rdir
+        return self.cache.commit(self.key, tmp, runname=self.runname)
 
 
 def poll_thread(cmd, self):
-    # set the output encoding
-    outenc = sys.stdout.encoding
-
     start_time = time.time()
     errState = "Start Time: %s" % time.strftime("%H:%M:%S", time.localtime(start_time))
     errNum = 3
@@ -344,6 +349,7 @@ def poll_thread(cmd, self):
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             shell=True,
+            cwd=self.workdir,
             close_fds=True,
             preexec_fn=os.setsid)
     except Exception as e:
@@ -351,51 +357,7 @@ def poll_thread(cmd, self):
         return
 
     self.q.put(child.pid)
-    poller = select.poll()
-    poller.register(child.stdout, select.POLLIN)
-    poller.register(child.stderr, select.POLLIN)
-
-    numfds = 2
-    while numfds > 0:
-        try:
-            r = poller.poll(1)
-        except select.error as err:
-            print(err, file=sys.stderr)
-            break
-        for fd, flags in r:
-            if flags & (select.POLLIN | select.POLLPRI):
-                c = os.read(fd, 4096).decode(outenc)
-                if fd == child.stderr.fileno():
-                    # add some special characters to indicate stderr
-                    if c.endswith('\n'):
-                        c = c[:-1]
-                    c = u'<STDERR> ' + c + u' </STDERR>\n'
-                elif self.outcb:
-                    c = self.outcb(c)
-                # write c to output widget
-                if c:
-                    self.cbuf.append(c)
-            if flags & (select.POLLHUP | select.POLLERR):
-                poller.unregister(fd)
-                numfds -= 1
-        self.output.value = ''.join(self.cbuf)
-
-    # drain buffers
-    for fp in [child.stdout, child.stderr]:
-        fcntl.fcntl(fp, fcntl.F_SETFL, os.O_NONBLOCK)
-        while True:
-            c = fp.read(4096).decode(outenc)
-            if len(c) == 0:
-                break
-            if fp == child.stderr:
-                if c.endswith('\n'):
-                    c = c[:-1]
-                c = u'<STDERR> ' + c + u' </STDERR>\n'
-            elif self.outcb:
-                self.outcb(c)
-            # write c to output widget
-            self.cbuf.append(c)
-    self.output.value = ''.join(self.cbuf)
+    pump(child, self.cbuf, self.output, self.outcb, self.update_interval)
     
     pid, exitStatus = os.waitpid(child.pid, 0)
     elapsed_time = time.time() - start_time
@@ -419,7 +381,7 @@ def poll_thread(cmd, self):
             errStr = "\"%s\" failed w/ exit code %d\n" % (cmd, exitStatus)
             errNum = 2
             errState = "Last Run: Failed"
-        c = unicode('\n' + '='*50 + '\n' + errStr + '\n' + '='*50 + '\n')
+        c = '\n' + '='*50 + '\n' + errStr + '\n' + '='*50 + '\n'
         self.cbuf.append(c)
         self.output.value = ''.join(self.cbuf)
 
@@ -431,10 +393,11 @@ def poll_thread(cmd, self):
     if self.cachename:
         rdir = self.copy_files(start_time, elapsed_time, errNum)
     else:
-        rdir = self.runname
+        rdir = self.workdir or self.runname
+    self.cbuf.close()
 
     if self.done_func and errNum == 0:
-        if self.cachename:
+        if self.cachename or self.workdir:
             self.done_func(self, rdir)
         else:
             self.done_func(self)
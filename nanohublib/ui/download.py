@@ -25,7 +25,16 @@
 
 from __future__ import print_function
 import ipywidgets as widgets
+import os
+import sys
+import uuid
+import zipfile
+import threading
 from IPython.display import display, Javascript
+from traitlets import Unicode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+import anywidget
 
 
 # recommended icons: download, arrow-circle-down, cloud-download
@@ -37,7 +46,327 @@ from IPython.display import display, Javascript
 # warning = orange
 # danger = red
 
+# Besides a plain link, Download can stream a file, a directory (as a
+# zip archive built on the fly) or the output of a generator, either
+# over the widget comm in binary chunks or through a local HTTP server
+# that supports Range requests.
+CHUNK = 1024 * 1024
+PIPELINE = 4
+MODES = ('link', 'comm', 'http')
+# where the browser reaches the HTTP server, through jupyter-server-proxy
+PROXY_URL = os.environ.get('JUPYTERHUB_SERVICE_PREFIX', '/') + 'proxy/{port}'
+
+
+def iter_file(fname, start=0, end=None, chunk_size=CHUNK):
+    """Yields the bytes of a file from start up to (not including) end."""
+    with open(fname, 'rb') as f:
+        f.seek(start)
+        left = (os.path.getsize(fname) if end is None else end) - start
+        while left > 0:
+            data = f.read(min(chunk_size, left))
+            if not data:
+                break
+            left -= len(data)
+            yield data
+
+
+class _Pipe(object):
+    # write-only, unseekable stream that collects what zipfile writes
+    def __init__(self):
+        self.data = []
+        self.size = 0
+        self.pos = 0
+
+    def write(self, data):
+        self.data.append(bytes(data))
+        self.size += len(data)
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.data)
+        self.data = []
+        self.size = 0
+        return data
+
+
+def iter_zip(path, compression=zipfile.ZIP_DEFLATED, chunk_size=CHUNK):
+    """
+    Yields a zip archive of the directory path as it is built,
+    without writing it to disk.
+    """
+    pipe = _Pipe()
+    top = os.path.dirname(os.path.abspath(path))
+    with zipfile.ZipFile(pipe, 'w', compression=compression, allowZip64=True) as zf:
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                fname = os.path.join(dirpath, name)
+                if not os.path.isfile(fname):
+                    continue
+                arcname = os.path.relpath(os.path.abspath(fname), top)
+                zinfo = zipfile.ZipInfo.from_file(fname, arcname)
+                zinfo.compress_type = compression
+                with open(fname, 'rb') as f, zf.open(zinfo, 'w', force_zip64=True) as dest:
+                    for data in iter(lambda: f.read(chunk_size), b''):
+                        dest.write(data)
+                        if pipe.size >= chunk_size:
+                            yield pipe.take()
+                data = pipe.take()
+                if data:
+                    yield data
+    data = pipe.take()
+    if data:
+        yield data
+
+
+def rechunk(chunks, chunk_size=CHUNK):
+    """Joins small pieces of an iterable of bytes into chunks of about chunk_size."""
+    buf = []
+    size = 0
+    for data in chunks:
+        buf.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(buf)
+            buf = []
+            size = 0
+    if size:
+        yield b''.join(buf)
+
+
+def open_source(source, start=0, end=None, chunk_size=CHUNK):
+    """
+    Returns an iterator over the bytes of source: a file, a directory
+    (zipped) or a function returning an iterable of bytes.  Ranges only
+    apply to files.
+    """
+    if callable(source):
+        return rechunk(source(), chunk_size)
+    if os.path.isdir(source):
+        return iter_zip(source, chunk_size=chunk_size)
+    return iter_file(source, start, end, chunk_size)
+
+
+def source_size(source):
+    """Size in bytes of source, or None if it is not known in advance."""
+    if callable(source) or os.path.isdir(source):
+        return None
+    return os.path.getsize(source)
+
+
+def parse_range(header, size):
+    """
+    Parses a single 'bytes=start-end' Range header for a file of size bytes.
+    Returns (start, end) with end exclusive, None to send the whole file,
+    or raises ValueError if the range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            start = size - int(last)
+            end = size
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size)
+    if start >= end:
+        raise ValueError('unsatisfiable range %s' % header)
+    return start, end
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body=True):
+        token, _, _ = self.path.lstrip('/').partition('/')
+        ent = self.server.sources.get(token)
+        if ent is None:
+            self.send_error(404)
+            return
+        source, name, chunk_size = ent
+        try:
+            size = source_size(source)
+        except OSError:
+            # removed since it was added
+            self.send_error(404)
+            return
+        start, end = 0, size
+        status = 200
+        if size is not None:
+            try:
+                rng = parse_range(self.headers.get('Range'), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */%d' % size)
+                self.end_headers()
+                return
+            if rng is not None:
+                start, end = rng
+                status = 206
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Disposition', "attachment; filename*=UTF-8''%s" % quote(name))
+        if size is None:
+            self.send_header('Accept-Ranges', 'none')
+        else:
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Content-Length', str(end - start))
+            if status == 206:
+                self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, end - 1, size))
+        self.end_headers()
+        if not body:
+            return
+        try:
+            for data in open_source(source, start, end, chunk_size):
+                self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # the browser canceled the download
+            pass
+        except OSError as e:
+            # the source went away after the headers were sent.  Closing
+            # the connection early tells the browser the download failed.
+            print("Error downloading %s: %s" % (name, e), file=sys.stderr)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloadServer(object):
+    """
+    A small HTTP server in a background thread that serves the sources
+    added to it.  Files support Range requests, so browsers can resume
+    interrupted downloads.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.sources = {}
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def add(self, source, name, chunk_size=CHUNK):
+        """Serve source as name.  Returns its path on the server."""
+        token = uuid.uuid4().hex
+        self.httpd.sources[token] = (source, name, chunk_size)
+        return '/%s/%s' % (token, quote(name))
+
+    def remove(self, path):
+        self.httpd.sources.pop(unquote(path).lstrip('/').partition('/')[0], None)
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server():
+    """The DownloadServer shared by all Download widgets, started on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = DownloadServer()
+    return _server
+
+
+class DownloadWidget(anywidget.AnyWidget):
+    _esm = """
+    export default {
+        render({ model, el }) {
+            let button = document.createElement('button');
+            button.setAttribute('class', model.get('button_class'));
+            if (model.get('icon')) {
+                let icon = document.createElement('i');
+                icon.setAttribute('class', 'fa fa-' + model.get('icon'));
+                button.appendChild(icon);
+                button.appendChild(document.createTextNode(' '));
+            }
+            button.appendChild(document.createTextNode(model.get('label')));
+            button.title = model.get('tooltip');
+            el.appendChild(button);
+
+            let chunks = [];
+
+            button.addEventListener('click', function () {
+                chunks = [];
+                button.disabled = true;
+                model.send({event: 'start', offset: 0});
+            });
+
+            model.on('msg:custom', function (msg, buffers) {
+                if (msg.event == 'chunk') {
+                    chunks.push(buffers[0]);
+                    model.send({event: 'ack', offset: msg.offset});
+                } else if (msg.event == 'done') {
+                    // hand the data to the browser as a file
+                    let url = URL.createObjectURL(new Blob(chunks));
+                    chunks = [];
+                    let a = document.createElement('a');
+                    a.href = url;
+                    a.download = model.get('filename');
+                    document.body.appendChild(a);
+                    a.click();
+                    a.remove();
+                    setTimeout(function () { URL.revokeObjectURL(url); }, 1000);
+                    button.disabled = false;
+                } else if (msg.event == 'error') {
+                    console.log("Download error: " + msg.error);
+                    chunks = [];
+                    button.disabled = false;
+                }
+            });
+        }
+    }
+    """
+    filename = Unicode('').tag(sync=True)
+    label = Unicode('').tag(sync=True)
+    icon = Unicode('').tag(sync=True)
+    tooltip = Unicode('').tag(sync=True)
+    button_class = Unicode('').tag(sync=True)
+
+
 class Download(object):
+    """
+    A button that downloads a file to the browser.
+
+    With mode='link' it is a plain link served by the notebook server.
+    This is the default unless source is given or filename is a
+    directory.  mode='comm' streams the data over the widget comm in
+    binary chunks, with a progress bar when the size is known; the
+    browser holds the whole file in memory before saving it, and cb is
+    called when it has received the last chunk.  mode='http' links to
+    a local DownloadServer, which streams to disk and supports Range
+    requests; close() stops serving the source.
+
+    source may be a file, a directory, which is downloaded as a zip
+    archive built on the fly, or a function returning an iterable of
+    bytes.  It defaults to filename.  chunk_size is the size of the
+    streamed chunks, and pipeline is how many chunks mode='comm' sends
+    before waiting for the browser to acknowledge one (default 4).
+    """
 
     def __init__(self, filename, **kwargs):
 
@@ -46,6 +375,20 @@ class Download(object):
         tooltip = kwargs.get('tooltip', '')
         style = kwargs.get('style', '')
         bcb = kwargs.get('cb', None)
+        source = kwargs.get('source', filename)
+        mode = kwargs.get('mode')
+        if mode is None:
+            mode = 'comm' if 'source' in kwargs or os.path.isdir(filename) else 'link'
+        if mode not in MODES:
+            raise ValueError('mode must be one of %s' % ', '.join(MODES))
+        if not callable(source) and os.path.isdir(source) and not filename.endswith('.zip'):
+            filename = os.path.basename(os.path.normpath(filename)) + '.zip'
+        self.mode = mode
+        self.source = source
+        self.filename = filename
+        self.cb = bcb
+        self.chunk_size = kwargs.get('chunk_size', CHUNK)
+        self.pipeline = kwargs.get('pipeline', PIPELINE)
 
         # Create a download link styled as a button
         # This is more robust than Javascript window.open in JupyterLab
@@ -54,11 +397,30 @@ class Download(object):
         btn_class = "p-Widget jupyter-widgets jupyter-button widget-button"
         if style:
             btn_class += f" mod-{style}"
-            
+
+        if mode == 'comm':
+            self.input = DownloadWidget(filename=os.path.basename(filename), label=label,
+                                        icon=icon, tooltip=tooltip, button_class=btn_class)
+            self.input.on_msg(self._msg_received)
+            self.bar = widgets.IntProgress(value=0, min=0, max=100,
+                                           layout=widgets.Layout(visibility='hidden'))
+            self.status = widgets.HTML()
+            self.w = widgets.HBox([self.input, self.bar, self.status])
+            self.chunks = None
+            self.inflight = 0
+            return
+
+        href = filename
+        self.path = None
+        if mode == 'http':
+            server = get_server()
+            self.path = server.add(source, os.path.basename(filename), self.chunk_size)
+            href = kwargs.get('url', PROXY_URL).format(port=server.port) + self.path
+
         icon_html = f'<i class="fa fa-{icon}"></i> ' if icon else ''
         
         html = f'''
-        <a href="{filename}" download="{filename}" class="{btn_class}" style="text-decoration:none; color:inherit; display:inline-block; text-align:center; line-height:28px; padding:0 10px;" target="_blank">
+        <a href="{href}" download="{os.path.basename(filename)}" class="{btn_class}" style="text-decoration:none; color:inherit; display:inline-block; text-align:center; line-height:28px; padding:0 10px;" target="_blank">
             {icon_html}{label}
         </a>
         '''
@@ -72,6 +434,79 @@ class Download(object):
             # without more complex JS/AnyWidget. 
             pass 
 
+    def _msg_received(self, widget, content, buffers):
+        # stream the source, keeping up to pipeline chunks unacknowledged
+        event = content.get('event')
+        if event == 'start':
+            self.sent = content.get('offset', 0)
+            self.inflight = 0
+            try:
+                self.size = source_size(self.source)
+            except OSError as e:
+                self._failed(e)
+                return
+            self.chunks = open_source(self.source, self.sent, None, self.chunk_size)
+            self.bar.bar_style = ''
+            self.bar.layout.visibility = 'visible' if self.size else 'hidden'
+            self._send()
+        elif event == 'ack' and self.inflight > 0:
+            self.inflight -= 1
+            if self.chunks is not None:
+                self._send()
+            elif self.inflight == 0:
+                # the browser has all of it
+                self._finished()
+
+    def _send(self):
+        while self.chunks is not None and self.inflight < self.pipeline:
+            try:
+                data = next(self.chunks, None)
+            except Exception as e:
+                self._failed(e)
+                return
+            if data is None:
+                self.chunks = None
+                self.input.send({'event': 'done', 'size': self.sent})
+                if self.inflight == 0:
+                    self._finished()
+                return
+            self.input.send({'event': 'chunk', 'offset': self.sent}, [data])
+            self.sent += len(data)
+            self.inflight += 1
+            if self.size:
+                self.bar.value = min(100, 100 * self.sent // self.size)
+            self.status.value = pretty_size(self.sent)
+
+    def _failed(self, e):
+        self.chunks = None
+        self.inflight = 0
+        self.bar.bar_style = 'danger'
+        self.status.value = 'Download failed'
+        print("Error downloading %s: %s" % (self.filename, e), file=sys.stderr)
+        self.input.send({'event': 'error', 'error': str(e)})
+
+    def _finished(self):
+        self.bar.value = self.bar.max
+        self.bar.bar_style = 'success'
+        self.status.value = pretty_size(self.sent)
+        if self.cb:
+            self.cb()
+
+    def close(self):
+        """Remove the widget and stop serving the source (mode='http')."""
+        if self.mode == 'http' and self.path is not None:
+            get_server().remove(self.path)
+            self.path = None
+        self.w.close()
+
     def _ipython_display_(self):
         from IPython.display import display
         display(self.w)
+
+
+def pretty_size(num):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num < 1024 or unit == 'GB':
+            break
+        num /= 1024.0
+    return '%.1f %s' % (num, unit) if unit != 'B' else '%d B' % num
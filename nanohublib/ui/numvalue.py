@@ -24,7 +24,7 @@
 #  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
 
 import ipywidgets as widgets
-from .. import ureg
+from ..units import get_registry, parse_units as _parse_units
 
 
 
@@ -44,7 +44,7 @@ def parse_units(xpr):
         ul = '{:~L}'.format(u)
     except:
         try:
-            u = ureg.parse_expression(xpr).units
+            u = _parse_units(xpr)
             us = str(u)
             ul = '{:~L}'.format(u)
         except:
@@ -81,7 +81,7 @@ class NumValue(widgets.HBox):
         if isinstance(x, (int, float)):
             return x
         try:
-            p = ureg.parse_expression(str(x))
+            p = get_registry().parse_expression(str(x))
             if hasattr(p, 'units'):
                 if self.units_str:
                     return p.to(self.units_str).magnitude
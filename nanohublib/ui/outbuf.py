@@ -0,0 +1,180 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+"""
+A size limited buffer for the output of RunCommand and Submit.
+
+The buffer keeps the first `head` bytes of the output and as much of
+the most recent output as fits in the rest of `maxsize`.  Sizes are
+counted in bytes of UTF-8, which is what is sent to the browser, so
+multibyte output cannot use several times the budget.  Output in
+between is dropped a whole line at a time where possible and replaced
+by a note saying how much is missing.  Everything can also be written
+to a log file as it arrives.
+"""
+
+from __future__ import print_function
+import codecs
+import collections
+
+MAXSIZE = 256 * 1024
+HEAD = 32 * 1024
+# give up looking for a line break after this many characters
+MAXLINE = 4096
+
+
+def _nbytes(text):
+    # size of text in UTF-8
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-8', 'replace'))
+
+
+def _nchars(text, nbytes):
+    # number of leading characters of text that fit in nbytes of UTF-8
+    if text.isascii():
+        return min(nbytes, len(text))
+    return len(text.encode('utf-8', 'replace')[:nbytes].decode('utf-8', 'ignore'))
+
+
+class OutputBuffer(object):
+    """
+    Output text with a size limit.
+
+    Use append() to add text and ''.join(buf) or getvalue() to get
+    the text to show.  Call close() at the end of a run to close the
+    spill file.
+
+    :param maxsize: Maximum number of bytes (UTF-8) kept in memory.
+    :param head: How many bytes from the start of the output to
+        keep.  The rest of maxsize holds the end of the output.
+    :param spill: Optional filename.  All the output is written there.
+    """
+
+    def __init__(self, maxsize=MAXSIZE, head=HEAD, spill=None):
+        self.maxsize = maxsize
+        self.headsize = min(head, maxsize)
+        self.spill = spill
+        self.fp = None
+        self.clear()
+
+    def clear(self):
+        self.head = []
+        self.nhead = 0
+        self.head_full = self.headsize == 0
+        self.tail = collections.deque()
+        self.ntail = 0
+        self.dropped = 0
+        self.total = 0
+        self.close()
+        # the next append truncates the spill file
+        self.mode = 'w'
+
+    def close(self):
+        """Close the spill file.  Text appended later is added to its end."""
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def append(self, text):
+        if not text:
+            return
+        size = _nbytes(text)
+        self.total += size
+        if self.spill:
+            if self.fp is None:
+                self.fp = open(self.spill, self.mode, encoding='utf-8')
+                self.mode = 'a'
+            self.fp.write(text)
+            self.fp.flush()
+
+        if not self.head_full:
+            room = self.headsize - self.nhead
+            if size < room:
+                self.head.append(text)
+                self.nhead += size
+                return
+            # the head is full. End it at a line break if there is one.
+            room = _nchars(text, room)
+            cut = text.rfind('\n', max(0, room - MAXLINE), room) + 1
+            if not cut and not (self.head and self.head[-1].endswith('\n')):
+                cut = room
+            self.head.append(text[:cut])
+            self.nhead += _nbytes(text[:cut])
+            self.head_full = True
+            text = text[cut:]
+            if not text:
+                return
+            size = _nbytes(text)
+
+        self.tail.append(text)
+        self.ntail += size
+        self._trim()
+
+    def _trim(self):
+        limit = self.maxsize - self.nhead
+        while self.ntail > limit:
+            extra = self.ntail - limit
+            first = self.tail[0]
+            size = _nbytes(first)
+            if size <= extra:
+                self.tail.popleft()
+            else:
+                # drop through the end of the line that is cut,
+                # or at least the character that holds byte extra
+                end = _nchars(first, extra)
+                if _nbytes(first[:end]) < extra:
+                    end += 1
+                cut = first.find('\n', end, end + MAXLINE) + 1 or end
+                size = _nbytes(first[:cut])
+                self.tail[0] = first[cut:]
+            self.ntail -= size
+            self.dropped += size
+
+    def append_file(self, fname, chunk=65536):
+        """Append the contents of a (UTF-8) file, a chunk at a time."""
+        dec = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        with open(fname, 'rb') as f:
+            for data in iter(lambda: f.read(chunk), b''):
+                self.append(dec.decode(data))
+        self.append(dec.decode(b'', True))
+
+    def __iter__(self):
+        for c in self.head:
+            yield c
+        if self.dropped:
+            msg = '\n... %d bytes not shown' % self.dropped
+            if self.spill:
+                msg += ' (full output is in %s)' % self.spill
+            yield msg + ' ...\n'
+        for c in self.tail:
+            yield c
+
+    def __len__(self):
+        # bytes kept
+        return self.nhead + self.ntail
+
+    def getvalue(self):
+        return ''.join(self)
@@ -24,22 +24,93 @@
 #  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
 
 import os
+import threading
+import collections
+from fnmatch import fnmatch
 import ipywidgets as ui
 
+# options shown at a time
+PAGE = 1000
+# directory listings kept in the cache
+MAXCACHE = 32
+
+# (path, pattern) -> (directory mtime, options)
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+# option values that move between pages
+PREV = ('page', -1)
+NEXT = ('page', 1)
+
+
+def list_dir(path, pattern=None):
+    """
+    Returns the (label, name) options for the entries of path, sorted,
+    with '[..]' and directories in brackets.  Hidden entries are skipped
+    and files are only listed if they match the glob pattern.  Listings
+    are cached until the directory's mtime changes.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    key = (path, pattern)
+    with _cache_lock:
+        ent = _cache.get(key)
+        if ent is not None and ent[0] == mtime:
+            _cache.move_to_end(key)
+            return ent[1]
+
+    keys = ['[..]']
+    with os.scandir(path) as it:
+        for e in it:
+            if e.name[0] == '.':
+                continue
+            try:
+                isdir = e.is_dir()
+            except OSError:
+                isdir = False
+            if isdir:
+                keys.append('[' + e.name + ']')
+            elif pattern is None or fnmatch(e.name, pattern):
+                keys.append(e.name)
+
+    # Sort and create list of output values
+    keys.sort(key=str.lower)
+    opts = [(k, k[1:-1] if k[0] == '[' else k) for k in keys]
+
+    with _cache_lock:
+        _cache[key] = (mtime, opts)
+        _cache.move_to_end(key)
+        while len(_cache) > MAXCACHE:
+            _cache.popitem(last=False)
+    return opts
+
 
 class PathSelector():
     """
     The PathSelector widget allows the user to choose a path in the server (container).  It cannot access files
     from the user's computer.
 
+    Directories are listed in a background thread, so slow filesystems do not block the notebook,
+    and large directories are shown a page at a time.
+
     :param start_dir: The directory to display.
     :param select_file: True for file select.  False for directory select.
+    :param pattern: Optional glob pattern, for example '*.xml'.  Only files that match are shown.
+    :param page_size: Number of entries shown at a time.  Default is 1000.
+    :param background: List directories in a background thread.  Default is True.
     """
 
-    def __init__(self, start_dir, select_file=True):
+    def __init__(self, start_dir, select_file=True, pattern=None, page_size=PAGE, background=True):
         self.file = None
         self.select_file = select_file
         self.value = start_dir
+        self._pattern = pattern
+        self.page_size = page_size
+        self.background = background
+        self.page = 0
+        self.opts = []
+        self.thread = None
+        # incremented for each listing, so results for a directory the user left are dropped
+        self.gen = 0
         self.select = ui.SelectMultiple(options=['init'], value=(), rows=10, description='')
         self.accord = ui.Accordion(children=[self.select])
 
@@ -49,7 +120,12 @@ class PathSelector():
 
     def on_update(self, change):
         if len(change['new']) > 0:
-            self.refresh(change['new'][0])
+            val = change['new'][0]
+            if val in (PREV, NEXT):
+                self.page += val[1]
+                self.show_page()
+                return
+            self.refresh(val)
 
     def refresh(self, item):
         path = os.path.abspath(os.path.join(self.value, item))
@@ -65,31 +141,62 @@ class PathSelector():
         else:  # os.path.isdir(path)
             self.file = None
             self.value = path
+            self.gen += 1
+            if self.background:
+                self.accord.set_title(0, path + ' (loading)')
+                self.thread = threading.Thread(target=self._load, args=(path, self.gen))
+                self.thread.daemon = True
+                self.thread.start()
+            else:
+                self._load(path, self.gen)
+
+    def _load(self, path, gen):
+        try:
+            opts = list_dir(path, self._pattern)
+            title = path
+        except OSError as e:
+            opts = [('[..]', '..')]
+            title = '%s (%s)' % (path, e.strerror)
+        if gen != self.gen:
+            return
+        self.opts = opts
+        self.page = 0
+        self.show_page(title)
+
+    def show_page(self, title=None):
+        """Show the current page of entries."""
+        num = len(self.opts)
+        start = self.page * self.page_size
+        end = min(start + self.page_size, num)
+        opts = self.opts[start:end]
+        if start > 0:
+            opts.insert(0, ('<< previous %d' % self.page_size, PREV))
+        if end < num:
+            opts.append(('next %d >>' % min(self.page_size, num - end), NEXT))
+        if title is None:
+            title = self.value
+        if num > self.page_size:
+            title += ' [%d-%d of %d]' % (start + 1, end, num)
+
+        # Update widget
+        self.accord.set_title(0, title)
+        self.select.options = opts
+        with self.select.hold_trait_notifications():
+            self.select.value = ()
+
+    def wait(self):
+        """Wait for the directory listing to finish."""
+        if self.thread is not None:
+            self.thread.join()
 
-            # Build list of files and dirs
-            keys = ['[..]']
-            for item in os.listdir(path):
-                if item[0] == '.':
-                    continue
-                elif os.path.isdir(os.path.join(path, item)):
-                    keys.append('[' + item + ']')
-                else:
-                    keys.append(item)
-
-            # Sort and create list of output values
-            keys.sort(key=str.lower)
-            vals = []
-            for k in keys:
-                if k[0] == '[':
-                    vals.append(k[1:-1])  # strip off brackets
-                else:
-                    vals.append(k)
-
-            # Update widget
-            self.accord.set_title(0, path)
-            self.select.options = list(zip(keys, vals))
-            with self.select.hold_trait_notifications():
-                self.select.value = ()
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @pattern.setter
+    def pattern(self, newval):
+        self._pattern = newval
+        self.refresh(self.value)
 
     def _ipython_display_(self):
         from IPython.display import display
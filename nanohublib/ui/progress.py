@@ -0,0 +1,168 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+"""
+Incremental parser for the progress reports of 'submit --progress'.
+
+submit prints lines like
+
+    =SUBMIT-PROGRESS=> aborted=0 finished=3 failed=0 executing=2 waiting=5 setting_up=0 setup=0 %done=30.00 timestamp=1700000000.0
+
+Output arrives in arbitrary pieces, so the parser keeps the partial
+last line until the rest of it arrives.  Every report is added to a
+table, which gives the state counts over time, the changes between
+reports, the throughput and an estimate of the time left.  The
+reports only carry counts, so transitions are per state, not per
+job instance.
+"""
+
+from __future__ import print_function
+import re
+import time
+from .command import pretty_time_delta
+
+STATES = ('aborted', 'finished', 'failed', 'executing', 'waiting', 'setting_up', 'setup')
+# states a job does not leave
+DONE = ('aborted', 'finished', 'failed')
+# progress bars: name, style and the states they count
+BARS = [('Setup', 'warning', ('setting_up', 'setup')),
+        ('Waiting', 'info', ('waiting',)),
+        ('Running', '', ('executing',)),
+        ('Finished', 'success', ('finished',)),
+        ('Failed', 'danger', ('failed',))]
+
+regex = re.compile(r"=SUBMIT-PROGRESS=> aborted=(\d+) finished=(\d+) failed=(\d+) executing=(\d+) waiting=(\d+) setting_up=(\d+) setup=(\d+) %done=(\d*\.\d+|\d+) timestamp=(\d*\.\d+|\d+)")
+
+
+class SubmitProgress(object):
+    """
+    Progress of one submit command.
+
+    Pass its standard output to feed(), and call close() when it
+    ends.  The latest counts are in counts, and every report is a row
+    of table.
+    """
+
+    def __init__(self):
+        self.partial = ''
+        self.table = []
+        self.counts = None
+
+    def feed(self, text):
+        """
+        Parse a piece of standard output.  Returns the complete lines
+        that were not progress reports.
+        """
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        other = []
+        for line in lines:
+            if not self.parse_line(line):
+                other.append(line)
+        return other
+
+    def close(self):
+        """
+        Parse the last line, which may not end in a newline, at the end
+        of the output.  Returns it in a list if it is not a progress report.
+        """
+        line, self.partial = self.partial, ''
+        if not line or self.parse_line(line):
+            return []
+        return [line]
+
+    def parse_line(self, line):
+        """Add the report in line to the table.  Returns False if there is none."""
+        m = regex.search(line)
+        if m is None:
+            return False
+        vals = m.groups()
+        row = dict(zip(STATES, map(int, vals[:7])))
+        row['percent'] = float(vals[7])
+        row['timestamp'] = float(vals[8])
+        row['received'] = time.time()
+        self.table.append(row)
+        self.counts = row
+        return True
+
+    @property
+    def total(self):
+        """Number of jobs (aborted ones are not counted, as submit does)."""
+        if self.counts is None:
+            return 0
+        return sum(self.counts[s] for s in STATES[1:])
+
+    def count(self, *states):
+        if self.counts is None:
+            return 0
+        return sum(self.counts[s] for s in states)
+
+    def transitions(self):
+        """
+        Changes between reports, as a list of (timestamp, state, change)
+        where change is how many more jobs are in state than before.
+        """
+        res = []
+        prev = dict.fromkeys(STATES, 0)
+        for row in self.table:
+            for s in STATES:
+                if row[s] != prev[s]:
+                    res.append((row['timestamp'], s, row[s] - prev[s]))
+            prev = row
+        return res
+
+    def history(self, state):
+        """List of (timestamp, count) for a state."""
+        return [(row['timestamp'], row[state]) for row in self.table]
+
+    def throughput(self):
+        """Jobs completed per minute, or None if it is not known yet."""
+        if len(self.table) < 2:
+            return None
+        first, last = self.table[0], self.table[-1]
+        dt = last['timestamp'] - first['timestamp']
+        done = sum(last[s] - first[s] for s in DONE)
+        if dt <= 0 or done <= 0:
+            return None
+        return 60.0 * done / dt
+
+    def eta(self):
+        """Estimated seconds until all jobs are done, or None."""
+        rate = self.throughput()
+        if rate is None:
+            return None
+        left = self.total - self.count('finished', 'failed')
+        return 60.0 * left / rate
+
+    def summary(self):
+        """A line like '12 of 40 jobs done, 3.5 jobs/min, about 8m0s left'."""
+        msg = '%d of %d jobs done' % (self.count('finished', 'failed'), self.total)
+        rate = self.throughput()
+        if rate is not None:
+            msg += ', %.1f jobs/min' % rate
+            eta = self.eta()
+            if eta:
+                msg += ', about %s left' % pretty_time_delta(eta)
+        return msg
@@ -0,0 +1,106 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+"""
+Copies the output of a child process into a Textarea widget.
+
+The pump blocks in poll() until the child writes something or exits,
+so an idle command costs no CPU.  Output is collected in a buffer and
+the widget is only updated when the buffer has changed, at most once
+every interval seconds, because every update sends the whole text to
+the browser.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import codecs
+import select
+import time
+
+# default time between widget updates (10 Hz)
+INTERVAL = 0.1
+
+
+def stderr_text(c):
+    # add some special characters to indicate stderr
+    if c.endswith('\n'):
+        c = c[:-1]
+    return u'<STDERR> ' + c + u' </STDERR>\n'
+
+
+def pump(child, buf, output, outcb=None, interval=INTERVAL):
+    """
+    Read child.stdout and child.stderr until both are closed.
+
+    :param child: A subprocess.Popen with stdout and stderr pipes.
+    :param buf: Buffer (e.g. an OutputBuffer) the text is appended to.
+    :param output: Widget whose value is set to the joined buffer.
+    :param outcb: Optional function called with each piece of stdout.
+        Whatever it returns is added to the buffer instead.
+    :param interval: Minimum time in seconds between widget updates.
+    """
+    outenc = sys.stdout.encoding or 'utf-8'
+    out_fd = child.stdout.fileno()
+    # decoders keep partial multibyte characters between reads
+    decoders = {}
+    poller = select.poll()
+    for fp in (child.stdout, child.stderr):
+        decoders[fp.fileno()] = codecs.getincrementaldecoder(outenc)(errors='replace')
+        poller.register(fp, select.POLLIN | select.POLLPRI)
+
+    dirty = False
+    last = 0
+    while decoders:
+        timeout = None
+        if dirty:
+            # wake up in time for the next widget update
+            timeout = max(0, 1000 * (last + interval - time.time()))
+        try:
+            r = poller.poll(timeout)
+        except select.error as err:
+            print(err, file=sys.stderr)
+            break
+        for fd, flags in r:
+            data = os.read(fd, 65536)
+            c = decoders[fd].decode(data, final=not data)
+            if not data:
+                poller.unregister(fd)
+                del decoders[fd]
+            if fd == out_fd:
+                if outcb and c:
+                    c = outcb(c)
+            elif c:
+                c = stderr_text(c)
+            if c:
+                buf.append(c)
+                dirty = True
+        if dirty and time.time() - last >= interval:
+            output.value = ''.join(buf)
+            last = time.time()
+            dirty = False
+
+    if dirty:
+        output.value = ''.join(buf)
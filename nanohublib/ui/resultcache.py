@@ -0,0 +1,327 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+"""
+A cache of run results, stored by a hash of what produced them.
+
+The key is a SHA-256 hash of the tool name, the command, the contents
+of the input files, the tool revision and the run name, so a result
+is only reused when all of them match.  Each result is a directory
+
+    <root>/<tool name>/<key>/
+
+holding the files of the run and a .meta file.  Results are written
+to a temporary directory first and renamed into place, so a partly
+written result is never seen.  The modification time of a result
+directory is its last access time.  With maxsize set, the least
+recently used results under root (for all tools) are removed until
+the total size is below it.  The sizes are kept in memory, shared by
+all caches with the same root, and checked against the disk every
+RESCAN seconds, so results written by other processes are counted
+within that time.
+
+Older versions stored a result as <root>/<tool name>/<run name>/.
+get() adopts such a directory (one with a .submit_time file and no
+.meta) the first time it is asked for with that run name: it is
+renamed to the key's directory and counted like any other result.
+Legacy directories that are never asked for are still counted and
+evicted.
+"""
+
+from __future__ import print_function
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from functools import lru_cache
+
+META = '.meta'
+TMP = '.tmp-'
+# legacy results have this file and no META
+LEGACY = '.submit_time'
+# seconds before the in-memory sizes are checked against the disk
+RESCAN = 600
+
+# root -> [time of the last scan, {result directory: [last access time, size]}]
+_indexes = {}
+# Linux ioctl to clone a file (copy-on-write) on btrfs, xfs, ...
+FICLONE = 0x40049409
+
+
+@lru_cache(maxsize=256)
+def _digest(fname, mtime, size):
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def file_digest(fname):
+    """SHA-256 of a file's contents.  Unchanged files are not read again."""
+    st = os.stat(fname)
+    return _digest(os.path.abspath(fname), st.st_mtime_ns, st.st_size)
+
+
+def make_rname(*args):
+    """
+    A run name made from args.  The same args always give the same name,
+    and it has only letters and digits, as submit requires.
+    """
+    return hashlib.sha256(repr(args).encode('utf-8')).hexdigest()[:32]
+
+
+def clone_file(src, dst):
+    """Copy a file, as a copy-on-write clone (reflink) if the filesystem can."""
+    try:
+        import fcntl
+        with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        shutil.copystat(src, dst)
+    except (ImportError, OSError):
+        shutil.copy2(src, dst)
+
+
+def link_file(src, dst):
+    """Hardlink a file, or clone it if that is not possible (e.g. another filesystem)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        clone_file(src, dst)
+
+
+def link_tree(src, dst, link=link_file):
+    """Recreate the directory src as dst, with link (or clone_file) for the files."""
+    if not os.path.isdir(dst):
+        os.makedirs(dst)
+    for ent in os.scandir(src):
+        target = os.path.join(dst, ent.name)
+        if ent.is_symlink():
+            os.symlink(os.readlink(ent.path), target)
+        elif ent.is_dir():
+            link_tree(ent.path, target, link)
+        else:
+            link(ent.path, target)
+
+
+def move_tree(src, dst):
+    """Move the directory src to dst (which must not exist)."""
+    try:
+        os.rename(src, dst)
+    except OSError:
+        # another filesystem
+        link_tree(src, dst)
+        shutil.rmtree(src)
+
+
+def dir_size(path):
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for f in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class ResultCache(object):
+    """
+    Cached results for one tool.
+
+    :param root: Cache directory shared by all tools.
+    :param name: Tool name (the cachename of the widget).
+    :param maxsize: Optional size limit in bytes for everything under root.
+    """
+
+    def __init__(self, root, name, maxsize=None):
+        self.root = os.path.expanduser(root)
+        self.name = name
+        self.dir = os.path.normpath(os.path.join(self.root, name))
+        self.maxsize = maxsize
+        if not os.path.isdir(self.dir):
+            os.makedirs(self.dir)
+
+    def key(self, cmd, files=(), revision=None, runname=None):
+        """Hash of the command, the input files, the tool revision and the run name."""
+        h = hashlib.sha256()
+        for part in (self.name, cmd, revision, runname):
+            h.update(repr(part).encode('utf-8') + b'\0')
+        for fname in sorted(set(files)):
+            h.update(os.path.basename(fname).encode('utf-8') + b'\0')
+            h.update(file_digest(fname))
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.dir, key)
+
+    def get(self, key, runname=None):
+        """
+        Directory of the result for key, or None if it is not cached.
+        With runname, a legacy result stored under the run name is adopted.
+        """
+        rdir = self.path(key)
+        if not os.path.isfile(os.path.join(rdir, META)):
+            if runname is None or not self._adopt(key, runname):
+                return None
+        try:
+            # mark as recently used
+            os.utime(rdir)
+        except OSError:
+            return None
+        index = self._index()
+        if rdir in index:
+            index[rdir][0] = time.time()
+        return rdir
+
+    def _adopt(self, key, runname):
+        # move a legacy <dir>/<runname> result to the directory of key
+        old = os.path.join(self.dir, runname)
+        if os.path.dirname(os.path.normpath(old)) != self.dir or not _legacy(old):
+            return False
+        size = _write_meta(old, key=key, runname=runname, legacy=True,
+                           created=os.path.getmtime(os.path.join(old, LEGACY)))
+        try:
+            os.rename(old, self.path(key))
+        except OSError:
+            return False
+        index = self._index()
+        index.pop(old, None)
+        index[self.path(key)] = [time.time(), size]
+        return True
+
+    def tmpdir(self):
+        """
+        A new directory to put the files of a result in before commit().
+        It is on the same filesystem as the cache, so commit() is a rename.
+        """
+        if not os.path.isdir(self.dir):
+            os.makedirs(self.dir)
+        return tempfile.mkdtemp(prefix=TMP, dir=self.dir)
+
+    def commit(self, key, tmp, **meta):
+        """
+        Move the result in directory tmp into the cache.
+        Returns the directory of the cached result.
+        """
+        meta.update(key=key, created=time.time())
+        size = _write_meta(tmp, **meta)
+        rdir = self.path(key)
+        try:
+            os.rename(tmp, rdir)
+        except OSError:
+            # already there (another run finished first) or an old entry
+            if self.get(key) is None:
+                shutil.rmtree(rdir, ignore_errors=True)
+                os.rename(tmp, rdir)
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+                size = _read_size(rdir)
+        os.utime(rdir)
+        self._index()[rdir] = [time.time(), size]
+        if self.maxsize is not None:
+            self.evict(keep=rdir)
+        return rdir
+
+    def remove(self, key):
+        rdir = self.path(key)
+        shutil.rmtree(rdir, ignore_errors=True)
+        self._index().pop(rdir, None)
+
+    def clear(self):
+        """Remove all results of this tool."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        _indexes.pop(self.root, None)
+
+    def entries(self):
+        """
+        Yields (last access time, size, directory) for every result under root.
+        Legacy results get a .meta file the first time they are seen.
+        """
+        for tool in os.scandir(self.root):
+            if not tool.is_dir():
+                continue
+            for ent in os.scandir(tool.path):
+                if not ent.is_dir() or ent.name.startswith(TMP):
+                    continue
+                try:
+                    if _legacy(ent.path):
+                        size = _write_meta(ent.path, runname=ent.name, legacy=True)
+                    else:
+                        size = _read_size(ent.path)
+                    yield ent.stat().st_mtime, size, ent.path
+                except (OSError, ValueError, KeyError):
+                    # not a cache entry
+                    pass
+
+    def _index(self):
+        # entries() kept in memory, scanning the disk when it is stale
+        ent = _indexes.get(self.root)
+        if ent is None or time.time() - ent[0] > RESCAN:
+            ent = [time.time(), {rdir: [atime, size] for atime, size, rdir in self.entries()}]
+            _indexes[self.root] = ent
+        return ent[1]
+
+    def size(self):
+        return sum(e[1] for e in self._index().values())
+
+    def evict(self, maxsize=None, keep=None):
+        """Remove the least recently used results until the total size is below maxsize."""
+        if maxsize is None:
+            maxsize = self.maxsize
+        index = self._index()
+        total = sum(e[1] for e in index.values())
+        if total <= maxsize:
+            return total
+        for atime, size, rdir in sorted((a, s, d) for d, (a, s) in index.items()):
+            if total <= maxsize:
+                break
+            if rdir == keep:
+                continue
+            shutil.rmtree(rdir, ignore_errors=True)
+            del index[rdir]
+            total -= size
+        return total
+
+
+def _legacy(path):
+    return (os.path.isfile(os.path.join(path, LEGACY)) and
+            not os.path.exists(os.path.join(path, META)))
+
+
+def _write_meta(path, **meta):
+    # write the .meta of a result directory and return its size
+    meta['size'] = dir_size(path)
+    meta.setdefault('created', time.time())
+    with open(os.path.join(path, META), 'w') as f:
+        json.dump(meta, f)
+    return meta['size']
+
+
+def _read_size(path):
+    with open(os.path.join(path, META)) as f:
+        return json.load(f)['size']
@@ -27,20 +27,19 @@
 from __future__ import print_function
 import ipywidgets as w
 import sys
-import re
 import os
-import fcntl
-import collections
 import signal
 import threading
 import subprocess
-import select
 import time
 import shutil
 from queue import Queue
-from joblib import Memory
-import uuid
+from .pump import pump, INTERVAL
+from .outbuf import OutputBuffer, MAXSIZE
+from .resultcache import ResultCache, clone_file, make_rname, move_tree
+from .progress import SubmitProgress, BARS, regex, pretty_time_delta
 import glob
+import tempfile
 
 color_rect = '<svg width="4" height="20"><rect width="4" height="20" style="fill:%s"/></svg>  %s'
 colors = ["rgb(60,179,113)", "rgb(255,165,0)", "rgb(255,99,71)", "rgb(51,153,255"]
@@ -66,14 +65,29 @@ class Submit(object):
         will be empty when this is used.
     :param show_progress: Show progress bar?  Default is True.
     :param width: Default is 'auto'.
+    :param update_interval: Minimum time in seconds between updates
+        of the output widget.  Default is 0.1.
+    :param maxoutput: Maximum number of bytes of output to keep.
+        The start and the end of the output are kept.
+    :param logfile: Optional file to write all the output to.
+    :param cachesize: Optional limit in bytes on the size of all cached
+        results in CACHEDIR.  The least recently used are removed first.
+    :param revision: Tool revision.  Results from other revisions
+        are not reused.
+    :param scratch: Run each submit in a new, empty directory.  Input
+        files passed to run() are copied into it (as copy-on-write
+        clones where the filesystem can), and everything in it is the
+        result.
+        With caching on, the directory is moved into the cache,
+        instead of copying the files newer than the start of the run
+        from the current directory.
     """
     SIGNALS_TO_NAMES_DICT = dict((getattr(signal, n), n)
         for n in dir(signal) if n.startswith('SIG') and '_' not in n)
 
     CACHEDIR = os.path.expanduser('~/data/results/.submit_cache')
-    CACHETABDIR = os.path.expanduser('~/data/results/.submit_cache_table')
 
-    regex = re.compile(r"=SUBMIT-PROGRESS=> aborted=(\d+) finished=(\d+) failed=(\d+) executing=(\d+) waiting=(\d+) setting_up=(\d+) setup=(\d+) %done=(\d*\.\d+|\d+) timestamp=(\d*\.\d+|\d+)")
+    regex = regex
 
     def __init__(self, 
                  label='Run',
@@ -85,7 +99,13 @@ class Submit(object):
                  width='auto',
                  cachename=None,
                  cachecb=None,
-                 showcache=True):
+                 showcache=True,
+                 update_interval=INTERVAL,
+                 maxoutput=MAXSIZE,
+                 logfile=None,
+                 cachesize=None,
+                 revision=None,
+                 scratch=False):
         self.label = label
         self.tooltip = tooltip
         self.start_func = start_func
@@ -98,11 +118,18 @@ class Submit(object):
         self.output = None
         self.show_progress = show_progress
         self.progress = None
+        self.parser = SubmitProgress()
+        self.last_progress = 0
         self.make_rname = None
+        self.cache = None
+        self.revision = revision
+        self.scratch = scratch
+        self.workdir = '.'
         self.width = width
         self.cachecb = cachecb
         self.showcache = showcache
-        self.cbuf = collections.deque(maxlen=200)  # circular buffer
+        self.update_interval = update_interval
+        self.cbuf = OutputBuffer(maxoutput, spill=logfile)
 
         if start_func is None:
             print("start_func is required.", file=sys.stderr)
@@ -110,21 +137,7 @@ class Submit(object):
 
         if cachename:
             # set up cache
-            cachedir = os.path.join(Submit.CACHEDIR, cachename)
-            cachetabdir = os.path.join(Submit.CACHETABDIR, cachename)
-            if not os.path.isdir(cachedir):
-                os.makedirs(cachedir)
-            memory = Memory(location=cachetabdir, verbose=0)
-
-            @memory.cache
-            def make_rname(*args):
-                # uuid should be unique, but check just in case
-                while True:
-                    fname = str(uuid.uuid4()).replace('-', '')
-                    if not os.path.isdir(os.path.join(cachedir, fname)):
-                        break
-                return fname
-
+            self.cache = ResultCache(Submit.CACHEDIR, cachename, cachesize)
             self.make_rname = make_rname
 
         self.but = w.Button(
@@ -188,7 +201,7 @@ class Submit(object):
             self.but.disabled = False
         return True
 
-    def run(self, runname, cmd):
+    def run(self, runname, cmd, inputs=None):
         """
         Starts the submit command.
 
@@ -196,6 +209,9 @@ class Submit(object):
         :param cmd: The command to pass along to the
             command-line submit. Do not include runName
             or progress.
+        :param inputs: Optional list of input files.  With caching on,
+            a cached result is only used if these files, cmd, runname
+            and the revision are unchanged.
         """
 
         if self.thread:
@@ -223,27 +239,33 @@ class Submit(object):
             self.but.disabled = False
             return
 
+        self.rdir = runname
         if self.cachename:
-            self.rdir = os.path.join(Submit.CACHEDIR, self.cachename, runname)
-        else:
-            self.rdir = runname
-
-        # check cache
-        if self.cachename and os.path.exists(self.rdir):
-            if self._check_cache():
-                return
+            self.key = self.cache.key(cmd, inputs or [], self.revision, runname)
+            # check cache
+            rdir = self.cache.get(self.key, runname)
+            if rdir is not None:
+                self.rdir = rdir
+                if self._check_cache():
+                    return
 
         self.but.disabled = True
         self.cached = False
         self.start_time = time.time()
 
-        # Remove any old local directory results
-        if os.path.exists(runname):
-            shutil.rmtree(runname)
+        # directory submit runs in
+        self.workdir = '.'
+        if self.scratch:
+            if self.cachename:
+                self.workdir = self.cache.tmpdir()
+            else:
+                self.workdir = tempfile.mkdtemp(prefix='%s_' % runname, dir='.')
+            for f in inputs or []:
+                clone_file(f, os.path.join(self.workdir, os.path.basename(f)))
 
-        # create cache directory
-        if self.cachename and not os.path.exists(self.rdir):
-            os.makedirs(self.rdir)
+        # Remove any old local directory results
+        if os.path.exists(self.local(runname)):
+            shutil.rmtree(self.local(runname))
 
         cmd = "submit --runName=%s --progress submit %s" % (runname, cmd)
 
@@ -252,6 +274,8 @@ class Submit(object):
         self.output.value = ""
         self.cbuf.clear()
         self.progress = None
+        self.parser = SubmitProgress()
+        self.last_progress = 0
         self.w.children = [self.acc, self.but]
    
         self.thread = threading.Thread(target=poll_thread, args=(cmd, self))
@@ -259,46 +283,40 @@ class Submit(object):
         self.pid = os.getpgid(self.q.get())
 
     def update(self, val):
-        # parse string and update progress bars
-        x = re.match(Submit.regex, val)
-        if x is None:
+        # parse a piece of output and update the progress bars
+        self.parser.feed(val)
+        self.show_progress_bars()
+
+    def show_progress_bars(self, force=False):
+        # at most every update_interval seconds, unless forced
+        now = time.time()
+        if not force and now - self.last_progress < self.update_interval:
+            return
+        self.last_progress = now
+        p = self.parser
+        if p.counts is None:
             return
-
-        name = ['Setup', 'Waiting', 'Running', 'Finished', 'Failed']
-        style = ['warning', 'info', '', 'success', 'danger']
-        matchnum = [6, 5, 4, 2, 3]
 
         if self.progress is None:
-            # add up all the jobs
-            num = 0
-            for i in range(2, 8):
-                num += int(x.group(i))
-            self.prog = [pwidget(name[i], num, style[i]) for i in range(5)]
-            self.progress = w.VBox(self.prog)
+            self.prog = [pwidget(name, p.total, style) for name, style, _ in BARS]
+            self.eta = w.HTML()
+            self.progress = w.VBox(self.prog + [self.eta])
             self.w.children = [self.acc, self.status, self.progress, self.but]
 
-        for i in range(5):
-            val = int(x.group(matchnum[i]))
-            if i == 0:
-                # combine "setting_up" and "setup" states
-                val += int(x.group(7))
-            self.prog[i].value = val
+        for bar, (_, _, states) in zip(self.prog, BARS):
+            bar.max = max(p.total, 1)
+            bar.value = p.count(*states)
+        self.eta.value = p.summary()
 
     def clear_cache(self, x):
         x.disabled = True
         if x.description == "Clear All":
-            tooldir = os.path.join(Submit.CACHEDIR, self.cachename)
-            if os.path.exists(tooldir):
-                shutil.rmtree(tooldir)
-            tabdir = os.path.join(Submit.CACHETABDIR, self.cachename)
-            if os.path.exists(tabdir):
-                shutil.rmtree(tabdir)
+            self.cache.clear()
             if self.cachecb:
                 self.cachecb()
             return
 
-        if os.path.exists(self.rdir):
-            shutil.rmtree(self.rdir)
+        self.cache.remove(self.key)
         if self.cachecb:
             self.cachecb()
 
@@ -356,11 +374,16 @@ class Submit(object):
             return
         self.w.layout.visibility = 'hidden'
   
+    def local(self, fname):
+        # path of a file in the directory submit runs in
+        return os.path.join(self.workdir, fname)
+
     def copy_stdout(self):
         # copy stdout from batch runs (non-local) to text widget
-        if os.path.isdir(self.runname) and os.path.getmtime(self.runname) >= self.start_time:
+        rundir = self.local(self.runname)
+        if os.path.isdir(rundir) and os.path.getmtime(rundir) >= self.start_time:
             # parametric run
-            files = glob.glob('%s/*/*.stdout' % self.runname)
+            files = glob.glob('%s/*/*.stdout' % rundir)
             dirs = [(os.path.basename(os.path.dirname(f)), f) for f in files]
             dirs.sort(key=lambda x: int(x[0]))
             for d, fname in dirs:
@@ -368,48 +391,52 @@ class Submit(object):
                 val += "\nJOB %s OUTPUT\n" % d
                 val += 40 * "=" + "\n"
                 self.cbuf.append(val)
-                with open(fname, 'rb') as f:
-                    for chunk in iter(lambda: f.read(4096), b''):
-                        self.cbuf.append(chunk.decode('utf-8'))
+                self.cbuf.append_file(fname)
         else:
-            fname = '%s.stdout' % self.runname
+            fname = self.local('%s.stdout' % self.runname)
             if os.path.isfile(fname) and os.path.getmtime(fname) >= self.start_time:
-                with open(fname, 'rb') as f:
-                    self.cbuf.append('\n')
-                    for chunk in iter(lambda: f.read(4096), b''):
-                        self.cbuf.append(chunk.decode('utf-8'))
-        # set the widget from the circular buffer
+                self.cbuf.append('\n')
+                self.cbuf.append_file(fname)
+        # set the widget from the output buffer
         self.output.value = ''.join(self.cbuf)
 
     def copy_files(self, errnum, etime):
-        if os.path.isdir(self.runname):
+        # don't cache failed runs
+        if errnum > 0:
+            if self.scratch:
+                shutil.rmtree(self.workdir, ignore_errors=True)
+            return self.rdir
+
+        # collect the results, then move them into the cache in one step
+        rundir = self.local(self.runname)
+        if os.path.isdir(rundir):
             # output directory was created.  Must have been a parametric run
-            if errnum > 0:
-                shutil.rmtree(self.rdir)
-            else:
-                os.system('/bin/cp -pr %s/* %s' % (self.runname, self.rdir))
-                shutil.rmtree(self.runname)
+            tmp = self.cache.tmpdir()
+            os.rmdir(tmp)
+            move_tree(rundir, tmp)
+            if self.scratch:
+                shutil.rmtree(self.workdir)
+        elif self.scratch:
+            # the scratch directory holds the results
+            tmp = self.workdir
         else:
             # nonparametric run.  Results are in current working directory.
-            # Use the timestamp to copy all newer files to the cacheName.
-            if errnum == 0:
-                files = os.listdir('.')
-                for f in files:
-                    if os.path.getmtime(f) >= self.start_time:
-                        shutil.copy2(f, self.rdir)
-
-        if errnum == 0:
-            with open(os.path.join(self.rdir, '.submit_time'), 'w') as f:
-                f.write(pretty_time_delta(etime))
-            with open(os.path.join(self.rdir, '.output'), 'w') as f:
-                f.write(self.output.value)
-
+            # Copy (clone where possible) all newer files to the cacheName.
+            tmp = self.cache.tmpdir()
+            for ent in os.scandir('.'):
+                if ent.is_file() and ent.stat().st_mtime >= self.start_time:
+                    clone_file(ent.path, os.path.join(tmp, ent.name))
+
+        with open(os.path.join(tmp, '.submit_time'), 'w') as f:
+            f.write(pretty_time_delta(etime))
+        with open(os.path.join(tmp, '.output'), 'w') as f:
+            f.write(self.output.value)
+
+        self.rdir = self.cache.commit(self.key, tmp, runname=self.runname)
         return self.rdir
 
 
 def poll_thread(cmd, self):
-    # set the output encoding
-    outenc = sys.stdout.encoding
     errState = "Start Time: %s" % time.strftime("%H:%M:%S", time.localtime(self.start_time))
     errNum = 3
 
@@ -423,6 +450,7 @@ def poll_thread(cmd, self):
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             shell=True,
+            cwd=self.workdir,
             close_fds=True,
             preexec_fn=os.setsid)
     except Exception as e:
@@ -430,53 +458,19 @@ def poll_thread(cmd, self):
         return
 
     self.q.put(child.pid)
-    poller = select.poll()
-    poller.register(child.stdout, select.POLLIN)
-    poller.register(child.stderr, select.POLLIN)
-    numfds = 2
-    while numfds > 0:
-        try:
-            r = poller.poll(1)
-        except select.error as err:
-            print(err, file=sys.stderr)
-            break
-        for fd, flags in r:
-            if flags & (select.POLLIN | select.POLLPRI):
-                c = os.read(fd, 4096).decode(outenc)
-                if fd == child.stderr.fileno():
-                    if c.endswith('\n'):
-                        c = c[:-1]
-                    self.cbuf.append(u'<STDERR> ' + c + u' </STDERR>\n')
-                else:
-                    # parse string and update progress bars
-                    if self.show_progress:
-                        self.update(c)
-                    if self.outcb:
-                        c = self.outcb(c)
-                    # write c to output widget buffer
-                    if c:
-                        self.cbuf.append(c)
-            if flags & (select.POLLHUP | select.POLLERR):
-                poller.unregister(fd)
-                numfds -= 1
-        self.output.value = ''.join(self.cbuf)
 
-    # drain buffers
-    for fp in [child.stdout, child.stderr]:
-        fcntl.fcntl(fp, fcntl.F_SETFL, os.O_NONBLOCK)
-        while True:
-            c = fp.read(4096).decode(outenc)
-            if len(c) == 0:
-                break
-            if fp == child.stderr:
-                if c.endswith('\n'):
-                    c = c[:-1]
-                c = u'<STDERR> ' + c + u' </STDERR>\n'
-            elif self.outcb:
-                self.outcb(c)
-            # write c to output widget
-            self.cbuf.append(c)
-    self.output.value = ''.join(self.cbuf)
+    def stdout_cb(c):
+        # parse string and update progress bars
+        if self.show_progress:
+            self.update(c)
+        if self.outcb:
+            c = self.outcb(c)
+        return c
+
+    pump(child, self.cbuf, self.output, stdout_cb, self.update_interval)
+    if self.show_progress:
+        self.parser.close()
+        self.show_progress_bars(force=True)
 
     pid, exitStatus = os.waitpid(child.pid, 0)
     elapsed_time = time.time() - self.start_time
@@ -517,8 +511,13 @@ def poll_thread(cmd, self):
     # copy files to cache dir and return full pathname for it
     if self.cachename:
         rdir = self.copy_files(errNum, elapsed_time)
+    elif self.scratch:
+        rdir = self.local(self.runname)
+        if not os.path.isdir(rdir):
+            rdir = self.workdir
     else:
         rdir = self.runname
+    self.cbuf.close()
 
     # callback for processing the data
     if self.done_func and errNum == 0:
@@ -526,21 +525,6 @@ def poll_thread(cmd, self):
     self.but.disabled = False
 
 
-def pretty_time_delta(seconds):
-    seconds = int(seconds)
-    days, seconds = divmod(seconds, 86400)
-    hours, seconds = divmod(seconds, 3600)
-    minutes, seconds = divmod(seconds, 60)
-    if days > 0:
-        return '%dd%dh%dm%ds' % (days, hours, minutes, seconds)
-    elif hours > 0:
-        return '%dh%dm%ds' % (hours, minutes, seconds)
-    elif minutes > 0:
-        return '%dm%ds' % (minutes, seconds)
-    else:
-        return '%ds' % (seconds,)
-
-
 def pwidget(name, num, style):
     return w.IntProgress(
         value=0,
@@ -0,0 +1,394 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+from __future__ import print_function
+import ipywidgets as w
+import os
+import sys
+import time
+import codecs
+import shutil
+import asyncio
+import tempfile
+import threading
+from ..cmd import run_command
+from .submit import Submit, pwidget
+from .progress import SubmitProgress, BARS, STATES, pretty_time_delta
+from .outbuf import OutputBuffer, MAXSIZE
+from .pump import INTERVAL
+from .resultcache import ResultCache, clone_file, move_tree
+
+
+
+class Job(object):
+    """One submit run in a SubmitPool."""
+
+    def __init__(self, runname, cmd, inputs=None):
+        self.runname = runname
+        self.cmd = cmd
+        self.inputs = inputs or []
+        self.key = None
+        self.workdir = None
+        self.rdir = None
+        self.code = None
+        self.cached = False
+        self.state = 'queued'
+        self.start = None
+        self.end = None
+        self.progress = SubmitProgress()
+        # set when the job finishes without progress reports
+        self.final = None
+
+    @property
+    def counts(self):
+        """Latest counts of the job's tasks in each state."""
+        if self.final is not None:
+            return self.final
+        if self.progress.counts is not None:
+            return self.progress.counts
+        # one waiting task until it reports
+        return dict(dict.fromkeys(STATES, 0), waiting=1)
+
+
+class SubmitPool(object):
+    """
+    Run many submit jobs, for example a sweep, with at most max_jobs
+    submit processes at the same time.
+
+    Progress from all the jobs is added up into one set of progress
+    bars.  With caching on, jobs whose results are cached finish
+    immediately without starting submit.  Each job runs in its own
+    directory, so jobs can not pick up each other's files.
+
+    :param max_jobs: Maximum number of submit processes at once.
+    :param done_func: Optional function called as done_func(pool)
+        when all jobs are done.  pool.results has the results.
+    :param job_func: Optional function called as
+        job_func(pool, runname, rdir) when a job finishes successfully.
+    :param cachename: Optional. Name of the tool or other unique
+        name that will be used for the cache directory.
+    :param cachesize: Optional limit in bytes on the size of all
+        cached results in Submit.CACHEDIR.
+    :param revision: Tool revision.  Results from other revisions
+        are not reused.
+    :param maxoutput: Maximum number of bytes of output to keep, for
+        the pool and for the saved output of each job.
+    :param update_interval: Minimum time in seconds between updates
+        of the widgets.  Default is 0.1.
+    :param width: Default is 'auto'.
+    """
+
+    def __init__(self,
+                 max_jobs=4,
+                 done_func=None,
+                 job_func=None,
+                 cachename=None,
+                 cachesize=None,
+                 revision=None,
+                 maxoutput=MAXSIZE,
+                 update_interval=INTERVAL,
+                 width='auto'):
+        self.max_jobs = max_jobs
+        self.done_func = done_func
+        self.job_func = job_func
+        self.cachename = cachename
+        self.revision = revision
+        self.update_interval = update_interval
+        self.maxoutput = maxoutput
+        self.cache = None
+        if cachename:
+            self.cache = ResultCache(Submit.CACHEDIR, cachename, cachesize)
+        self.jobs = []
+        self.thread = None
+        self.loop = None
+        self.task = None
+        self.last = 0
+        self.cbuf = OutputBuffer(maxoutput)
+
+        self.status = w.HTML()
+        self.prog = [pwidget(name, 0, style) for name, style, _ in BARS]
+        self.but = w.Button(description='Cancel', button_style='danger')
+        self.but.on_click(self._but_cb)
+        self.output = w.Textarea(layout={'width': '100%', 'height': '400px'})
+        self.acc = w.Accordion(children=[self.output])
+        self.acc.set_title(0, 'Output')
+        self.acc.selected_index = None
+        _layout = w.Layout(
+            flex_flow='column',
+            justify_content='flex-start',
+            width=width
+        )
+        self.w = w.VBox([self.acc, self.status] + self.prog + [self.but], layout=_layout)
+
+    def _ipython_display_(self):
+        from IPython.display import display
+        display(self.w)
+
+    @property
+    def results(self):
+        """
+        {runname: (exit code, results directory)} for the finished jobs.
+        The exit code is None for a job that could not be run.
+        """
+        return dict((j.runname, (j.code, j.rdir)) for j in self.jobs if j.state == 'done')
+
+    def table(self):
+        """
+        One row per job with its run name, state, start and end times,
+        exit code, whether it was cached and its latest task counts.
+        """
+        rows = []
+        for j in self.jobs:
+            row = dict(runname=j.runname, state=j.state, start=j.start, end=j.end,
+                       code=j.code, cached=j.cached)
+            row.update(j.counts)
+            rows.append(row)
+        return rows
+
+    def throughput(self):
+        """Jobs that ran (not cached) completed per minute, or None."""
+        ran = [j for j in self.jobs if j.end is not None and not j.cached]
+        if not ran:
+            return None
+        elapsed = max(j.end for j in ran) - min(j.start for j in ran)
+        if elapsed <= 0:
+            return None
+        return 60.0 * len(ran) / elapsed
+
+    def run(self, jobs):
+        """
+        Start the jobs and return.
+
+        :param jobs: List of (runname, cmd) or (runname, cmd, inputs)
+            tuples, with the same arguments as Submit.run.
+        """
+        self.wait()
+        self.jobs = [Job(*j) for j in jobs]
+        names = [j.runname for j in self.jobs]
+        if len(set(names)) != len(names):
+            raise ValueError("Run names must be unique.")
+        for j in self.jobs:
+            if j.cmd.startswith('submit') or '--runName' in j.cmd or '--progress' in j.cmd:
+                raise ValueError("Job commands are the args passed to submit and "
+                                 "should not contain 'submit', '--runName' or '--progress'.")
+        self.cbuf.clear()
+        self.output.value = ''
+        self.but.disabled = False
+        self.start_time = time.time()
+        self.thread = threading.Thread(target=self._thread)
+        self.thread.start()
+
+    def wait(self):
+        """Wait for the jobs to finish."""
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def cancel(self):
+        """Stop all running jobs.  Queued jobs are not started."""
+        loop, task = self.loop, self.task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def _but_cb(self, change):
+        self.but.disabled = True
+        self.cancel()
+
+    def _thread(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.task = self.loop.create_task(self._main())
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._error(e)
+        finally:
+            self.loop.close()
+            self.loop = self.task = None
+            for j in self.jobs:
+                if j.state != 'done':
+                    j.state = 'canceled'
+            self._refresh(force=True)
+            self.but.disabled = True
+            if self.done_func:
+                self.done_func(self)
+
+    def _error(self, e, j=None):
+        msg = u'%s: %s' % (type(e).__name__, e)
+        if j is not None:
+            msg = u'[%s] %s' % (j.runname, msg)
+        print(msg, file=sys.stderr)
+        self.cbuf.append(msg + u'\n')
+
+    async def _main(self):
+        sem = asyncio.Semaphore(self.max_jobs)
+        todo = []
+        for j in self.jobs:
+            if self.cache:
+                j.key = self.cache.key(j.cmd, j.inputs, self.revision, j.runname)
+                rdir = self.cache.get(j.key, j.runname)
+                if rdir is not None:
+                    # cache hit
+                    self._finished(j, 0, rdir, cached=True)
+                    continue
+            todo.append(j)
+        self._refresh(force=True)
+        tasks = [asyncio.ensure_future(self._job(j, sem)) for j in todo]
+        if not tasks:
+            return
+        try:
+            await asyncio.wait(tasks)
+        finally:
+            # on cancel, wait until every running submit has been stopped
+            for t in tasks:
+                t.cancel()
+            await asyncio.wait(tasks)
+        for t in tasks:
+            if not t.cancelled() and t.exception() is not None:
+                raise t.exception()
+
+    async def _job(self, j, sem):
+        async with sem:
+            j.state = 'running'
+            j.start = time.time()
+            if self.cache:
+                j.workdir = self.cache.tmpdir()
+            else:
+                j.workdir = tempfile.mkdtemp(prefix='%s_' % j.runname, dir='.')
+            # output saved with the results of the job
+            out = OutputBuffer(self.maxoutput)
+            decout = codecs.getincrementaldecoder('utf-8')('replace')
+            decerr = codecs.getincrementaldecoder('utf-8')('replace')
+
+            def stdout_cb(data):
+                text = decout.decode(data)
+                out.append(text)
+                for line in j.progress.feed(text):
+                    self.cbuf.append(u'[%s] %s\n' % (j.runname, line))
+                self._refresh()
+
+            def stderr_cb(data):
+                text = decerr.decode(data)
+                out.append(text)
+                self.cbuf.append(u'[%s] <STDERR> %s' % (j.runname, text))
+                self._refresh()
+
+            start = time.time()
+            cmd = "submit --runName=%s --progress submit %s" % (j.runname, j.cmd)
+            try:
+                for f in j.inputs:
+                    clone_file(f, os.path.join(j.workdir, os.path.basename(f)))
+                res = await run_command(cmd, shell=True, cwd=j.workdir,
+                                        stdout_cb=stdout_cb, stderr_cb=stderr_cb)
+            except asyncio.CancelledError:
+                shutil.rmtree(j.workdir, ignore_errors=True)
+                raise
+            except Exception as e:
+                # this job failed to start; the others go on
+                shutil.rmtree(j.workdir, ignore_errors=True)
+                self._error(e, j)
+                self._finished(j, None, None)
+                return
+            # the last line may not end in a newline
+            for line in j.progress.close():
+                self.cbuf.append(u'[%s] %s\n' % (j.runname, line))
+            try:
+                self._store(j, res.code, time.time() - start, out.getvalue())
+            except Exception as e:
+                self._error(e, j)
+                if j.state != 'done':
+                    shutil.rmtree(j.workdir, ignore_errors=True)
+                    self._finished(j, None, None)
+
+    def _store(self, j, code, etime, output):
+        rundir = os.path.join(j.workdir, j.runname)
+        if not self.cache:
+            rdir = rundir if os.path.isdir(rundir) else j.workdir
+        elif code != 0:
+            # don't cache failed runs
+            shutil.rmtree(j.workdir, ignore_errors=True)
+            rdir = None
+        else:
+            if os.path.isdir(rundir):
+                # parametric run
+                tmp = self.cache.tmpdir()
+                os.rmdir(tmp)
+                move_tree(rundir, tmp)
+                shutil.rmtree(j.workdir)
+            else:
+                tmp = j.workdir
+            with open(os.path.join(tmp, '.submit_time'), 'w') as f:
+                f.write(pretty_time_delta(etime))
+            with open(os.path.join(tmp, '.output'), 'w') as f:
+                f.write(output)
+            rdir = self.cache.commit(j.key, tmp, runname=j.runname)
+        self._finished(j, code, rdir)
+
+    def _finished(self, j, code, rdir, cached=False):
+        j.state = 'done'
+        j.end = time.time()
+        j.code = code
+        j.rdir = rdir
+        j.cached = cached
+        if code == 0:
+            if not j.counts['finished']:
+                j.final = dict(dict.fromkeys(STATES, 0), finished=1)
+            msg = 'cached' if cached else 'done'
+        else:
+            j.final = dict(dict.fromkeys(STATES, 0), failed=1)
+            msg = 'failed' if code is None else 'failed with exit code %s' % code
+        self.cbuf.append(u'[%s] %s\n' % (j.runname, msg))
+        self._refresh(force=True)
+        if code == 0 and self.job_func:
+            self.job_func(self, j.runname, rdir)
+
+    def _refresh(self, force=False):
+        # update the widgets, at most every update_interval seconds
+        now = time.time()
+        if not force and now - self.last < self.update_interval:
+            return
+        self.last = now
+        total = 0
+        sums = [0] * len(BARS)
+        for j in self.jobs:
+            counts = j.counts
+            total += sum(counts[s] for s in STATES[1:])
+            for i, (_, _, states) in enumerate(BARS):
+                sums[i] += sum(counts[s] for s in states)
+        for p, val in zip(self.prog, sums):
+            p.max = max(total, 1)
+            p.value = val
+        states = [j.state for j in self.jobs]
+        msg = '%d jobs: %d done (%d cached), %d running, %d queued. Elapsed %s' % (
+            len(states), states.count('done'), sum(j.cached for j in self.jobs),
+            states.count('running'), states.count('queued'),
+            pretty_time_delta(now - self.start_time))
+        rate = self.throughput()
+        if rate and states.count('done') < len(states):
+            left = len(states) - states.count('done')
+            msg += ', %.1f jobs/min, about %s left' % (rate, pretty_time_delta(60.0 * left / rate))
+        self.status.value = msg
+        self.output.value = ''.join(self.cbuf)
@@ -25,11 +25,24 @@
 
 from __future__ import print_function
 import ipywidgets as widgets
-import base64
 import os
 import sys
+import re
+import time
+import hashlib
 from IPython.display import display, Javascript
-from traitlets import List, Unicode, Bool, Int
+from traitlets import List, Bool
+
+# Files are read by the browser in chunks that are sent as binary
+# buffers.  PIPELINE chunks are requested at a time, and the chunk
+# size is adjusted so that each takes about TARGET seconds to arrive.
+CHUNK = 256 * 1024
+MINCHUNK = 64 * 1024
+MAXCHUNK = 8 * 1024 * 1024
+PIPELINE = 4
+TARGET = 0.25
+# block size for comparing a selected file with one already in dir
+HASHBLOCK = 4 * 1024 * 1024
 
 
 def to_bytes(numstr): 
@@ -95,55 +108,39 @@ class FileWidget(anywidget.AnyWidget):
                 file.removeAttribute("disabled");
             }
 
-            function send_changed() {
-                var send = model.get('send');
-                var fnum = send[0];
-                var offset = send[1];
-                var chunk_size=64*1024;
-                var reader;
-
-                if (fnum == -1) {
-                    return
-                }
-
-                if (offset == 0) {
-                    model.set('sent', -1);
-                    model.save_changes();
-                }
-
-                function tob64( buffer ) {
-                    var binary = '';
-                    var bytes = new Uint8Array( buffer );
-                    var len = bytes.byteLength;
-                    for (var i = 0; i < len; i++) {
-                        binary += String.fromCharCode( bytes[ i ] );
-                    }
-                    return window.btoa( binary );
-                }
+            function read_chunk(fnum, offset, size, seq) {
+                // reply with the bytes as a binary buffer
+                stored_files[fnum].slice(offset, offset + size).arrayBuffer().then(
+                    function (buf) {
+                        model.send({event: 'chunk', fnum: fnum, offset: offset, seq: seq},
+                                   undefined, [buf]);
+                    },
+                    function (err) {
+                        console.log("Read error: " + err);
+                        model.send({event: 'read_error', fnum: fnum, offset: offset, seq: seq,
+                                    error: String(err)});
+                    });
+            }
 
-                var reader_done = function (event) {
-                    if (event.target.error == null) {
-                        var b64 = tob64(event.target.result);
-                        model.set('data', b64);
-                        model.set('sent', offset);
-                        model.save_changes();
-                    } else {
-                        console.log("Read error: " + event.target.error);
-                        model.set('data', '');
-                        model.set('sent', -2);
-                        model.save_changes();
-                    }
-                    model.save_changes();
+            function hash_chunk(fnum, offset, size, seq) {
+                // reply with the SHA-256 of the bytes, or null if the browser cannot hash
+                function reply(digest) {
+                    model.send({event: 'digest', fnum: fnum, offset: offset, seq: seq,
+                                digest: digest});
                 }
-
-                var chunk_reader = function (_offset, _f) {
-                    reader = new FileReader();
-                    var chunk = _f.slice(_offset, chunk_size + _offset);
-                    reader.readAsArrayBuffer(chunk);
-                    reader.onload = reader_done;
+                if (!window.crypto || !window.crypto.subtle) {
+                    reply(null);
+                    return;
                 }
-
-                chunk_reader(offset, stored_files[fnum]);
+                stored_files[fnum].slice(offset, offset + size).arrayBuffer().then(
+                    function (buf) { return window.crypto.subtle.digest('SHA-256', buf); }
+                ).then(
+                    function (digest) {
+                        reply(Array.from(new Uint8Array(digest), function (b) {
+                            return ('0' + b.toString(16)).slice(-2);
+                        }).join(''));
+                    },
+                    function (err) { reply(null); });
             }
 
             function handle_file_change(evt) {
@@ -157,7 +154,7 @@ class FileWidget(anywidget.AnyWidget):
                     console.log("Type: " + f.type);
                     console.log("Size: " + f.size + " bytes");
                     stored_files.push(f);
-                    filenames.push([f.name, f.size]);
+                    filenames.push([f.name, f.size, f.lastModified]);
                 };
 
                 model.set('filenames', filenames);
@@ -176,7 +173,13 @@ class FileWidget(anywidget.AnyWidget):
                 label.prepend(icon);
             }
 
-            model.on('change:send', send_changed);
+            model.on('msg:custom', function (msg) {
+                if (msg.event == 'read') {
+                    read_chunk(msg.fnum, msg.offset, msg.size, msg.seq);
+                } else if (msg.event == 'hash') {
+                    hash_chunk(msg.fnum, msg.offset, msg.size, msg.seq);
+                }
+            });
             model.on('change:reset', reset);
             file.addEventListener('change', handle_file_change);
         }
@@ -184,9 +187,6 @@ class FileWidget(anywidget.AnyWidget):
     """
     filenames = List([]).tag(sync=True)
     multiple = Bool(False).tag(sync=True)
-    data = Unicode().tag(sync=True)
-    send = List([]).tag(sync=True)
-    sent = Int().tag(sync=True)
     reset = Bool(False).tag(sync=True)
 
     def __init__(self, **kwargs):
@@ -199,21 +199,46 @@ class FileWidget(anywidget.AnyWidget):
         self.errors = widgets.CallbackDispatcher(accepted_nargs=[0, 1])
 
         # Listen for custom msgs
-        self.on_msg(self._handle_custom_msg)
+        self.on_msg(self._handle_msg)
 
-    def _handle_custom_msg(self, content):
+    def _handle_msg(self, widget, content, buffers):
         """Handle a msg from the front-end.
 
         Parameters
         ----------
         content: dict
             Content of the msg."""
-        if 'event' in content and content['event'] == 'error':
+        if content.get('event') == 'error':
             self.errors()
             self.errors(self)
 
+    def read(self, fnum, offset, size, seq=0):
+        """
+        Ask the front-end for size bytes of file fnum, starting at offset.
+        The reply carries seq back.
+        """
+        self.send({'event': 'read', 'fnum': fnum, 'offset': offset, 'size': size, 'seq': seq})
+
+    def hash(self, fnum, offset, size, seq=0):
+        """
+        Ask the front-end for the SHA-256 of size bytes of file fnum,
+        starting at offset.  The reply carries seq back.
+        """
+        self.send({'event': 'hash', 'fnum': fnum, 'offset': offset, 'size': size, 'seq': seq})
+
 
 class FileUpload(object):
+    """
+    Upload files from the browser to dir.
+
+    Each file is written to a hidden .part file in dir as it arrives and
+    renamed when complete.  Its SHA-256 is computed on the way and saved
+    in digests.  If an upload fails or is reset, selecting the same file
+    again (or calling resume() after an error) continues from the end of
+    the .part file.  Part files of other versions of a file (another size
+    or modification time) are removed when it is uploaded.  A file in dir with the same size is compared block
+    by block with the selected one first, and not uploaded if they match.
+    """
 
     def __init__(self, 
                  name, 
@@ -223,7 +248,9 @@ class FileUpload(object):
                  maxsize='1M', 
                  cb=None,
                  basic=False,
-                 width='auto'):
+                 width='auto',
+                 pipeline=PIPELINE,
+                 chunk_size=CHUNK):
 
         form_item_layout = widgets.Layout(
             display='flex',
@@ -242,7 +269,7 @@ class FileUpload(object):
         self.maxnum = maxnum
         self.maxsize = to_bytes(maxsize)
         self.input.observe(self._filenames_received, names='filenames')
-        self.input.observe(self._data_received, names='sent')
+        self.input.on_msg(self._data_received)
         self.basic = basic
         if basic:
             self.up = widgets.HBox([self.input], layout=basic_layout)
@@ -258,6 +285,25 @@ class FileUpload(object):
         self.cb = cb
         self.prog = None
         self.fnames = []
+        self.sizes = []
+        self.mtimes = []
+        self.nums = []
+        self.fnum = 0
+        self.f = None
+        self.active = False
+        self.verifying = False
+        # number of the current run of requests; replies to older ones are dropped
+        self.seq = 0
+        # fname -> SHA-256 hex digest of each uploaded file
+        self.digests = {}
+        self.pipeline = pipeline
+        self.chunk_size = chunk_size
+        self.chunk = chunk_size
+        self.rate = None
+        # offset -> (size, time requested) of the chunks in flight
+        self.inflight = {}
+        # offset -> data of chunks that arrived before the bytes ahead of them
+        self.pending = {}
 
     def _filenames_received(self, change):
         # We have received a list of files from the widget.
@@ -274,14 +320,17 @@ class FileUpload(object):
             del self.progress
 
         self.fnames = []
-        sizes = []
+        self.sizes = sizes = []
+        self.mtimes = []
         self.nums = []
-        for i, (name, sz) in enumerate(self.input.filenames):
+        for i, ent in enumerate(self.input.filenames):
+            name, sz = ent[:2]
             if sz > self.maxsize:
                 print('File "%s" larger than maxsize.' % name, file=sys.stderr)
                 continue
             self.fnames.append(name)
             sizes.append(sz)
+            self.mtimes.append(ent[2] if len(ent) > 2 else 0)
             self.nums.append(i)
 
         if sizes == []:
@@ -293,6 +342,7 @@ class FileUpload(object):
             print('Too many files selected (%s). Truncating...' % len(self.fnames), file=sys.stderr)
 
         self.fnames = self.fnames[:self.maxnum]
+        del sizes[self.maxnum:]
 
         self.prog = [pwidget(self.fnames[i], sizes[i], self.basic) for i in range(len(self.fnames))]
         self.progress = widgets.VBox(self.prog, layout={'width': '100%'})
@@ -301,44 +351,200 @@ class FileUpload(object):
         mkdir_p(self.dir)
         self.fnames = [os.path.join(self.dir, n) for n in self.fnames]
 
-        self.f = open(self.fnames[0], 'wb')
         self.fnum = 0
+        self.chunk = self.chunk_size
+        self.rate = None
+        self.digests = {}
+        self.active = True
+        self._next_file()
+        # _data_received will handle the rest
+
+    def _next_file(self, verify=True):
+        # start on file fnum, or call cb after the last file
+        while self.fnum < len(self.fnames):
+            fname = self.fnames[self.fnum]
+            size = self.sizes[self.fnum]
+            if verify and size and os.path.isfile(fname) and os.path.getsize(fname) == size:
+                self._start_verify()
+                return
+            verify = True
+            if self._start_upload():
+                return
+            self._finish_file()
+        self.active = False
+        if self.cb:
+            self.cb(self, self.fnames)
+
+    def _part(self):
+        name = os.path.basename(self.fnames[self.fnum])
+        return os.path.join(self.dir, '.%s.%d-%d.part' % (name, self.sizes[self.fnum],
+                                                          self.mtimes[self.fnum]))
+
+    def _remove_stale(self):
+        # remove the part files of other versions (size, mtime) of this file
+        name = os.path.basename(self.fnames[self.fnum])
+        pat = re.compile(re.escape('.%s.' % name) + r'\d+-\d+\.part$')
+        keep = os.path.basename(self.part)
+        for ent in os.scandir(self.dir):
+            if ent.name != keep and pat.match(ent.name):
+                try:
+                    os.remove(ent.path)
+                except OSError:
+                    pass
+
+    def _start_verify(self):
+        # compare the blocks of the file in dir with the selected one
+        self.verifying = True
+        self.seq += 1
         self.fcnt = 0
-        self.input.send = [-1, 0]
-        self.input.send = [self.nums[0], self.fcnt]
-        # data_changed callback will handle the rest
-
-    def _data_received(self, change):
-        # print("_data_received")
-        # process received blocks of data and request the next one until done.
-        if change['new'] == -1:
-            return
-        if change['new'] == -2:
-            # unexpected error
-            self.prog[self.fnum].bar_style = 'error'
-            print("Error downloading %s" % self.fnames[self.fnum], file=sys.stderr)
+        self.offset = 0
+        self.inflight = {}
+        self._request()
+
+    def _start_upload(self):
+        # open the part file, continuing after what it already holds.
+        # Returns False if there is nothing left to request.
+        self.verifying = False
+        self.seq += 1
+        self.part = self._part()
+        self._remove_stale()
+        self.hash = hashlib.sha256()
+        self.fcnt = 0
+        if os.path.exists(self.part):
+            with open(self.part, 'rb') as f:
+                for data in iter(lambda: f.read(1024 * 1024), b''):
+                    self.hash.update(data)
+                    self.fcnt += len(data)
+        self.f = open(self.part, 'ab')
+        self.offset = self.fcnt
+        self.inflight = {}
+        self.pending = {}
+        self.last = time.time()
+        self.prog[self.fnum].value = self.fcnt
+        if self.fcnt < self.sizes[self.fnum]:
+            self._request()
+            return True
+        return False
+
+    def _finish_file(self):
+        fname = self.fnames[self.fnum]
+        self.f.close()
+        self.f = None
+        os.rename(self.part, fname)
+        self.digests[fname] = self.hash.hexdigest()
+        self._file_done()
+
+    def _file_done(self):
+        self.prog[self.fnum].value = self.sizes[self.fnum]
+        self.prog[self.fnum].bar_style = 'success'
+        self.fnum += 1
+
+    def _request(self):
+        # keep up to pipeline chunks in flight
+        size = self.sizes[self.fnum]
+        while len(self.inflight) < self.pipeline and self.offset < size:
+            if self.verifying:
+                n = min(HASHBLOCK, size - self.offset)
+                self.input.hash(self.nums[self.fnum], self.offset, n, self.seq)
+            else:
+                n = min(self.chunk, size - self.offset)
+                self.input.read(self.nums[self.fnum], self.offset, n, self.seq)
+            self.inflight[self.offset] = (n, time.time())
+            self.offset += n
+
+    def _adapt(self, nbytes):
+        # size chunks to take about TARGET seconds at the measured throughput
+        now = time.time()
+        dt, self.last = now - self.last, now
+        if dt <= 0:
             return
-
-        data = base64.b64decode(self.input.data)
-        dlen = len(data)
-        # print("GOT DATA (%d) [%d] for file %d" % (dlen, self.fcnt, self.fnum))
-        if dlen == 0:
-            self.prog[self.fnum].bar_style = 'success'
+        rate = nbytes / dt
+        self.rate = rate if self.rate is None else (self.rate + rate) / 2
+        chunk = MINCHUNK
+        while chunk < MAXCHUNK and chunk * 2 <= self.rate * TARGET:
+            chunk *= 2
+        self.chunk = chunk
+
+    def _error(self, msg):
+        # stop, keeping the part file so the upload can be resumed
+        self.prog[self.fnum].bar_style = 'danger'
+        print("Error uploading %s: %s" % (self.fnames[self.fnum], msg), file=sys.stderr)
+        if self.f is not None:
             self.f.close()
-            if self.fnum >= len(self.fnames) - 1:
-                # done with all downloads
-                if self.cb:
-                    self.cb(self, self.fnames)
-                return
-            self.fnum += 1
-            self.f = open(self.fnames[self.fnum], 'wb')
-            self.fcnt = 0
-            self.input.send = [self.nums[self.fnum], self.fcnt]
+            self.f = None
+        self.inflight = {}
+        self.pending = {}
+        self.active = False
+        self.seq += 1
+
+    def resume(self):
+        """Continue a failed upload from the last byte written."""
+        if self.active or self.fnum >= len(self.fnames):
             return
+        self.prog[self.fnum].bar_style = ''
+        self.active = True
+        self._next_file(verify=False)
+
+    def _write(self, data):
         self.f.write(data)
-        self.fcnt += dlen
+        self.hash.update(data)
+        self.fcnt += len(data)
+
+    def _data_received(self, widget, content, buffers):
+        # handle a chunk or digest and request more until done
+        event = content.get('event')
+        if not self.active or event not in ('chunk', 'digest', 'read_error'):
+            return
+        offset = content.get('offset')
+        if content.get('seq') != self.seq or offset not in self.inflight:
+            # left over from an earlier file, selection or reset
+            return
+        if event == 'read_error':
+            self._error(content.get('error'))
+            return
+        if self.verifying:
+            if event == 'digest':
+                self._digest_received(offset, content.get('digest'))
+            return
+        if event != 'chunk':
+            return
+
+        data = buffers[0] if buffers else b''
+        size, _ = self.inflight.pop(offset)
+        if len(data) != size:
+            self._error('file changed during upload')
+            return
+        self._adapt(size)
+        if offset != self.fcnt:
+            # keep it until the bytes before it arrive
+            self.pending[offset] = bytes(data)
+        else:
+            self._write(data)
+            while self.fcnt in self.pending:
+                self._write(self.pending.pop(self.fcnt))
         self.prog[self.fnum].value = self.fcnt
-        self.input.send = [self.nums[self.fnum], self.fcnt]
+        if self.fcnt < self.sizes[self.fnum]:
+            self._request()
+            return
+        self._finish_file()
+        self._next_file()
+
+    def _digest_received(self, offset, digest):
+        fname = self.fnames[self.fnum]
+        size, _ = self.inflight.pop(offset)
+        if digest != block_digest(fname, offset, size):
+            # different file; upload it after all
+            self._next_file(verify=False)
+            return
+        self.fcnt += size
+        self.prog[self.fnum].value = self.fcnt
+        if self.fcnt < self.sizes[self.fnum]:
+            self._request()
+            return
+        # same file, no need to upload it
+        self.digests[fname] = file_digest(fname)
+        self._file_done()
+        self._next_file()
 
     def reset(self):
         # print("RESET", self)
@@ -349,6 +555,13 @@ class FileUpload(object):
             del self.prog
             self.prog = None
             del self.progress
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+        self.inflight = {}
+        self.pending = {}
+        self.active = False
+        self.seq += 1
         self.input.reset = True
         self.input.reset = False
 
@@ -392,6 +605,24 @@ def pwidget(name, num, basic):
         )
 
 
+def block_digest(fname, offset, size):
+    """SHA-256 hex digest of size bytes of a file, starting at offset."""
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        f.seek(offset)
+        h.update(f.read(size))
+    return h.hexdigest()
+
+
+def file_digest(fname):
+    """SHA-256 hex digest of a file."""
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for data in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(data)
+    return h.hexdigest()
+
+
 def mkdir_p(path):
     try:
         os.makedirs(path)
@@ -0,0 +1,128 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+"""
+The shared unit registry and cached unit parsing.
+
+The registry is only created when first needed, because building it
+takes a good part of a second.  Pint's expression parser is slow, and
+the same few unit strings are parsed over and over when reading
+Rappture numbers.  These helpers keep bounded caches of parsed units
+and of the conversion between two units, so reading a number costs a
+float parse and a multiply.
+"""
+
+from __future__ import print_function
+import re
+import threading
+from functools import lru_cache
+
+_ureg = None
+_ureg_lock = threading.Lock()
+
+
+def get_registry():
+    """Returns the shared pint UnitRegistry (nanohublib.ureg), creating it if needed."""
+    global _ureg
+    if _ureg is None:
+        with _ureg_lock:
+            if _ureg is None:
+                from pint import UnitRegistry
+                ureg = UnitRegistry()
+                ureg.autoconvert_offset_to_baseunit = True
+                _ureg = ureg
+    return _ureg
+
+# a number followed by optional units, e.g. "300K", "-1.5e3 eV", "26.85 degC"
+_number_re = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(.*?)\s*$")
+
+
+@lru_cache(maxsize=1024)
+def parse_units(units):
+    """
+    pint Unit for a units string.  Raises an exception if it is not
+    valid, or has a numeric factor ("K/2"), which a Unit cannot hold.
+    """
+    val = get_registry().parse_expression(units)
+    if getattr(val, 'magnitude', val) != 1:
+        raise ValueError("'%s' is not just units." % units)
+    return val.units
+
+
+def rap_units(units):
+    """pint Unit for a Rappture units string, where 'C' is Celsius, not Coulombs."""
+    if units == 'C':
+        return get_registry().degC
+    return parse_units(units)
+
+
+@lru_cache(maxsize=1024)
+def conversion(src, dst):
+    """
+    Returns (scale, offset) such that a value in src units is
+    scale * value + offset in dst units, or None if the conversion
+    is not linear (for example logarithmic units).
+    """
+    Q_ = get_registry().Quantity
+    f0, f1, f2 = [Q_(x, src).to(dst).magnitude for x in (0.0, 1.0, 2.0)]
+    scale = f1 - f0
+    if abs(f2 - (2 * scale + f0)) > 1e-9 * max(1.0, abs(f2)):
+        return None
+    return scale, f0
+
+
+def convert(mag, src, dst):
+    """Convert the magnitude mag from src to dst units."""
+    if src == dst:
+        return mag
+    conv = conversion(src, dst)
+    if conv is None:
+        return get_registry().Quantity(mag, src).to(dst).magnitude
+    return mag * conv[0] + conv[1]
+
+
+def parse_value(text):
+    """
+    Split a value string like "300K" into its magnitude and units.
+    Returns (magnitude, Unit), with None for the units if there are none.
+    Expressions that are not a plain number and units go through pint.
+    """
+    m = _number_re.match(text)
+    if m is not None:
+        num, units = m.groups()
+        try:
+            if '.' in num or 'e' in num or 'E' in num:
+                mag = float(num)
+            else:
+                mag = int(num)
+            if units == '':
+                return mag, None
+            return mag, parse_units(units)
+        except Exception:
+            pass
+    val = get_registry().parse_expression(text)
+    if hasattr(val, 'units'):
+        return val.magnitude, val.units
+    return val, None
@@ -70,3 +70,19 @@ class TestBasic:
         assert tool['title'].value == 'My Test Title'
         title = tool['title']
         assert title.value == 'My Test Title'
+
+    def test_path_cache(self):
+        first = self.io['tool.limits.cputime']
+        second = self.io['tool.limits.cputime']
+        assert first.elem is second.elem
+        assert self.io.pcache.get('tool.limits.cputime') is first.elem
+
+        # setting a value invalidates cached lookups
+        self.io['tool.limits.cputime'] = 600
+        assert len(self.io.pcache) == 0
+        assert self.io['tool.limits.cputime'].value == '600'
+
+    def test_lazy_info(self):
+        self.io['tool.title'] = 'Lazy Title'
+        assert self.io._info is None
+        assert self.io.info is self.io.info
@@ -2,6 +2,7 @@ from __future__ import print_function
 import pytest
 import os
 import sys
+import warnings
 import numpy as np
 
 sys.path.insert(0, os.path.abspath('../../..'))
@@ -30,6 +31,33 @@ class TestCurve:
                              [9.001, -0.0911450779658]])
         assert np.allclose(val, expected)
 
+    def test_parse_xy(self):
+        text = self.io['output.curve(single).component.xy'].elem.text
+        val = rappture.curve.parse_xy(text)
+        assert val.shape == (10, 2)
+        assert val.dtype == np.float64
+        assert np.allclose(val[1], [1.009, 0.265160421676])
+        val32 = rappture.curve.parse_xy(text, dtype=np.float32)
+        assert val32.dtype == np.float32
+        assert np.allclose(val, val32)
+        assert rappture.curve.parse_xy('').shape == (0, 2)
+        with pytest.raises(ValueError):
+            rappture.curve.parse_xy('1 2 3')
+        # numpy cannot parse '1_0'; float() can
+        assert np.array_equal(rappture.curve.parse_xy('1 2\n1_0\t4 '), [[1, 2], [10, 4]])
+
+    def test_parse_xy_truncated(self, monkeypatch):
+        # numpy 1.x warns and returns what it read up to unparsable text
+        def fromstring(text, dtype, sep):
+            warnings.warn('string or file could not be read to its end', DeprecationWarning)
+            return np.array([1.0, 2.0])
+        monkeypatch.setattr(rappture.curve.np, 'fromstring', fromstring)
+        assert np.array_equal(rappture.curve.parse_xy(' 1 2\n3 4'), [[1, 2], [3, 4]])
+
+    def test_parse_xy_empty(self):
+        for text in (None, '', '  \n '):
+            assert rappture.curve.parse_xy(text).shape == (0, 2)
+
     def test_write_single(self):
         a = np.arange(20).reshape(-1, 2)
         self.io['output.curve(single).component.xy'] = a
@@ -67,3 +95,90 @@ class TestCurve:
         assert np.allclose(x, val[:, 0])
         assert np.allclose(y, val[:, 1])
 
+    def test_lazy_read(self, monkeypatch):
+        monkeypatch.setattr(rappture.LazyIndex, 'MINSIZE', 100)
+        io = rappture.RapXML('curve.xml', lazy=True)
+        num = len(io.lazy.pending)
+        assert num > 0
+        assert io['output.curve(single).component.xy'].elem.text is not None
+        assert len(io.lazy.pending) == num - 1
+        full = rappture.RapXML('curve.xml')
+        val = io['output.curve(single).component.xy'].value
+        assert np.allclose(val, full['output.curve(single).component.xy'].value)
+        xml = str(io.xml())
+        assert len(io.lazy.pending) == 0
+        assert xml == str(full.xml())
+
+    def test_format_xy(self):
+        a = np.random.rand(100, 2)
+        text = rappture.curve.format_xy(a, precision=None)
+        assert np.array_equal(rappture.curve.parse_xy(text), a)
+        text = rappture.curve.format_xy(a.astype(np.float32), precision=None)
+        assert np.array_equal(rappture.curve.parse_xy(text, dtype=np.float32), a.astype(np.float32))
+        assert rappture.curve.format_xy(Q_(np.ones((1, 2)), 'eV'), precision=2) == '1.00e+00 1.00e+00\n'
+
+    def test_write_quantity_tuple(self):
+        # xaxis is in seconds
+        x = Q_(np.arange(5), 'ms')
+        y = np.arange(5) * 2.0
+        self.io['output.curve(single).component.xy'] = (x, y)
+        val = self.io['output.curve(single).component.xy'].value
+        assert np.allclose(val[:, 0], x.to('s').magnitude)
+        assert np.allclose(val[:, 1], y)
+
+    def test_write_precision(self):
+        node = self.io['output.curve(single).component.xy']
+        x = np.array([0.1234567891234, 2.0])
+        y = np.array([1.0 / 3, 7.0])
+        node.value = (x, y)
+        assert np.array_equal(node.value, np.column_stack([x, y]))
+        node.set_value(np.column_stack([x, y]), precision=None)
+        assert np.array_equal(node.value, np.column_stack([x, y]))
+        node.set_value((x, y), precision=2)
+        assert node.elem.text.split('\n')[0] == '1.23e-01 3.33e-01'
+
+    def test_write_quantity_array(self):
+        # xaxis is in seconds, make the yaxis microseconds
+        node = self.io['output.curve(single).component.xy']
+        node.elem.find('../../yaxis/units').text = 'us'
+        a = Q_(np.arange(10.0).reshape(-1, 2), 'ms')
+        node.value = a
+        assert np.allclose(node.value[:, 0], a[:, 0].to('s').magnitude)
+        assert np.allclose(node.value[:, 1], a[:, 1].to('us').magnitude)
+
+    def test_write_celsius(self):
+        # Rappture's 'C' is Celsius, on write as on read
+        io = rappture.RapXML('curve.xml')
+        node = io['output.curve(single).component.xy']
+        node.elem.find('../../yaxis/units').text = 'C'
+        node.value = (Q_([0.0, 1.0], 's'), Q_([32.0, 212.0], 'degF'))
+        assert np.allclose(node.value[:, 1], [0.0, 100.0])
+        assert io['output.curve(single)'].y.units == ureg.degC
+
+    def test_typed_access(self):
+        io = rappture.RapXML('curve.xml')
+        curve = io['output.curve(single)']
+        assert curve.data.shape == (10, 2)
+        assert curve.data is curve.data
+        assert curve.x.units == ureg.second
+        assert curve.y.units == ureg.volt
+        assert np.allclose(curve.x.magnitude, curve.data[:, 0])
+
+        # cached result is dropped when the text changes
+        io['output.curve(single).component.xy'] = np.ones((3, 2))
+        assert io['output.curve(single)'].data.shape == (3, 2)
+        io['output.curve(single).component.xy'] = np.zeros((3, 2))
+        assert not io['output.curve(single)'].data.any()
+
+    def test_cache_owner(self):
+        import gc
+        import weakref
+        io = rappture.RapXML('curve.xml')
+        elem = io['output.curve(single).component.xy'].elem
+        data = io['output.curve(single)'].data
+        assert io.xycache.get(elem) is data
+        # nothing outside the RapXML keeps its tree alive
+        ref = weakref.ref(io)
+        del io, elem, data
+        gc.collect()
+        assert ref() is None
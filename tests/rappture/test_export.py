@@ -0,0 +1,63 @@
+from __future__ import print_function
+import pytest
+import os, sys
+import json
+import numpy as np
+sys.path.insert(0, os.path.abspath('../..'))
+import nanohublib.rappture as rappture
+
+
+class TestExport:
+
+    def test_npz(self, tmp_path):
+        io = rappture.RapXML('dftmatprop_run.xml')
+        fname = str(tmp_path / 'out.npz')
+        io.export(fname, format='npz')
+        data = np.load(fname)
+        meta = json.loads(str(data['__meta__']))
+        assert [m['path'] for m in meta] == list(io.info.out_df.index)
+        assert np.allclose(data['output.curve(eos).x'], io['output.curve(eos)'].data[:, 0])
+        num = io['output.number(eqVol)'].value
+        assert np.isclose(data['output.number(eqVol).value'], num)
+
+    def test_parquet(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        import pandas as pd
+        io = rappture.RapXML('dftmatprop_run.xml')
+        fname = str(tmp_path / 'out.parquet')
+        io.export(fname)
+        df = pd.read_parquet(fname).set_index('path')
+        assert list(df.index) == list(io.info.out_df.index)
+        curve = df.loc['output.curve(eos)']
+        assert curve['kind'] == 'curve'
+        assert np.allclose(curve['x'], io['output.curve(eos)'].data[:, 0])
+        assert np.allclose(curve['y'], io['output.curve(eos)'].data[:, 1])
+        num = io['output.number(eqVol)']
+        assert np.isclose(df.loc['output.number(eqVol)', 'value'], num.value)
+        assert df.loc['output.number(eqVol)', 'units'] == (num.elem.findtext('units') or '')
+
+    def test_hdf5(self, tmp_path):
+        h5py = pytest.importorskip('h5py')
+        io = rappture.RapXML('dftmatprop_run.xml')
+        fname = str(tmp_path / 'out.h5')
+        io.export(fname, format='hdf5')
+        with h5py.File(fname, 'r') as f:
+            assert sorted(f.keys()) == sorted(io.info.out_df.index)
+            g = f['output.curve(eos)']
+            assert g.attrs['kind'] == 'curve'
+            assert np.allclose(g['x'][()], io['output.curve(eos)'].data[:, 0])
+            assert np.allclose(g['y'][()], io['output.curve(eos)'].data[:, 1])
+            num = io['output.number(eqVol)'].value
+            assert np.isclose(f['output.number(eqVol)/value'][()], num)
+
+    def test_histogram(self):
+        io = rappture.RapXML('hist_run.xml')
+        recs = rappture.export.collect(io)
+        rec = recs[0]
+        assert rec['kind'] == 'histogram'
+        assert len(rec['names']) == len(rec['y'])
+
+    def test_bad_format(self):
+        io = rappture.RapXML('hist_run.xml')
+        with pytest.raises(ValueError):
+            io.export('out.csv', format='csv')
@@ -0,0 +1,51 @@
+from __future__ import print_function
+import pytest
+import os, sys
+sys.path.insert(0, os.path.abspath('../..'))
+from nanohublib.rappture import loader
+
+EXAMPLE = """<?xml version="1.0"?>
+<run>
+    <about>
+        <label>%s</label>
+        <description>An example</description>
+    </about>
+    <input>
+        <number id="temperature"><current>300K</current></number>
+    </input>
+</run>
+"""
+
+
+class TestLoaderExamples:
+
+    def test_read_example(self, tmp_path):
+        fname = str(tmp_path / 'example.xml')
+        with open(fname, 'w') as f:
+            f.write(EXAMPLE % 'Room')
+        ex = loader.read_example(fname)
+        assert ex.label == 'Room'
+        assert ex.desc == 'An example'
+        assert ex.tree.find('input/number/current').text == '300K'
+
+        # unchanged files are not parsed again
+        assert loader.read_example(fname) is ex
+
+        with open(fname, 'w') as f:
+            f.write(EXAMPLE % 'Liquid Nitrogen')
+        os.utime(fname, ns=(ex.key[0] + 10**9, ex.key[0] + 10**9))
+        assert loader.read_example(fname).label == 'Liquid Nitrogen'
+
+    def test_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(loader, '_examples', loader.LRUCache(maxsize=2))
+        names = []
+        for i in range(3):
+            names.append(str(tmp_path / ('ex%d.xml' % i)))
+            with open(names[-1], 'w') as f:
+                f.write(EXAMPLE % i)
+        first = loader.read_example(names[0])
+        for fname in names[1:]:
+            loader.read_example(fname)
+        assert len(loader._examples.data) == 2
+        # the least recently used file is parsed again
+        assert loader.read_example(names[0]) is not first
@@ -117,3 +117,15 @@ output.number(outv)\t"Voltage Sweep +/-"
         val = self.io['input.number(temperature4)'].value
         assert val == 270
 
+    def test_label_index(self):
+        assert self.io.info.in_index['Voltage Sweep +/-'] == ['input.number(vsweep)']
+        assert self.io.info.out_index['Voltage Sweep +/-'] == ['output.number(outv)']
+        assert self.io.info.duplicates() == {}
+        with pytest.raises(ValueError):
+            self.io.get_input('No Such Label')
+
+    def test_set_inputs(self):
+        self.io.set_inputs({'Ambient Temperature Unitless': 280,
+                            'Voltage Sweep +/-': '3V'})
+        assert self.io.get_input('Ambient Temperature Unitless').value == 280
+        assert self.io.get_input('Voltage Sweep +/-').value == Q_(3, ureg.volt)
@@ -0,0 +1,66 @@
+from __future__ import print_function
+import pytest
+import os, sys
+import numpy as np
+sys.path.insert(0, os.path.abspath('../..'))
+import nanohublib.rappture as rappture
+
+
+def make_runs(dirname, num):
+    for i in range(num):
+        io = rappture.RapXML('curve.xml')
+        io['output.curve(single).component.xy'] = np.arange(20).reshape(-1, 2) * i
+        io['input.integer(points)'] = 10 + i
+        with open(os.path.join(dirname, 'run%d.xml' % i), 'w') as f:
+            f.write(str(io.xml(header=True)))
+
+
+class TestRunSet:
+
+    def test_extract(self, tmp_path):
+        make_runs(str(tmp_path), 3)
+        runs = rappture.RunSet(str(tmp_path / 'run*.xml'), processes=2)
+        df = runs.dataframe(['input.integer(points)', 'Number of points'])
+        assert list(df['input.integer(points)']) == [10, 11, 12]
+        assert list(df['Number of points']) == [10, 11, 12]
+
+        curves = runs.curves('output.curve(single)')
+        assert curves.shape == (3, 10, 2)
+        assert np.allclose(curves[2], np.arange(20).reshape(-1, 2) * 2)
+
+        # the worker processes are reused
+        pool = runs.pool
+        runs.refresh()
+        runs.cache.clear()
+        runs.extract(['input.integer(points)'])
+        assert runs.pool is pool
+        runs.close()
+        assert runs.pool is None
+
+    def test_labels(self, tmp_path):
+        io = rappture.RapXML('curve.xml')
+        io['input.integer(points)'] = 12
+        # an output with the same label as the input
+        io['output.curve(single).about.label'] = 'Number of points'
+        fname = str(tmp_path / 'run0.xml')
+        with open(fname, 'w') as f:
+            f.write(str(io.xml(header=True)))
+        with rappture.RunSet(fname, processes=1) as runs:
+            with pytest.raises(ValueError):
+                runs.extract(['Number of points'])
+            vals = runs.extract(['input:Number of points', 'output:Number of points'])[fname]
+            assert vals['input:Number of points'] == 12
+            assert vals['output:Number of points'].shape == (10, 2)
+            with pytest.raises(ValueError):
+                runs.extract(['No such label'])
+
+    def test_cache(self, tmp_path):
+        make_runs(str(tmp_path), 2)
+        runs = rappture.RunSet(str(tmp_path / 'run*.xml'), processes=1)
+        runs.extract(['input.integer(points)'])
+        key, vals = runs.cache[runs.files[0]]
+        assert 'input.integer(points)' in vals
+        runs.extract(['input.integer(points)'])
+        # nothing changed, so nothing was read again
+        assert runs.cache[runs.files[0]] == (key, vals)
+        assert runs.cache[runs.files[0]][1] is vals
@@ -38,3 +38,19 @@ class TestHublib(unittest.TestCase):
             from nanohublib import ui
         except ImportError:
             self.fail("Could not import nanohublib.ui")
+
+    def test_lazy_import(self):
+        """Importing the package does not pull in the heavy dependencies."""
+        import subprocess
+        import sys
+        code = ("import sys, nanohublib, nanohublib.cmd; "
+                "print(' '.join(m for m in ('pint', 'pandas', 'matplotlib', 'lxml', 'ipywidgets') "
+                "if m in sys.modules))")
+        out = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        self.assertEqual(out.strip(), '')
+
+    def test_lazy_registry(self):
+        """ureg and Q_ are created on first use and shared."""
+        from nanohublib import units
+        self.assertIs(nanohublib.ureg, units.get_registry())
+        self.assertEqual(nanohublib.Q_(1, 'm').to('cm').magnitude, 100)
@@ -37,3 +37,103 @@ class TestCmd(unittest.TestCase):
             self.assertTrue(hasattr(cmd, 'executeCommand'))
         except Exception as e:
             self.fail(f"run_command check failed: {e}")
+
+
+class TestAsyncCmd(unittest.TestCase):
+    def test_run_command(self):
+        import asyncio
+        chunks = []
+        res = asyncio.run(cmd.run_command('sh -c "echo out; echo err >&2; exit 3"',
+                                          stdout_cb=chunks.append))
+        self.assertEqual(res.code, 3)
+        self.assertEqual(res.stdout, b'out\n')
+        self.assertEqual(res.stderr, b'err\n')
+        self.assertEqual(b''.join(chunks), b'out\n')
+        self.assertFalse(res.timed_out)
+
+    def test_stdin_and_shell(self):
+        import asyncio
+        res = asyncio.run(cmd.run_command('tr a-z A-Z | rev', stdin=b'hello\n', shell=True))
+        self.assertEqual(res.stdout, b'OLLEH\n')
+
+    def test_timeout(self):
+        import asyncio
+        import time
+        t0 = time.time()
+        res = asyncio.run(cmd.run_command('sleep 10; echo no', shell=True, timeout=0.2))
+        self.assertTrue(res.timed_out)
+        self.assertLess(time.time() - t0, 5)
+        self.assertNotEqual(res.code, 0)
+        self.assertEqual(res.stdout, b'')
+
+    def test_cancel(self):
+        import asyncio
+
+        async def main():
+            task = asyncio.ensure_future(cmd.run_command(['sleep', '10']))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+
+    def test_missing(self):
+        res = cmd.executeCommands([['no-such-command-xyz']])[0]
+        self.assertEqual(res.code, 1)
+
+    def test_execute_commands(self):
+        import time
+        commands = ['sh -c "sleep 0.3; echo %d"' % i for i in range(8)]
+        t0 = time.time()
+        res = cmd.executeCommands(commands, max_concurrency=4)
+        elapsed = time.time() - t0
+        self.assertEqual([r.stdout for r in res], [b'%d\n' % i for i in range(8)])
+        self.assertEqual([r.command for r in res], commands)
+        # two rounds of four
+        self.assertGreater(elapsed, 0.55)
+        self.assertLess(elapsed, 2)
+
+
+class TestExecuteCommand(unittest.TestCase):
+    def test_memory(self):
+        code, out, err = cmd.executeCommand(['sh', '-c', 'echo out; echo err >&2'])
+        self.assertEqual((code, out, err), (0, b'out\n', b'err\n'))
+        code, out, err = cmd.executeCommand('echo hi', asView=True)
+        self.assertIsInstance(out, memoryview)
+        self.assertEqual(out.tobytes(), b'hi\n')
+
+    def test_large_output(self):
+        # more than a pipe buffer, read with growing buffers
+        code, out, err = cmd.executeCommand(['head', '-c', '3000000', '/dev/zero'])
+        self.assertEqual(len(out), 3000000)
+
+    def test_spill(self):
+        import io
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as d:
+            fname = os.path.join(d, 'out.txt')
+            err = io.BytesIO()
+            code, o, e = cmd.executeCommand(['sh', '-c', 'seq 100000; echo err >&2'],
+                                            stdout=fname, stderr=err)
+            self.assertEqual(o, fname)
+            self.assertIs(e, err)
+            self.assertEqual(err.getvalue(), b'err\n')
+            with open(fname) as f:
+                self.assertEqual(f.read().split(), [str(i) for i in range(1, 100001)])
+
+    def test_stream_multibyte(self):
+        import io
+        import sys
+        # a 4096 byte read would split the characters
+        text = u'x' + u'é' * 5000
+        stream = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        old = sys.stdout
+        sys.stdout = stream
+        try:
+            code, out, err = cmd.executeCommand(['printf', text], streamOutput=True)
+        finally:
+            sys.stdout = old
+        self.assertEqual(stream.buffer.getvalue().decode('utf-8'), text)
+        self.assertEqual(out.decode('utf-8'), text)
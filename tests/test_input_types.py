@@ -0,0 +1,76 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+import unittest
+import numpy as np
+from nanohublib import ureg, Q_
+from nanohublib.tool.input_types import Number, Array
+
+
+class TestInputTypes(unittest.TestCase):
+    def test_number_temperature(self):
+        n = Number(type='Number', units='K', value='300 C')
+        self.assertAlmostEqual(n.value, 573.15)
+        n = Number(type='Number', units='delta_degC', value='9 F')
+        self.assertAlmostEqual(n.value, 5)
+        n.value = '5 C'
+        self.assertAlmostEqual(n.value, 5)
+
+    def test_number_expression(self):
+        n = Number(type='Number', units='K', value='100K/2')
+        self.assertAlmostEqual(n.value, 50)
+
+    def test_notebook_parameters(self):
+        from papermill.translators import PythonTranslator
+        from nanohublib.tool.input_types import Params
+        from nanohublib.tool.rw import _get_dict
+        inputs = Params()
+        inputs['n'] = Number(type='Number', units='K')
+        inputs['n'].value = Q_(np.array([0.0, 100.0]), ureg.degC)
+        inputs['a'] = Array(type='Array', value=np.arange(3.0))
+        values = {'n': inputs['n'].value, 'a': inputs['a'].value, 'x': np.float64(2.5)}
+        for d in (_get_dict(inputs), _get_dict(values)):
+            # lists, not the text of an ndarray
+            self.assertEqual(PythonTranslator.translate(d['n']), '[273.15, 373.15]')
+            self.assertEqual(PythonTranslator.translate(d['a']), '[0.0, 1.0, 2.0]')
+        self.assertIs(type(d['x']), float)
+
+    def test_number_array(self):
+        n = Number(type='Number', units='K', min=0)
+        n.value = Q_(np.array([0.0, 100.0]), ureg.degC)
+        self.assertIsInstance(n.value, np.ndarray)
+        np.testing.assert_allclose(n.value, [273.15, 373.15])
+        n.value = [1, 2]
+        np.testing.assert_array_equal(n.value, [1.0, 2.0])
+        with self.assertRaises(ValueError):
+            n.value = np.array([1.0, -1.0])
+
+    def test_array(self):
+        a = Array(type='Array', units='nm', value=np.arange(3.0))
+        self.assertIsInstance(a.value, np.ndarray)
+        a.value = Q_(np.arange(3.0), 'um')
+        np.testing.assert_allclose(a.value, [0, 1000, 2000])
+        a = Array(type='Array', value=[1, 'a'])
+        self.assertEqual(a.value, [1, 'a'])
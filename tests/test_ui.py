@@ -23,8 +23,48 @@
 #  Authors:
 #  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
 
+import io
+import os
+import stat
 import unittest
+import zipfile
+import collections
+import subprocess
+import tempfile
+import time
+import hashlib
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import urlopen, Request
 from nanohublib.ui import String, Number, FileUpload
+from nanohublib.ui import PathSelector, RunCommand, Submit, SubmitPool
+from nanohublib.ui.pump import pump
+from nanohublib.ui.outbuf import OutputBuffer
+from nanohublib.ui.resultcache import ResultCache, link_tree, move_tree, clone_file, make_rname
+from nanohublib.ui import resultcache
+from nanohublib.ui.progress import SubmitProgress
+from nanohublib.ui.download import Download, DownloadServer, get_server, iter_zip, parse_range
+from nanohublib.ui.pathselect import list_dir, PREV, NEXT
+
+
+class FakeOutput(object):
+    """Stands in for the Textarea and counts updates."""
+    def __init__(self):
+        self.updates = 0
+        self._value = ''
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, val):
+        self.updates += 1
+        self._value = val
+
+
+def start(cmd):
+    return subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 class TestUI(unittest.TestCase):
     def test_form_value(self):
@@ -54,3 +94,809 @@ class TestUI(unittest.TestCase):
             self.assertIsNotNone(up)
         except Exception as e:
             pass
+
+
+class TestPump(unittest.TestCase):
+    def test_idle_cpu(self):
+        """An idle command does not keep the pump busy."""
+        out = FakeOutput()
+        child = start('echo start; sleep 1; echo done')
+        t0, c0 = time.time(), time.process_time()
+        pump(child, collections.deque(), out)
+        wall, cpu = time.time() - t0, time.process_time() - c0
+        child.wait()
+        self.assertGreater(wall, 0.9)
+        self.assertLess(cpu, 0.01)
+        self.assertEqual(out.value, 'start\ndone\n')
+        self.assertLessEqual(out.updates, 2)
+
+    def test_coalesce(self):
+        """Fast output is coalesced into a few widget updates."""
+        out = FakeOutput()
+        cmd = 'for i in $(seq 200); do echo line $i; echo err $i >&2; sleep 0.002; done'
+        child = start(cmd)
+        buf = collections.deque()
+        t0 = time.time()
+        pump(child, buf, out, outcb=lambda c: c.upper(), interval=0.1)
+        wall = time.time() - t0
+        child.wait()
+        self.assertLessEqual(out.updates, wall / 0.1 + 2)
+        text = out.value
+        self.assertIn('LINE 200\n', text)
+        self.assertIn('<STDERR> err 200', text)
+        self.assertEqual(text.count('LINE'), 200)
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_small(self):
+        buf = OutputBuffer(maxsize=100, head=30)
+        buf.append('hello\n')
+        buf.append('world\n')
+        self.assertEqual(''.join(buf), 'hello\nworld\n')
+        buf.clear()
+        self.assertEqual(buf.getvalue(), '')
+
+    def test_head_and_tail(self):
+        buf = OutputBuffer(maxsize=100, head=30)
+        for i in range(1000):
+            buf.append('line %d\n' % i)
+        self.assertLessEqual(len(buf), 100)
+        lines = buf.getvalue().split('\n')
+        # whole lines from the start and the end
+        self.assertEqual(lines[:4], ['line 0', 'line 1', 'line 2', 'line 3'])
+        self.assertEqual(lines[-2], 'line 999')
+        self.assertTrue(all(l.startswith('line ') or 'not shown' in l for l in lines if l))
+
+    def test_huge_chunk(self):
+        buf = OutputBuffer(maxsize=1000, head=100)
+        buf.append('x' * 1000000)
+        self.assertEqual(len(buf), 1000)
+        self.assertEqual(buf.dropped, 999000)
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as d:
+            log = os.path.join(d, 'log.txt')
+            src = os.path.join(d, 'run.stdout')
+            text = u'\u00e9' * 100000
+            with open(src, 'wb') as f:
+                f.write(text.encode('utf-8'))
+            buf = OutputBuffer(maxsize=1000, head=100, spill=log)
+            buf.append_file(src, chunk=4095)
+            self.assertEqual(len(buf), 1000)
+            self.assertIn(log, buf.getvalue())
+            buf.clear()
+            with open(log, encoding='utf-8') as f:
+                self.assertEqual(f.read(), text)
+
+    def test_close(self):
+        with tempfile.TemporaryDirectory() as d:
+            log = os.path.join(d, 'log.txt')
+            buf = OutputBuffer(spill=log)
+            buf.append('one\n')
+            buf.close()
+            self.assertIsNone(buf.fp)
+            # later output is added to the end
+            buf.append('two\n')
+            buf.close()
+            with open(log) as f:
+                self.assertEqual(f.read(), 'one\ntwo\n')
+            buf.clear()
+            buf.append('three\n')
+            buf.close()
+            with open(log) as f:
+                self.assertEqual(f.read(), 'three\n')
+
+    def test_bytes(self):
+        # the budget is in bytes of UTF-8, not characters
+        buf = OutputBuffer(maxsize=1000, head=101)
+        for i in range(1000):
+            buf.append(u'\u4e2d\u6587 %d\n' % i)
+        self.assertLessEqual(len(buf), 1000)
+        kept = ''.join(buf.head) + ''.join(buf.tail)
+        self.assertEqual(len(kept.encode('utf-8')), len(buf))
+        self.assertEqual(buf.total, sum(len((u'\u4e2d\u6587 %d\n' % i).encode('utf-8')) for i in range(1000)))
+        buf = OutputBuffer(maxsize=1000, head=101)
+        buf.append(u'\u00e9' * 100000)
+        self.assertLessEqual(len(buf), 1000)
+        self.assertEqual(len((''.join(buf.head) + ''.join(buf.tail)).encode('utf-8')), len(buf))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        resultcache._indexes.pop(self.root, None)
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        fname = os.path.join(self.root, name)
+        with open(fname, 'w') as f:
+            f.write(text)
+        return fname
+
+    def add(self, cache, key, size):
+        tmp = cache.tmpdir()
+        with open(os.path.join(tmp, 'data'), 'wb') as f:
+            f.write(b'x' * size)
+        return cache.commit(key, tmp)
+
+    def test_key(self):
+        cache = ResultCache(self.root, 'tool')
+        inp = self.write('in.txt', 'a')
+        k1 = cache.key('sim in.txt', [inp], 'r1')
+        self.assertEqual(k1, cache.key('sim in.txt', [inp], 'r1'))
+        self.assertNotEqual(k1, cache.key('sim in.txt', [inp], 'r2'))
+        self.assertNotEqual(k1, cache.key('sim -v in.txt', [inp], 'r1'))
+        self.write('in.txt', 'b')
+        os.utime(inp, ns=(0, 1))
+        self.assertNotEqual(k1, cache.key('sim in.txt', [inp], 'r1'))
+
+    def test_make_rname(self):
+        name = make_rname(1.5, 'a')
+        self.assertEqual(name, make_rname(1.5, 'a'))
+        self.assertNotEqual(name, make_rname(1.5, 'b'))
+        self.assertTrue(name.isalnum())
+
+    def test_commit(self):
+        cache = ResultCache(self.root, 'tool')
+        self.assertIsNone(cache.get('abc'))
+        rdir = self.add(cache, 'abc', 10)
+        self.assertEqual(cache.get('abc'), rdir)
+        self.assertEqual(os.listdir(cache.dir), ['abc'])
+        # a second result for the same key is dropped
+        self.add(cache, 'abc', 20)
+        self.assertEqual(cache.size(), 10)
+        cache.remove('abc')
+        self.assertIsNone(cache.get('abc'))
+
+    def test_lru(self):
+        c1 = ResultCache(self.root, 'tool1', maxsize=250)
+        c2 = ResultCache(self.root, 'tool2', maxsize=250)
+        for i, key in enumerate('abc'):
+            self.add(c1 if i % 2 else c2, key, 100)
+        # 'b' is used, so 'c' is the least recently used after 'a'
+        c1.get('b')
+        self.add(c1, 'd', 100)
+        self.assertIsNone(c2.get('a'))
+        self.assertIsNone(c2.get('c'))
+        self.assertIsNotNone(c1.get('b'))
+        self.assertIsNotNone(c1.get('d'))
+        self.assertEqual(c1.size(), 200)
+
+    def test_index(self):
+        cache = ResultCache(self.root, 'tool', maxsize=1000)
+        self.add(cache, 'a', 100)
+        # later commits do not scan the disk
+        with mock.patch.object(ResultCache, 'entries', side_effect=AssertionError):
+            self.add(cache, 'b', 100)
+            self.assertEqual(cache.size(), 200)
+            self.assertEqual(cache.evict(150), 100)
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+
+    def legacy(self, cache, runname, size):
+        rdir = os.path.join(cache.dir, runname)
+        os.makedirs(rdir)
+        with open(os.path.join(rdir, '.submit_time'), 'w') as f:
+            f.write('1s')
+        with open(os.path.join(rdir, 'data'), 'wb') as f:
+            f.write(b'x' * size)
+        return rdir
+
+    def test_legacy(self):
+        cache = ResultCache(self.root, 'tool')
+        old = self.legacy(cache, 'run1', 100)
+        self.assertIsNone(cache.get('abc'))
+        self.assertIsNone(cache.get('abc', 'run2'))
+        rdir = cache.get('abc', 'run1')
+        self.assertEqual(rdir, cache.path('abc'))
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.isfile(os.path.join(rdir, 'data')))
+        self.assertEqual(cache.get('abc'), rdir)
+        self.assertEqual(cache.size(), 102)
+
+    def test_legacy_relative_root(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            cache = ResultCache('./cache', 'tool')
+            self.legacy(cache, 'run1', 100)
+            self.assertEqual(cache.get('abc', 'run1'), cache.path('abc'))
+        finally:
+            os.chdir(cwd)
+
+    def test_legacy_evict(self):
+        cache = ResultCache(self.root, 'tool', maxsize=250)
+        old = self.legacy(cache, 'run1', 200)
+        self.add(cache, 'a', 100)
+        self.assertFalse(os.path.exists(old))
+        self.assertEqual(cache.size(), 100)
+
+    def test_run_command(self):
+        done = []
+        rc = RunCommand(start_func=lambda s: None, cachename='tool', cachedir=self.root,
+                        done_func=lambda s, rdir: done.append((s.cached, rdir)))
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            inp = self.write('in.txt', '1')
+            for i in range(2):
+                rc.run('cp in.txt out.txt', runname='x', inputs=[inp])
+                if rc.thread:
+                    rc.thread.join()
+            self.write('in.txt', '2')
+            os.utime(inp, ns=(0, 1))
+            rc.run('cp in.txt out.txt', runname='x', inputs=[inp])
+            rc.thread.join()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual([d[0] for d in done], [False, True, False])
+        self.assertEqual(done[0][1], done[1][1])
+        self.assertNotEqual(done[0][1], done[2][1])
+        with open(os.path.join(done[2][1], 'out.txt')) as f:
+            self.assertEqual(f.read(), '2')
+
+    def test_link_tree(self):
+        src = os.path.join(self.root, 'src')
+        os.makedirs(os.path.join(src, 'sub'))
+        self.write('src/sub/a.txt', 'a')
+        os.symlink('sub/a.txt', os.path.join(src, 'link'))
+        dst = os.path.join(self.root, 'dst')
+        link_tree(src, dst)
+        self.assertTrue(os.path.samefile(os.path.join(src, 'sub/a.txt'), os.path.join(dst, 'sub/a.txt')))
+        self.assertEqual(os.readlink(os.path.join(dst, 'link')), 'sub/a.txt')
+        clone_file(os.path.join(src, 'sub/a.txt'), os.path.join(self.root, 'b.txt'))
+        self.assertFalse(os.path.samefile(os.path.join(src, 'sub/a.txt'), os.path.join(self.root, 'b.txt')))
+        move_tree(src, os.path.join(self.root, 'moved'))
+        self.assertFalse(os.path.exists(src))
+        with open(os.path.join(self.root, 'moved/sub/a.txt')) as f:
+            self.assertEqual(f.read(), 'a')
+
+    def test_run_command_scratch(self):
+        done = []
+        work = os.path.join(self.root, 'work')
+        os.makedirs(work)
+        rc = RunCommand(start_func=lambda s: None, cachename='tool', scratch=True,
+                        cachedir=os.path.join(self.root, 'cache'),
+                        done_func=lambda s, rdir: done.append((s.cached, rdir)))
+        cwd = os.getcwd()
+        os.chdir(work)
+        try:
+            inp = self.write('work/in.txt', '1')
+            for i in range(2):
+                rc.run('cat in.txt in.txt > out.txt', inputs=[inp])
+                if rc.thread:
+                    rc.thread.join()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(os.listdir(work), ['in.txt'])
+        self.assertEqual([d[0] for d in done], [False, True])
+        rdir = done[0][1]
+        self.assertEqual(sorted(os.listdir(rdir)), ['.meta', '.output', '.submit_time', 'in.txt', 'out.txt'])
+        with open(os.path.join(rdir, 'out.txt')) as f:
+            self.assertEqual(f.read(), '11')
+        # the cached input is a copy, not a link to the user's file
+        self.assertFalse(os.path.samefile(inp, os.path.join(rdir, 'in.txt')))
+
+    def test_submit_scratch(self):
+        # stand-in for submit: a parametric run that writes runName/1/
+        bindir = os.path.join(self.root, 'bin')
+        os.makedirs(bindir)
+        fake = self.write('bin/submit', '#!/bin/sh\n'
+                          'run=${1#--runName=}; shift 3\n'
+                          'mkdir -p $run/1; cd $run/1; sh -c "$*" > 1.stdout\n')
+        os.chmod(fake, stat.S_IRWXU)
+        done = []
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            with mock.patch.object(Submit, 'CACHEDIR', os.path.join(self.root, 'cache')), \
+                    mock.patch.dict(os.environ, {'PATH': bindir + os.pathsep + os.environ['PATH']}):
+                sub = Submit(start_func=lambda s: None, cachename='tool', scratch=True,
+                             done_func=lambda s, rdir: done.append((s.cached, rdir)))
+                for i in range(2):
+                    sub.run('myrun', 'echo hello')
+                    if sub.thread:
+                        sub.thread.join()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual([d[0] for d in done], [False, True])
+        rdir = done[0][1]
+        with open(os.path.join(rdir, '1', '1.stdout')) as f:
+            self.assertEqual(f.read(), 'hello\n')
+        self.assertIn('hello', sub.output.value)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'cache', 'tool')), [os.path.basename(rdir)])
+
+
+class TestPathSelector(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, 'Sub'))
+        os.makedirs(os.path.join(self.root, '.hidden'))
+        for name in ['b.xml', 'a.txt', 'C.xml', 'd.txt', 'e.xml']:
+            open(os.path.join(self.root, name), 'w').close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_list_dir(self):
+        opts = list_dir(self.root)
+        self.assertEqual([k for k, v in opts], ['[..]', '[Sub]', 'a.txt', 'b.xml', 'C.xml', 'd.txt', 'e.xml'])
+        self.assertEqual(opts[1], ('[Sub]', 'Sub'))
+        # cached until the directory changes
+        self.assertIs(list_dir(self.root), opts)
+        self.assertEqual([v for k, v in list_dir(self.root, '*.xml')], ['..', 'Sub', 'b.xml', 'C.xml', 'e.xml'])
+        os.remove(os.path.join(self.root, 'a.txt'))
+        st = os.stat(self.root)
+        os.utime(self.root, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        self.assertNotIn(('a.txt', 'a.txt'), list_dir(self.root))
+
+    def test_select(self):
+        ps = PathSelector(self.root, page_size=3)
+        ps.wait()
+        self.assertEqual(ps.select.options, (('[..]', '..'), ('[Sub]', 'Sub'), ('a.txt', 'a.txt'),
+                                             ('next 3 >>', NEXT)))
+        self.assertEqual(ps.accord.get_title(0), self.root + ' [1-3 of 7]')
+        ps.select.value = (NEXT,)
+        self.assertEqual(ps.select.options[0], ('<< previous 3', PREV))
+        self.assertEqual([v for k, v in ps.select.options[1:-1]], ['b.xml', 'C.xml', 'd.txt'])
+        ps.select.value = ('C.xml',)
+        self.assertEqual(ps.file, os.path.join(self.root, 'C.xml'))
+
+        ps.pattern = '*.txt'
+        ps.wait()
+        self.assertEqual([v for k, v in ps.select.options], ['..', 'Sub', 'a.txt', NEXT])
+        ps.select.value = ('Sub',)
+        ps.wait()
+        self.assertEqual(ps.value, os.path.join(self.root, 'Sub'))
+        self.assertEqual(ps.select.options, (('[..]', '..'),))
+
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, 'results')
+        os.makedirs(os.path.join(self.dir, 'sub'))
+        self.files = {'results/a.txt': b'hello' * 1000,
+                      'results/sub/b.dat': os.urandom(3000000)}
+        for name, data in self.files.items():
+            with open(os.path.join(self.tmp.name, name), 'wb') as f:
+                f.write(data)
+        self.fname = os.path.join(self.tmp.name, 'results/sub/b.dat')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def unzip(self, data):
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            return dict((n, zf.read(n)) for n in zf.namelist())
+
+    def test_iter_zip(self):
+        chunks = list(iter_zip(self.dir, chunk_size=65536))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(self.unzip(b''.join(chunks)), self.files)
+        # nothing was written next to the results
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['results'])
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 20))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=-5', 100), (95, 100))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 100))
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertRaises(ValueError, parse_range, 'bytes=100-', 100)
+
+    def test_http(self):
+        server = DownloadServer()
+        try:
+            url = 'http://127.0.0.1:%d' % server.port
+            path = server.add(self.fname, 'b.dat')
+            data = self.files['results/sub/b.dat']
+            with urlopen(url + path) as r:
+                self.assertEqual(r.status, 200)
+                self.assertEqual(r.read(), data)
+            with urlopen(Request(url + path, headers={'Range': 'bytes=1000-'})) as r:
+                self.assertEqual(r.status, 206)
+                self.assertEqual(r.headers['Content-Range'], 'bytes 1000-%d/%d' % (len(data) - 1, len(data)))
+                self.assertEqual(r.read(), data[1000:])
+            with self.assertRaises(HTTPError) as e:
+                urlopen(Request(url + path, headers={'Range': 'bytes=%d-' % len(data)}))
+            self.assertEqual(e.exception.code, 416)
+            with urlopen(url + server.add(self.dir, 'results.zip')) as r:
+                self.assertEqual(self.unzip(r.read()), self.files)
+            server.remove(path)
+            with self.assertRaises(HTTPError) as e:
+                urlopen(url + path)
+            self.assertEqual(e.exception.code, 404)
+        finally:
+            server.shutdown()
+
+    def comm(self, dl):
+        # play the front end: start, then acknowledge chunks until done
+        msgs = []
+        dl.input.send = lambda content, buffers=None: msgs.append((content, buffers))
+        dl.input._handle_custom_msg({'event': 'start', 'offset': 0}, [])
+        data = []
+        most = 0
+        while msgs[-1][0]['event'] != 'done':
+            most = max(most, len(msgs))
+            content, buffers = msgs.pop(0)
+            self.assertEqual(content['event'], 'chunk')
+            data.append(buffers[0])
+            dl.input._handle_custom_msg({'event': 'ack', 'offset': content['offset']}, [])
+        self.assertLessEqual(most, dl.pipeline)
+        # the rest arrive after done, and the browser acknowledges them too
+        for content, buffers in msgs[:-1]:
+            data.append(buffers[0])
+            dl.input._handle_custom_msg({'event': 'ack', 'offset': content['offset']}, [])
+        return b''.join(data)
+
+    def test_comm(self):
+        done = []
+        dl = Download(self.fname, mode='comm', chunk_size=65536,
+                      cb=lambda: done.append(dl.inflight))
+        self.assertEqual(self.comm(dl), self.files['results/sub/b.dat'])
+        # called once, after the last chunk was acknowledged
+        self.assertEqual(done, [0])
+        self.assertEqual(dl.status.value, '2.9 MB')
+        self.assertEqual((dl.bar.value, dl.bar.bar_style), (100, 'success'))
+
+        dl = Download(self.dir)
+        self.assertEqual(dl.mode, 'comm')
+        self.assertEqual(dl.input.filename, 'results.zip')
+        self.assertEqual(self.unzip(self.comm(dl)), self.files)
+
+        def gen():
+            for i in range(1000):
+                yield b'%d\n' % i
+        dl = Download('numbers.txt', source=gen, chunk_size=100)
+        self.assertEqual(self.comm(dl), b''.join(gen()))
+
+    def test_missing_source(self):
+        server = DownloadServer()
+        try:
+            fname = os.path.join(self.tmp.name, 'gone.txt')
+            with open(fname, 'w') as f:
+                f.write('x')
+            path = server.add(fname, 'gone.txt')
+            os.remove(fname)
+            with self.assertRaises(HTTPError) as e:
+                urlopen('http://127.0.0.1:%d%s' % (server.port, path))
+            self.assertEqual(e.exception.code, 404)
+        finally:
+            server.shutdown()
+
+        msgs = []
+        dl = Download('gone.txt', source=fname, mode='comm')
+        dl.input.send = lambda content, buffers=None: msgs.append(content)
+        with mock.patch('sys.stderr'):
+            dl.input._handle_custom_msg({'event': 'start', 'offset': 0}, [])
+        self.assertEqual(msgs[-1]['event'], 'error')
+        self.assertEqual(dl.status.value, 'Download failed')
+
+    def test_close(self):
+        sources = get_server().httpd.sources
+        before = dict(sources)
+        dl = Download(self.fname, mode='http')
+        self.assertEqual(len(sources), len(before) + 1)
+        dl.close()
+        self.assertEqual(sources, before)
+
+    def test_link(self):
+        dl = Download('out.txt')
+        self.assertEqual(dl.mode, 'link')
+        self.assertIn('href="out.txt"', dl.w.value)
+
+
+class FakeFrontEnd(object):
+    """Answers FileUpload's read requests from in-memory files."""
+
+    def __init__(self, up, files):
+        self.up = up
+        self.files = files
+        self.queue = []
+        self.most = 0
+        self.sent = 0
+        # fail the first read at or after this offset
+        self.fail = None
+        self.failed = None
+        up.input.send = self.send
+
+    def send(self, content, buffers=None):
+        self.queue.append(content)
+        self.most = max(self.most, len(self.queue))
+
+    def run(self, reverse=False):
+        while self.queue:
+            m = self.queue.pop(-1 if reverse else 0)
+            data = self.files[m['fnum']][m['offset']:m['offset'] + m['size']]
+            reply = dict(fnum=m['fnum'], offset=m['offset'], seq=m['seq'])
+            if m['event'] == 'hash':
+                reply.update(event='digest', digest=hashlib.sha256(data).hexdigest())
+                self.up.input._handle_custom_msg(reply, [])
+            elif self.fail is not None and m['offset'] >= self.fail:
+                self.fail = None
+                self.failed = m
+                reply.update(event='read_error', error='gone')
+                self.up.input._handle_custom_msg(reply, [])
+            else:
+                self.sent += len(data)
+                reply.update(event='chunk')
+                self.up.input._handle_custom_msg(reply, [memoryview(data)])
+
+
+class TestFileUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.done = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def upload(self, files, reverse=False, **kw):
+        up = FileUpload('Upload', '', dir=self.tmp.name, maxnum=len(files), maxsize='1G',
+                        cb=lambda w, names: self.done.append(names), **kw)
+        fe = FakeFrontEnd(up, files)
+        up.input.filenames = [['f%d' % i, len(d)] for i, d in enumerate(files)]
+        fe.run(reverse)
+        self.assertEqual(len(self.done), 1)
+        for fname, data in zip(self.done[0], files):
+            self.assertEqual(os.path.dirname(fname), self.tmp.name)
+            with open(fname, 'rb') as f:
+                self.assertEqual(f.read(), data)
+        self.assertEqual(up.digests, dict((n, hashlib.sha256(d).hexdigest())
+                                          for n, d in zip(self.done[0], files)))
+        return up, fe
+
+    def test_pipeline(self):
+        files = [os.urandom(1000000), b'', os.urandom(5)]
+        up, fe = self.upload(files, pipeline=3, chunk_size=65536)
+        self.assertEqual(fe.most, 3)
+        self.assertEqual([p.bar_style for p in up.prog], ['success'] * 3)
+        # local replies are fast, so chunks grow
+        self.assertGreater(up.chunk, 65536)
+
+    def test_out_of_order(self):
+        self.upload([os.urandom(300000)], reverse=True, chunk_size=65536)
+
+    def test_read_error(self):
+        up = FileUpload('Upload', '', dir=self.tmp.name, cb=lambda w, n: self.done.append(n))
+        fe = FakeFrontEnd(up, [b'x' * 100])
+        up.input.filenames = [['f0', 100]]
+        m = fe.queue.pop()
+        up.input._handle_custom_msg(dict(event='read_error', fnum=0, offset=m['offset'],
+                                         seq=m['seq'], error='gone'), [])
+        self.assertEqual(up.prog[0].bar_style, 'danger')
+        self.assertEqual(self.done, [])
+
+    def test_stale_replies(self):
+        old, new = os.urandom(200000), os.urandom(200000)
+        up = FileUpload('Upload', '', dir=self.tmp.name, cb=lambda w, n: self.done.append(n),
+                        chunk_size=65536)
+        fe = FakeFrontEnd(up, [old])
+        up.input.filenames = [['f0', len(old)]]
+        stale = fe.queue
+        fe.queue = []
+        up.reset()
+        up.input.filenames = [['f0', len(new), 1]]
+        # replies to the reads made before the reset arrive now
+        fe.queue, fresh = stale, fe.queue
+        fe.run()
+        fe.files, fe.queue = [new], fresh
+        fe.run()
+        with open(self.done[0][0], 'rb') as f:
+            self.assertEqual(f.read(), new)
+
+    def test_resume(self):
+        data = os.urandom(1000000)
+        up = FileUpload('Upload', '', dir=self.tmp.name, maxsize='1G',
+                        cb=lambda w, n: self.done.append(n), pipeline=2, chunk_size=65536)
+        fe = FakeFrontEnd(up, [data])
+        fe.fail = 1
+        up.input.filenames = [['f0', len(data), 1234]]
+        fe.run()
+        # the part file holds what arrived before the error
+        part = os.path.join(self.tmp.name, '.f0.%d-1234.part' % len(data))
+        self.assertEqual(os.path.getsize(part), fe.failed['offset'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'f0')))
+        self.assertEqual(self.done, [])
+
+        fe.sent = 0
+        up.resume()
+        fe.run()
+        self.assertEqual(len(self.done), 1)
+        self.assertFalse(os.path.exists(part))
+        with open(self.done[0][0], 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(up.digests[self.done[0][0]], hashlib.sha256(data).hexdigest())
+        # only the rest of the file was read
+        self.assertEqual(fe.sent, len(data) - fe.failed['offset'])
+
+    def test_reselect_resumes(self):
+        data = os.urandom(300000)
+        with open(os.path.join(self.tmp.name, '.f0.300000-0.part'), 'wb') as f:
+            f.write(data[:100000])
+        up, fe = self.upload([data])
+        self.assertEqual(fe.sent, 200000)
+
+    def test_stale_parts(self):
+        data = os.urandom(1000)
+        for name in ('.f0.999-0.part', '.f0.1000-5.part', '.f0.x.1000-0.part'):
+            with open(os.path.join(self.tmp.name, name), 'wb') as f:
+                f.write(b'x')
+        self.upload([data])
+        # only the part file of another file is left
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['.f0.x.1000-0.part', 'f0'])
+
+    def test_skip_same(self):
+        same, other = os.urandom(10000000), os.urandom(1000)
+        for i, d in enumerate([same, other[::-1]]):
+            with open(os.path.join(self.tmp.name, 'f%d' % i), 'wb') as f:
+                f.write(d)
+        up, fe = self.upload([same, other])
+        # only the file that differs was uploaded
+        self.assertEqual(fe.sent, len(other))
+
+
+def report(finished, executing, waiting, timestamp, failed=0):
+    return ('=SUBMIT-PROGRESS=> aborted=0 finished=%d failed=%d executing=%d waiting=%d '
+            'setting_up=0 setup=0 %%done=0.00 timestamp=%s\n'
+            % (finished, failed, executing, waiting, timestamp))
+
+
+class TestSubmitProgress(unittest.TestCase):
+    def test_split_lines(self):
+        p = SubmitProgress()
+        text = 'hello\n' + report(0, 2, 8, 100.0) + 'world\n' + report(2, 2, 6, 160.0)
+        other = []
+        for i in range(0, len(text), 7):
+            other += p.feed(text[i:i + 7])
+        self.assertEqual(other, ['hello', 'world'])
+        self.assertEqual(len(p.table), 2)
+        self.assertEqual(p.total, 10)
+        self.assertEqual(p.count('finished'), 2)
+        self.assertEqual(p.history('waiting'), [(100.0, 8), (160.0, 6)])
+
+    def test_close(self):
+        # the last report has no newline
+        p = SubmitProgress()
+        self.assertEqual(p.feed(report(0, 2, 8, 100.0) + report(10, 0, 0, 160.0)[:-1]), [])
+        self.assertEqual(p.count('finished'), 0)
+        self.assertEqual(p.close(), [])
+        self.assertEqual(p.count('finished'), 10)
+        p.feed('done')
+        self.assertEqual(p.close(), ['done'])
+        self.assertEqual(p.close(), [])
+
+    def test_transitions(self):
+        p = SubmitProgress()
+        self.assertEqual(p.total, 0)
+        self.assertIsNone(p.throughput())
+        p.feed(report(0, 2, 8, 100.0))
+        p.feed(report(2, 2, 6, 160.0))
+        self.assertEqual(p.transitions(), [
+            (100.0, 'executing', 2), (100.0, 'waiting', 8),
+            (160.0, 'finished', 2), (160.0, 'waiting', -2)])
+        # two jobs in one minute, eight to go
+        self.assertAlmostEqual(p.throughput(), 2.0)
+        self.assertAlmostEqual(p.eta(), 240.0)
+        self.assertEqual(p.summary(), '2 of 10 jobs done, 2.0 jobs/min, about 4m0s left')
+
+
+FAKE_SUBMIT = """#!/bin/sh
+# stand-in for submit: reports progress, runs the command in runName/1/
+run=${1#--runName=}; shift 3
+echo "=SUBMIT-PROGRESS=> aborted=0 finished=0 failed=0 executing=2 waiting=0 setting_up=0 setup=0 %done=0.00 timestamp=1.0"
+sleep 0.3
+mkdir -p $run/1; cd $run/1; "$@" > 1.stdout || exit 1
+echo "=SUBMIT-PROGRESS=> aborted=0 finished=2 failed=0 executing=0 waiting=0 setting_up=0 setup=0 %done=100.00 timestamp=2.0"
+"""
+
+
+class TestSubmitPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        bindir = os.path.join(self.root, 'bin')
+        os.makedirs(bindir)
+        fake = os.path.join(bindir, 'submit')
+        with open(fake, 'w') as f:
+            f.write(FAKE_SUBMIT)
+        os.chmod(fake, stat.S_IRWXU)
+        self.patches = [
+            mock.patch.object(Submit, 'CACHEDIR', os.path.join(self.root, 'cache')),
+            mock.patch.dict(os.environ, {'PATH': bindir + os.pathsep + os.environ['PATH']})]
+        for p in self.patches:
+            p.start()
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_pool(self):
+        done = []
+        pool = SubmitPool(max_jobs=2, cachename='tool', done_func=done.append)
+        jobs = [('run%d' % i, 'echo %d' % i) for i in range(4)] + [('bad', 'false')]
+        t0 = time.time()
+        pool.run(jobs)
+        pool.wait()
+        elapsed = time.time() - t0
+        self.assertEqual(done, [pool])
+        # five jobs, two at a time
+        self.assertGreater(elapsed, 0.6)
+        res = pool.results
+        self.assertNotEqual(res.pop('bad')[0], 0)
+        for i in range(4):
+            code, rdir = res['run%d' % i]
+            self.assertEqual(code, 0)
+            with open(os.path.join(rdir, '1', '1.stdout')) as f:
+                self.assertEqual(f.read(), '%d\n' % i)
+        # progress from all jobs is added up
+        self.assertEqual([p.value for p in pool.prog], [0, 0, 0, 8, 1])
+        self.assertEqual(pool.prog[0].max, 9)
+        self.assertIn('[bad] failed', pool.output.value)
+        rows = pool.table()
+        self.assertEqual([r['state'] for r in rows], ['done'] * 5)
+        self.assertEqual((rows[0]['finished'], rows[-1]['failed']), (2, 1))
+        self.assertGreater(pool.throughput(), 0)
+
+        # cached jobs finish without running submit
+        t0 = time.time()
+        pool.run(jobs[:4])
+        pool.wait()
+        self.assertLess(time.time() - t0, 0.3)
+        self.assertTrue(all(j.cached for j in pool.jobs))
+        self.assertEqual(pool.results['run1'], res['run1'])
+
+    def test_failed_job(self):
+        # a job that cannot start fails alone
+        done = []
+        pool = SubmitPool(max_jobs=2, done_func=done.append)
+        with mock.patch('sys.stderr'):
+            pool.run([('ok', 'echo 1'), ('bad', 'echo 2', ['missing.txt'])])
+            pool.wait()
+        self.assertEqual(done, [pool])
+        self.assertEqual(pool.results['ok'][0], 0)
+        self.assertEqual(pool.results['bad'], (None, None))
+        self.assertIn('[bad] FileNotFoundError', pool.output.value)
+        self.assertFalse([d for d in os.listdir(self.root) if d.startswith('bad_')])
+
+    def test_failed_store(self):
+        # an error while saving the results fails that job
+        pool = SubmitPool(cachename='tool')
+        with mock.patch.object(SubmitPool, '_store', side_effect=OSError('disk full')), \
+                mock.patch('sys.stderr'):
+            pool.run([('ok', 'echo 1')])
+            pool.wait()
+        self.assertEqual(pool.results, {'ok': (None, None)})
+        self.assertIn('[ok] OSError: disk full', pool.output.value)
+
+    def test_failed_pool(self):
+        # an error outside the jobs cancels them and still calls done_func
+        done = []
+        pool = SubmitPool(cachename='tool', done_func=done.append)
+        with mock.patch('sys.stderr'):
+            pool.run([('ok', 'echo 1'), ('bad', 'echo 2', ['missing.txt'])])
+            pool.wait()
+        self.assertEqual(done, [pool])
+        self.assertEqual([j.state for j in pool.jobs], ['canceled', 'canceled'])
+        self.assertIn('FileNotFoundError', pool.output.value)
+        self.assertTrue(pool.but.disabled)
+
+    def test_cancel(self):
+        pool = SubmitPool(max_jobs=1)
+        pool.run([('a', 'sleep 10'), ('b', 'sleep 10')])
+        time.sleep(0.3)
+        t0 = time.time()
+        pool.cancel()
+        pool.wait()
+        self.assertLess(time.time() - t0, 3)
+        self.assertEqual([j.state for j in pool.jobs], ['canceled', 'canceled'])
@@ -0,0 +1,56 @@
+#  Copyright 2025 HUBzero Foundation, LLC.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+#  HUBzero is a registered trademark of Purdue University.
+
+#  Authors:
+#  Daniel Mejia (denphi), Purdue University (denphi@denphi.com)
+
+import unittest
+from nanohublib import ureg, Q_
+from nanohublib import units
+
+
+class TestUnits(unittest.TestCase):
+    def test_parse_value(self):
+        self.assertEqual(units.parse_value('300K'), (300, ureg.kelvin))
+        self.assertEqual(units.parse_value(' -1.5e3 eV '), (-1500.0, ureg.eV))
+        self.assertEqual(units.parse_value('42'), (42, None))
+        # not a plain number and units, so pint parses it
+        self.assertEqual(units.parse_value('2 * 3 m'), (6, ureg.meter))
+        # numbers in the units part are not dropped
+        self.assertEqual(units.parse_value('100K/2'), (50, ureg.kelvin))
+        self.assertEqual(units.parse_value('5 m*2'), (10, ureg.meter))
+        self.assertRaises(ValueError, units.parse_units, 'K/2')
+
+    def test_parse_rap_expr(self):
+        from nanohublib.rappture.number import parse_rap_expr
+        self.assertEqual(parse_rap_expr('K', '100K/2'), ureg.Quantity(50, 'K'))
+        self.assertEqual(parse_rap_expr('K', '300K'), ureg.Quantity(300, 'K'))
+
+    def test_rap_units(self):
+        self.assertEqual(units.rap_units('C'), ureg.degC)
+        self.assertEqual(units.rap_units('K'), ureg.kelvin)
+
+    def test_convert(self):
+        self.assertAlmostEqual(units.convert(300, ureg.kelvin, ureg.degC), 26.85)
+        self.assertAlmostEqual(units.convert(1500, ureg.meV, ureg.eV), 1.5)
+        self.assertEqual(units.conversion(ureg.kelvin, ureg.degC), (1.0, -273.15))
+        self.assertEqual(units.convert(5, ureg.eV, ureg.eV), 5)